@@ -70,10 +70,31 @@
 ###########
 # IMPORTS #
 ###########
+import weakref
+
+from collections import OrderedDict
+from types import MappingProxyType
+
+import numpy as np
+import pandas as pd
+
+import phonetics
 
 ####################
 # GLOBAL VARIABLES #
 ####################
+# The phones that exist, by their content (see AbstractPhone), so that equal
+# phones are a single object, and the dictionaries from feature to position of
+# the lists of features in use, shared by all the phones with the same list.
+INTERNED_PHONES = weakref.WeakValueDictionary()
+FEATURE_INDICES = {}
+
+# Bit masks over the features are stored as arrays of words of this many bits.
+WORD_BITS = 64
+WORD_MASK = (1 << WORD_BITS) - 1
+
+# Number of natural classes kept by every system (see naturalClass).
+NATURAL_CLASS_CACHE_SIZE = 1024
 
 ################################
 ################################
@@ -94,6 +115,286 @@
 #################
 
 
+def internFeatureIndex(featureList):
+    # Returns the dictionary from each feature of the list to its position,
+    # the same object for every equal list.
+    key = tuple(featureList)
+    featureIndex = FEATURE_INDICES.get(key)
+    if featureIndex is None:
+        featureIndex = {feature: k for k, feature in enumerate(key)}
+        FEATURE_INDICES[key] = featureIndex
+    return featureIndex
+
+
+def validateLiterals(literals):
+    # Returns the list of pairs [feature, value] of a rule as a tuple of
+    # tuples, checking that every value is True or False.
+    validated = []
+    for literal in literals:
+        if len(literal) != 2 or not isinstance(literal[1], bool):
+            errorString  = "The antecedents and consequents of a rule should "
+            errorString += "be pairs of a feature and True or False. At least "
+            errorString += "one is not."
+            raise ValueError(errorString)
+        validated.append((literal[0], literal[1]))
+    return tuple(validated)
+
+
+def wordsFor(numberOfFeatures):
+    # Returns the number of words needed for a bit mask over the features.
+    return max(1, -(-numberOfFeatures // WORD_BITS))
+
+
+def toWords(bits, numberOfWords):
+    # Returns the bit mask given as an integer as an array of words of type
+    # uint64, the lowest bits first.
+    return np.array([(bits >> (WORD_BITS * k)) & WORD_MASK
+                     for k in range(numberOfWords)], dtype=np.uint64)
+
+
+def phoneLiterals(phone, numberOfWords):
+    # Returns an array of shape (2, words) with the bit masks of the features
+    # of the phone that are True and of the ones that are False.
+    specified, values = phone.getPackedFeatures()
+    return np.stack([toWords(specified & values, numberOfWords),
+                     toWords(specified & ~values, numberOfWords)])
+
+
+def appliedRules(literals, ruleMasks):
+    # Returns a boolean array of shape (..., rules) that tells, for every set
+    # of literals (an array of shape (..., 2, words), as the ones of
+    # phoneLiterals) and every rule (see FeatureRule.getMasks), if the set has
+    # all the antecedents of the rule.
+    missing = (ruleMasks[:, 0] & ~literals[..., np.newaxis, 0, :]) | \
+              (ruleMasks[:, 1] & ~literals[..., np.newaxis, 1, :])
+    return ~missing.any(axis=-1)
+
+
+def violatedRules(literals, ruleMasks):
+    # Returns a boolean array of shape (..., rules) that tells, for every set
+    # of literals and every rule, if the set has all the antecedents of the
+    # rule and the opposite value of one of its consequents.
+    clash = (ruleMasks[:, 2] & literals[..., np.newaxis, 1, :]) | \
+            (ruleMasks[:, 3] & literals[..., np.newaxis, 0, :])
+    return appliedRules(literals, ruleMasks) & clash.any(axis=-1)
+
+
+def closeLiterals(literals, ruleMasks):
+    # Returns the closure of a batch of sets of literals, an array of shape
+    # (sets, 2, words), under the rules: every rule whose antecedents are in a
+    # set adds its consequents to it, until no rule adds anything.
+    while True:
+        applied = appliedRules(literals, ruleMasks)
+        added = np.where(applied[:, :, np.newaxis, np.newaxis],
+                         ruleMasks[np.newaxis, :, 2:], np.uint64(0))
+        closed = literals | np.bitwise_or.reduce(added, axis=1)
+        if np.array_equal(closed, literals):
+            return literals
+        literals = closed
+
+
+def isContradictory(literals):
+    # Returns a boolean array that tells, for every set of literals, if it
+    # has some feature both True and False.
+    return (literals[..., 0, :] & literals[..., 1, :]).any(axis=-1)
+
+
+def systemFromTable(table, featureList=None, namingList=None, names=None,
+                    rules=None, featureNames=None, sheetName=0):
+    # Builds an AbstractPhoneticSystem from a table of features, all at once
+    # (see AbstractPhoneticSystem.bulkLoad). The table has a column for every
+    # phone, headed by its symbol, and a row for every feature, and it could be
+    # given as:
+    #
+    # - A dictionary from every symbol to a dictionary from feature to value,
+    #   as the ones of the module acousticphonetics.
+    #
+    # - A DataFrame, with the features as index.
+    #
+    # - The address of a spreadsheet, as the rasgos*.xlsx files, whose first
+    #   column has the names of the features, read from the sheet sheetName.
+    #
+    # The values could be True or False, or "+" and "-", and empty cells, "0"
+    # or "±" are unspecified features (see FEATURE_VALUES). If featureNames is
+    # given, it translates the names of the features of the table to the ones
+    # of the system. The features should be in featureList (phonetics.FEATURES
+    # by default), and the names, given as a dictionary from symbol to a
+    # dictionary from naming cathegory to name, should be in the lists of
+    # phonetics.NAME_DICT, whose keys are the default namingList. The rules are
+    # FeatureRule objects.
+    if featureList is None:
+        featureList = phonetics.FEATURES
+    if namingList is None:
+        namingList = list(phonetics.NAME_DICT.keys())
+    if names is None:
+        names = {}
+    table = featureTable(table, sheetName)
+    if featureNames is not None:
+        table = table.rename(index=featureNames)
+    unknownFeatures = [str(feature) for feature in table.index
+                       if feature not in featureList]
+    if len(unknownFeatures) > 0:
+        errorString  = "The following features are not in the list of "
+        errorString += "features: " + ", ".join(unknownFeatures) + "."
+        raise ValueError(errorString)
+    validateNames(names, namingList)
+    values = parseFeatureValues(table)
+    phones = []
+    for k, symbol in enumerate(table.columns):
+        features = {feature: value for feature, value in
+                    zip(table.index, values[:, k]) if value is not None}
+        phones.append(AbstractPhone(features, names.get(symbol, {}),
+                                    str(symbol), featureList))
+    theSystem = AbstractPhoneticSystem(featureList, namingList)
+    theSystem.bulkLoad(phones, rules)
+    return theSystem
+
+
+def featureTable(table, sheetName=0):
+    # Returns the table of features given to systemFromTable as a DataFrame
+    # with the features as index and the symbols as columns.
+    if isinstance(table, str):
+        table = pd.read_excel(table, sheet_name=sheetName)
+        table = table.set_index(table.columns[0])
+    elif isinstance(table, dict):
+        table = pd.DataFrame(table)
+    elif not isinstance(table, pd.DataFrame):
+        errorString  = "The table of features should be a dictionary, a "
+        errorString += "DataFrame or the address of a spreadsheet. It is not."
+        raise ValueError(errorString)
+    if table.index.has_duplicates or table.columns.has_duplicates:
+        errorString  = "The table of features has repeated features or "
+        errorString += "symbols."
+        raise ValueError(errorString)
+    return table
+
+
+def parseFeatureValues(table):
+    # Returns the values of a table of features as an array of objects, with
+    # True, False or None, translating them with FEATURE_VALUES.
+    values = np.full(table.shape, None, dtype=object)
+    isKnown = table.isna().to_numpy(dtype=bool, copy=True)
+    for value in [True, False]:
+        hasValue = table.isin([text for text, meaning in
+                               FEATURE_VALUES.items()
+                               if meaning is value]).to_numpy(dtype=bool)
+        values[hasValue] = value
+        isKnown |= hasValue
+    isKnown |= table.isin([text for text, meaning in FEATURE_VALUES.items()
+                           if meaning is None]).to_numpy(dtype=bool)
+    if not isKnown.all():
+        rows, columns = np.nonzero(~isKnown)
+        errorString  = "The value of the feature " + str(table.index[rows[0]])
+        errorString += " of the phone " + str(table.columns[columns[0]])
+        errorString += " is not a feature value."
+        raise ValueError(errorString)
+    return values
+
+
+def validateNames(names, namingList):
+    # Checks that every name of the dictionary from symbol to names belongs to
+    # a naming cathegory of the list, and is one of the names of that
+    # cathegory in phonetics.NAME_DICT, if it is there.
+    for symbol in names.keys():
+        for cathegory, name in names[symbol].items():
+            isKnown = cathegory in namingList and \
+                        (cathegory not in phonetics.NAME_DICT or
+                         name in phonetics.NAME_DICT[cathegory])
+            if not isKnown:
+                errorString  = "The name " + str(name) + " of the phone "
+                errorString += str(symbol) + " is not a name of the naming "
+                errorString += "cathegory " + str(cathegory) + "."
+                raise ValueError(errorString)
+
+
+def minimalSpecification(target, universe, literals):
+    # Returns the shortest list of literals (pairs [feature, value]) whose
+    # bitsets, all within the universe, intersect exactly in the target, or
+    # None if there is no such list. Only the literals whose bitsets contain
+    # the target can be used, and each one excludes the phones out of its
+    # bitset, so the problem is to cover the phones of the universe that are
+    # not in the target with the fewest exclusions. It is solved by branch and
+    # bound: a greedy cover gives the first bound, and the search branches on
+    # the exclusions of the uncovered phone that the fewest of them have.
+    toCover = universe & ~target
+    exclusions = {}
+    for literal, bitset in literals:
+        excluded = toCover & ~bitset
+        if bitset & target == target and excluded not in exclusions:
+            exclusions[excluded] = literal
+    exclusions = [(excluded, literal) for excluded, literal in
+                  exclusions.items() if not any(excluded != other and
+                                                excluded & other == excluded
+                                                for other in exclusions)]
+    allExcluded = 0
+    for excluded, literal in exclusions:
+        allExcluded |= excluded
+    if allExcluded != toCover:
+        return None
+    best = greedyCover(toCover, exclusions)
+
+    def search(uncovered, chosen):
+        nonlocal best
+        if uncovered == 0:
+            best = list(chosen)
+            return
+        largest = max((excluded & uncovered).bit_count()
+                      for excluded, literal in exclusions)
+        bound = -(-uncovered.bit_count() // largest)
+        if len(chosen) + bound >= len(best):
+            return
+        phone = min(bitsOf(uncovered),
+                    key=lambda bit: sum(1 for excluded, literal in exclusions
+                                        if excluded & bit))
+        branches = [(excluded, literal) for excluded, literal in exclusions
+                    if excluded & phone]
+        branches.sort(key=lambda branch: -(branch[0] & uncovered).bit_count())
+        for excluded, literal in branches:
+            chosen.append(literal)
+            search(uncovered & ~excluded, chosen)
+            chosen.pop()
+
+    search(toCover, [])
+    return best
+
+
+def greedyCover(toCover, exclusions):
+    # Returns a list of the literals of the pairs (excluded, literal) that
+    # cover the bitset toCover, taking each time the one that covers the most
+    # of what is left.
+    chosen = []
+    while toCover:
+        excluded, literal = max(exclusions, key=lambda exclusion:
+                                (exclusion[0] & toCover).bit_count())
+        chosen.append(literal)
+        toCover &= ~excluded
+    return chosen
+
+
+def bitsOf(bitset):
+    # Returns the list of the bits set in the bitset, each one as an integer.
+    bits = []
+    while bitset:
+        lowestBit = bitset & -bitset
+        bits.append(lowestBit)
+        bitset ^= lowestBit
+    return bits
+
+
+def unpackLiterals(literals, numberOfFeatures):
+    # Returns the boolean array of shape (..., numberOfFeatures) with the bits
+    # of an array of bit masks of shape (..., words) (see toWords).
+    octets = np.ascontiguousarray(literals, dtype="<u8").view(np.uint8)
+    bits = np.unpackbits(octets, axis=-1, bitorder="little")
+    return bits[..., :numberOfFeatures].astype(bool)
+
+
+def bitsetOf(isSet):
+    # Returns the bitset, as an integer, whose k-th bit is isSet[k].
+    packed = np.packbits(np.asarray(isSet, dtype=bool), bitorder="little")
+    return int.from_bytes(packed.tobytes(), "little")
+
+
 ###############
 ###############
 ##           ##
@@ -130,41 +431,48 @@ class AbstractPhone:
     #
     # This class has three main attributes:
     #
-    # - _features: This is a dictionary, where each key corresponds to a
-    #              predefined list of features, given globally by the phonetic
-    #              system, and the value is either True, False or None. None is
-    #              used only if the particular feature is not specified yet.
+    # - features: For each feature of a list of features, given globally by the
+    #             phonetic system, the value is either True, False or None.
+    #             None is used only if the particular feature is not specified
+    #             yet. They are packed in two integers used as bit vectors,
+    #             indexed by the position of the feature in the list:
+    #             _specified, with the bits of the features that are not None,
+    #             and _values, with the bits of the features that are True.
     #
-    # - _name: This is also a dictionary. In this case, the key is the type of
-    #          name to include, for example, in articularoty phonetics, it could
-    #          be voicing, point of articulation, manner of articulation, etc.
-    #          The value is, the actual value of this particular, like voiced or
-    #          unvoiced, plossive, fricative, etc.
+    # - _name: The names of the phone, as a tuple of pairs. The first element
+    #          of each pair is the type of name to include, for example, in
+    #          articularoty phonetics, it could be voicing, point of
+    #          articulation, manner of articulation, etc. The second one is the
+    #          actual value of this particular, like voiced or unvoiced,
+    #          plossive, fricative, etc.
     #
     # - _symbol: This is a string, often consisting on a single character, that
     #            identifies the phone in a unique manner. It could be the
     #            IPA symbol, or the X-SAMPA.
     #
+    # Phones are immutable, and interned: building a phone equal to one that
+    # already exists returns the same object, so a phone takes the memory of a
+    # reference wherever it is used. The setters return a new phone. The
+    # attributes are slots, so every phone is small.
 
     ##############
     # ATTRIBUTES #
     ##############
-    _features = {}
-    _name     = {}
-    _symbol   = ""
+    __slots__ = ("_featureIndex", "_specified", "_values", "_name", "_symbol",
+                 "__weakref__")
 
 
 
     ############
     # CREATORS #
     ############
-    def __init__(self,theFeatures,theName,theSymbol):
+    def __new__(cls,theFeatures,theName,theSymbol,featureList=None):
         # This is a simple creator for the class AbstractPhone. Takes as
         # arguments the following:
         #
         # - theFeatures: This is a dictionary in which the key is the respective
-        #                feature name, and the value is True or False, as it
-        #                corresponds.
+        #                feature name, and the value is True, False or None, as
+        #                it corresponds.
         #
         # - theName: This is a dictionary in which the key is the naming
         #            cathegory and the value is the corresponding name.
@@ -172,17 +480,62 @@ class AbstractPhone:
         # - theSymbol: String that contains the single character or set of
         #              characters that uniquely identifies the phone.
         #
-        if len(theSymbol) > 0:
-            self._symbol = theSymbol
-            keys = theName.keys()
-            for x in keys:
-                self._name[x] = theName[x]
-            keys = theFeatures.keys()
-            for x in keys:
-                self._features[x] = theFeatures[x]
-            return True
-        else:
-            return False
+        # - featureList: The list of features of the phonetic system. If it is
+        #                not given, it is the list of keys of theFeatures.
+        #
+        # A phone without symbol is an empty phone (see isEmpty), and it takes
+        # no names or features.
+        if len(theSymbol) == 0:
+            theFeatures = {}
+            theName     = {}
+        if featureList is None:
+            featureList = list(theFeatures.keys())
+        featureIndex = internFeatureIndex(featureList)
+        specified = 0
+        values    = 0
+        for feature in theFeatures.keys():
+            if feature not in featureIndex:
+                errorString  = "The feature " + str(feature) + " is not in "
+                errorString += "the list of features."
+                raise ValueError(errorString)
+            value = theFeatures[feature]
+            if value is None:
+                continue
+            if not isinstance(value, bool):
+                errorString  = "The value of the feature " + str(feature)
+                errorString += " should be True, False or None. It is not."
+                raise ValueError(errorString)
+            bit = 1 << featureIndex[feature]
+            specified |= bit
+            if value:
+                values |= bit
+        name = tuple(sorted(theName.items()))
+        key = (tuple(featureIndex), specified, values, name, theSymbol)
+        phone = INTERNED_PHONES.get(key)
+        if phone is None:
+            phone = object.__new__(cls)
+            object.__setattr__(phone, "_featureIndex", featureIndex)
+            object.__setattr__(phone, "_specified", specified)
+            object.__setattr__(phone, "_values", values)
+            object.__setattr__(phone, "_name", name)
+            object.__setattr__(phone, "_symbol", theSymbol)
+            INTERNED_PHONES[key] = phone
+        return phone
+
+    def __init__(self,theFeatures,theName,theSymbol,featureList=None):
+        # Everything is done by __new__, as the phone might be an old one.
+        pass
+
+    def __setattr__(self,key,value):
+        errorString = "Phones are immutable. The setters return a new phone."
+        raise AttributeError(errorString)
+
+    def __reduce__(self):
+        return (AbstractPhone, (self.getFeatures(), self.getName(),
+                                self._symbol, self.getFeatureList()))
+
+    def __repr__(self):
+        return "AbstractPhone(" + repr(self._symbol) + ")"
 
     ###########
     # GETTERS #
@@ -191,39 +544,63 @@ class AbstractPhone:
         return self._symbol
 
     def getName(self):
-        pass
+        return dict(self._name)
 
     def getFeatures(self):
-        pass
+        return {feature: self.getFeatureValue(feature)
+                for feature in self._featureIndex}
+
+    def getFeatureList(self):
+        return list(self._featureIndex)
+
+    def getPackedFeatures(self):
+        # Returns the two bit vectors of the features (see the description of
+        # the class).
+        return self._specified, self._values
 
     def getNameValue(self,cathegory):
-        return self._name[cathegory]
+        return dict(self._name)[cathegory]
 
     def getFeatureValue(self,feature):
-        return self._features[feature]
+        bit = 1 << self._featureIndex[feature]
+        if not self._specified & bit:
+            return None
+        return bool(self._values & bit)
 
 
     ###########
     # SETTERS #
     ###########
     def setSymbol(self,symbol):
-        self._symbol = symbol
+        return AbstractPhone(self.getFeatures(), self.getName(), symbol,
+                             self.getFeatureList())
 
     def setName(self,name):
-        keys = name.keys()
-        for key in keys:
-            self._name[key] = name[key]
+        newName = self.getName()
+        newName.update(name)
+        return AbstractPhone(self.getFeatures(), newName, self._symbol,
+                             self.getFeatureList())
 
     def setFeatures(self,features):
-        keys = features.keys()
-        for key in keys:
-            self._features[key] = features[key]
+        newFeatures = self.getFeatures()
+        newFeatures.update(features)
+        return AbstractPhone(newFeatures, self.getName(), self._symbol,
+                             self.getFeatureList())
 
     def setNameValue(self,key,value):
-        self._name[key] = value
+        return self.setName({key: value})
 
     def setFeatureValue(self,key,value):
-        self._features[key] = value
+        return self.setFeatures({key: value})
+
+    def setFeatureList(self,featureList):
+        # Returns the same phone with its features indexed by the given list,
+        # which must contain all the features that the phone specifies. The
+        # features of the list that the phone does not have are unspecified.
+        features = {feature: value for feature, value in
+                    self.getFeatures().items() if value is not None}
+        return AbstractPhone(features, self.getName(), self._symbol,
+                             featureList)
 
 
     ###########
@@ -232,21 +609,10 @@ class AbstractPhone:
     def isEmpty(self):
         # This function returns True if phone has no attributes, name or symbol,
         # it returns False otherwise.
-        L = 0
-        keys = self._features.keys()
-        for x in keys:
-            if self._features[x] != None:
-                L += 1
-        keys = self._names.keys()
-        for x in keys:
-            if self._names[x] != None:
-                L += 1
         if len(self._symbol) == 0:
             return True
-        elif L == 0:
-            return True
-        else:
-            return False
+        hasNames = any(value is not None for _, value in self._name)
+        return self._specified == 0 and not hasNames
 
 
 ##############################
@@ -264,21 +630,68 @@ class AbstractPhoneticSystem:
     # the phonetic features' names), _names (list of strings of all the naming
     # cathegories names). The attribute _names and _features should not change
     # what so ever after the class has been instantiated.
+    #
+    # The system also keeps _symbolIndex, a dictionary from the symbol of each
+    # phone of the inventory to the phone, which is updated by addPhone, so
+    # that findPhoneBySymbol takes constant time even for inventories with
+    # thousands of symbols.
+    #
+    # For getMatches, the system keeps bitsets, as integers whose k-th bit
+    # stands for the k-th phone of the inventory: _featureBitsets has one for
+    # every pair (feature, value) with the phones with that value, and
+    # _unspecifiedBitsets one for every feature with the phones that leave it
+    # unspecified, which match any value, while _nameBitsets has one for every
+    # pair (naming cathegory, name). A query is then an AND of a few bitsets.
+    #
+    # The rule book is compiled to bit masks over the features (see
+    # FeatureRule.getMasks), in _ruleMasks, of shape (rules, 4, words), and the
+    # inventory too, in _phoneLiterals, of shape (phones, 2, words) (see
+    # phoneLiterals), so a phone is checked against all the rules, or a rule
+    # against all the phones, with a few vectorized operations. The rule book
+    # is consistent if, for every rule, the closure of its antecedents under
+    # the rule book (see closeLiterals) has no contradiction, that is, every
+    # rule can apply to some phone. These closures are kept in _closures, of
+    # shape (rules, 2, words), and addRule only propagates the new rule
+    # through the ones it affects.
 
     ##############
     # ATTRIBUTES #
     ##############
-    _inventory = []
-    _rules     = []
-    _features  = []
-    _names     = []
+    _inventory   = []
+    _rules       = []
+    _features    = []
+    _names       = []
+    _symbolIndex        = {}
+    _featureBitsets     = {}
+    _unspecifiedBitsets = {}
+    _nameBitsets        = {}
+    _numberOfWords      = 1
+    _ruleMasks          = None
+    _closures           = None
+    _phoneLiterals      = None
+    _classCache         = None
+    _featureMatrix      = None
 
     ############
     # CREATORS #
     ############
     def __init__(self,featureArray,namingArray):
-        self.features = featureArray
-        self.names    = namingArray
+        # Every system has its own inventory, rule book and index, and its own
+        # copy of the lists of features and naming cathegories.
+        self._inventory   = []
+        self._rules       = []
+        self._features    = list(featureArray)
+        self._names       = list(namingArray)
+        self._symbolIndex = {}
+        self._featureBitsets     = {}
+        self._unspecifiedBitsets = {}
+        self._nameBitsets        = {}
+        self._numberOfWords      = wordsFor(len(self._features))
+        self._ruleMasks     = np.zeros((0, 4, self._numberOfWords), np.uint64)
+        self._closures      = np.zeros((0, 2, self._numberOfWords), np.uint64)
+        self._phoneLiterals = np.zeros((0, 2, self._numberOfWords), np.uint64)
+        self._classCache    = OrderedDict()
+        self._featureMatrix = None
 
 
 
@@ -298,6 +711,25 @@ class AbstractPhoneticSystem:
     def getNamingList(self):
         return self._names
 
+    def getFeatureMatrix(self):
+        # Returns the features of the whole inventory as arrays (see
+        # FeatureMatrix), built once and kept until the inventory changes. The
+        # arrays are read-only, as they are shared by all the calls.
+        if self._featureMatrix is None:
+            symbols = [phone.getSymbol() for phone in self._inventory]
+            literals = unpackLiterals(self._phoneLiterals, len(self._features))
+            values = literals[:, 0].astype(np.int8) - \
+                     literals[:, 1].astype(np.int8)
+            packedValues = self._phoneLiterals[:, 0].copy()
+            specified = self._phoneLiterals[:, 0] | self._phoneLiterals[:, 1]
+            for array in [values, packedValues, specified]:
+                array.setflags(write=False)
+            self._featureMatrix = FeatureMatrix(
+                values, packedValues, specified,
+                {symbol: k for k, symbol in enumerate(symbols)},
+                {feature: k for k, feature in enumerate(self._features)})
+        return self._featureMatrix
+
 
     ###########
     # SETTERS #
@@ -309,24 +741,45 @@ class AbstractPhoneticSystem:
     def addPhone(self,phone):
         # This method adds a phone to the inventory of the phonetic system. It
         # must make a check that the new phone does not contradict the rules
-        # contained to that point on the rule book.
-        count = 0
-        for rule in self._rules:
-            flag = rule.isConsistent(phone)
-            if not flag:
-                count += 1
-        if count == 0:
-            self._inventory.append(phone)
-            flag = True
-        else:
-            flag = False
-        return flag
+        # contained to that point on the rule book. As the symbol identifies
+        # the phone, an empty phone, or one with the symbol of a phone already
+        # in the inventory, is not added either. The phone kept is the same
+        # phone with its features indexed by the list of the system.
+        phone = phone.setFeatureList(self._features)
+        symbol = phone.getSymbol()
+        if len(symbol) == 0 or symbol in self._symbolIndex:
+            return False
+        literals = phoneLiterals(phone, self._numberOfWords)
+        if violatedRules(literals, self._ruleMasks).any():
+            return False
+        self._inventory.append(phone)
+        self._symbolIndex[symbol] = phone
+        self._phoneLiterals = np.concatenate([self._phoneLiterals,
+                                              literals[np.newaxis]])
+        self.indexPhone(phone, len(self._inventory) - 1)
+        return True
 
     def addRule(self,rule):
         # This method adds a rule to the rule book of the system. It is
         # important to note that the new rule must be checked not to make the
-        # rule system inconsistent.
-        pass
+        # rule system inconsistent. It returns True if the rule is added, and
+        # False if some phone of the inventory violates it, or if with it the
+        # closure of the antecedents of some rule, its own included, has a
+        # contradiction. Only the closures that contain the antecedents of the
+        # new rule can change, so only those are propagated again.
+        masks = rule.getMasks(self._features)[np.newaxis]
+        if violatedRules(self._phoneLiterals, masks).any():
+            return False
+        ruleMasks = np.concatenate([self._ruleMasks, masks])
+        closures = np.concatenate([self._closures, masks[:, :2]])
+        affected = np.append(appliedRules(self._closures, masks)[:, 0], True)
+        closures[affected] = closeLiterals(closures[affected], ruleMasks)
+        if isContradictory(closures[affected]).any():
+            return False
+        self._rules.append(rule)
+        self._ruleMasks = ruleMasks
+        self._closures  = closures
+        return True
 
     def getMatches(self,conditions):
         # This function receives a list of pairs, called "conditions", where
@@ -342,74 +795,255 @@ class AbstractPhoneticSystem:
         #               given by:
         #               conditions = [["SYLLABIC", False], ["PHONATION","UNVOICED"]].
         #
-        matches = []
-        for phone in self._inventory:
-            tempFlag = True
-            for condition in conditions:
-                key = condition[0]
-                if key in self._features:
-                    value = phone.getFeatureValue(key)
-                    if value != None and value != condition[1]:
-                        tempFlag = False
-                elif key in self._names:
-                    value = phone.getNameValue(key)
-                    if value != condition[1]:
-                        tempFlag = False
-                else:
-                    tempFlag = False
-            if tempFlag:
-                matches.append(phone)
-        return matches
+        return self.phonesOf(self.getMatchBitset(conditions))
+
+    def getMatchBitset(self,conditions):
+        # This function returns the bitset of the phones that satisfy all the
+        # conditions (see getMatches), as an AND of the bitsets of the index.
+        # An unspecified feature matches any value, and a key that is neither
+        # a feature nor a naming cathegory matches no phone.
+        bitset = (1 << len(self._inventory)) - 1
+        for condition in conditions:
+            key = condition[0]
+            if key in self._features:
+                bitset &= self._featureBitsets.get((key, condition[1]), 0) | \
+                          self._unspecifiedBitsets.get(key, 0)
+            elif key in self._names:
+                bitset &= self._nameBitsets.get((key, condition[1]), 0)
+            else:
+                bitset = 0
+        return bitset
+
+    def phonesOf(self,bitset):
+        # This function returns the list of the phones of the inventory whose
+        # bits are set in the bitset, in the order of the inventory.
+        phones = []
+        while bitset:
+            lowestBit = bitset & -bitset
+            phones.append(self._inventory[lowestBit.bit_length() - 1])
+            bitset ^= lowestBit
+        return phones
+
+    def naturalClass(self,phones):
+        # This function returns the shortest list of pairs [feature, value]
+        # whose matches (see getMatches) are exactly the given phones, in the
+        # order of the list of features, or None if they are not a natural
+        # class of the inventory. The phones could be given as phones or
+        # symbols, or as the bitset of their positions in the inventory. The
+        # answers are kept, by bitset, for the last NATURAL_CLASS_CACHE_SIZE
+        # sets of phones asked, until the inventory changes.
+        if isinstance(phones, int):
+            target = phones
+        else:
+            symbols = set(phone if isinstance(phone, str) else
+                          phone.getSymbol() for phone in phones)
+            unknown = symbols.difference(self._symbolIndex)
+            if len(unknown) > 0:
+                errorString  = "The following phones are not in the "
+                errorString += "inventory: " + ", ".join(sorted(unknown)) + "."
+                raise ValueError(errorString)
+            target = 0
+            for position, phone in enumerate(self._inventory):
+                if phone.getSymbol() in symbols:
+                    target |= 1 << position
+        if target in self._classCache:
+            self._classCache.move_to_end(target)
+        else:
+            universe = (1 << len(self._inventory)) - 1
+            literals = [([feature, value],
+                         self._featureBitsets.get((feature, value), 0) |
+                         self._unspecifiedBitsets.get(feature, 0))
+                        for feature in self._features
+                        for value in [True, False]]
+            specification = minimalSpecification(target, universe, literals)
+            if specification is not None:
+                order = {feature: k for k, feature in enumerate(self._features)}
+                specification.sort(key=lambda literal: order[literal[0]])
+            self._classCache[target] = specification
+            if len(self._classCache) > NATURAL_CLASS_CACHE_SIZE:
+                self._classCache.popitem(last=False)
+        specification = self._classCache[target]
+        if specification is None:
+            return None
+        return [list(literal) for literal in specification]
+
+    def bulkLoad(self,phones,rules=None):
+        # This method adds many rules and phones at once: first the rules, whose
+        # consistency is checked in a single propagation of all of them, and
+        # then the phones, which are checked against the whole rule book with
+        # a few vectorized operations. Unlike addRule and addPhone, if some
+        # rule or phone cannot be added, nothing is added and it raises a
+        # ValueError that says which ones. The indexes are built once at the
+        # end (see rebuildIndex).
+        if rules is None:
+            rules = []
+        phones = [phone.setFeatureList(self._features) for phone in phones]
+        symbols = [phone.getSymbol() for phone in phones]
+        repeated = sorted(set(symbol for symbol in symbols
+                              if symbols.count(symbol) > 1 or
+                                 symbol in self._symbolIndex))
+        if any(len(symbol) == 0 for symbol in symbols) or len(repeated) > 0:
+            errorString  = "Every phone should have a symbol of its own. These "
+            errorString += "are repeated: " + ", ".join(repeated) + "."
+            raise ValueError(errorString)
+        ruleMasks = np.concatenate([self._ruleMasks] +
+                                   [rule.getMasks(self._features)[np.newaxis]
+                                    for rule in rules])
+        closures = closeLiterals(ruleMasks[:, :2], ruleMasks)
+        if isContradictory(closures).any():
+            errorString  = "The rule book would be inconsistent, as the "
+            errorString += "antecedents of some rule imply a contradiction."
+            raise ValueError(errorString)
+        literals = np.concatenate([self._phoneLiterals] +
+                                  [phoneLiterals(phone, self._numberOfWords)
+                                   [np.newaxis] for phone in phones])
+        violations = violatedRules(literals, ruleMasks).any(axis=1)
+        if violations.any():
+            inventory = self._inventory + phones
+            errorString  = "The following phones violate the rule book: "
+            errorString += ", ".join(inventory[k].getSymbol() for k in
+                                     np.flatnonzero(violations)) + "."
+            raise ValueError(errorString)
+        self._rules        += list(rules)
+        self._ruleMasks     = ruleMasks
+        self._closures      = closures
+        self._inventory    += phones
+        self._phoneLiterals = literals
+        self.rebuildIndex()
+
+    def rebuildIndex(self):
+        # This method builds again the symbol index and the bitsets of the
+        # inventory (see indexPhone), the ones of the features from the bit
+        # masks of all the phones at once.
+        self._symbolIndex = {phone.getSymbol(): phone
+                             for phone in self._inventory}
+        self._featureBitsets     = {}
+        self._unspecifiedBitsets = {}
+        self._nameBitsets        = {}
+        self.clearCaches()
+        literals = unpackLiterals(self._phoneLiterals, len(self._features))
+        for k, feature in enumerate(self._features):
+            isTrue, isFalse = literals[:, 0, k], literals[:, 1, k]
+            self._featureBitsets[(feature, True)]  = bitsetOf(isTrue)
+            self._featureBitsets[(feature, False)] = bitsetOf(isFalse)
+            self._unspecifiedBitsets[feature] = bitsetOf(~isTrue & ~isFalse)
+        for position, phone in enumerate(self._inventory):
+            name = phone.getName()
+            for cathegory in self._names:
+                if cathegory in name:
+                    key = (cathegory, name[cathegory])
+                    self._nameBitsets[key] = \
+                            self._nameBitsets.get(key, 0) | (1 << position)
+
+    def indexPhone(self,phone,position):
+        # This method sets the bit of the phone, which is at the given position
+        # of the inventory, in the bitsets of its feature values and names.
+        bit = 1 << position
+        self.clearCaches()
+        features = phone.getFeatures()
+        for feature in self._features:
+            value = features.get(feature)
+            if value is None:
+                self._unspecifiedBitsets[feature] = \
+                                self._unspecifiedBitsets.get(feature, 0) | bit
+            else:
+                key = (feature, value)
+                self._featureBitsets[key] = \
+                                self._featureBitsets.get(key, 0) | bit
+        name = phone.getName()
+        for cathegory in self._names:
+            if cathegory in name:
+                key = (cathegory, name[cathegory])
+                self._nameBitsets[key] = self._nameBitsets.get(key, 0) | bit
+
+    def clearCaches(self):
+        # This method discards the natural classes and the feature matrix kept
+        # by the system, when the inventory changes.
+        self._classCache.clear()
+        self._featureMatrix = None
 
     def findPhoneBySymbol(self,symbol):
         # This function returns the phone in the Phonetic System with the given
-        # symbol. If such phone does not exists, it returns an empty phone.
-        K = len(self._inventory)
-        k = 0
-        flag = True
-        thePhone = None
-
-        while k < K and flag:
-            s = self._inventory[k].getSymbol()
-            if s == symbol:
-                thePhone = self._inventory[k]
-                flag = False
-            else:
-                k += 1
-        if thePhone == None:
-            thePhone = AbstractPhone({},{},"")
-        return thePhone
+        # symbol. If such phone does not exists, it returns EMPTY_PHONE, the
+        # empty phone shared by all the misses, so no phone is built.
+        return self._symbolIndex.get(symbol, EMPTY_PHONE)
 
 
 
 
 
-######################
-######################
-##                  ##
-##  CLASS SOMECLASS ##
-##                  ##
-######################
-######################
+########################
+########################
+##                    ##
+##  CLASS FEATURERULE ##
+##                    ##
+########################
+########################
 
 class FeatureRule:
-    # Description.
+    # This class implements a rule of the rule book of a phonetic system. It
+    # has two lists of pairs [feature, value], with value True or False: the
+    # antecedents and the consequents. For example, +CONSONANTAL implies
+    # -SYLLABIC is FeatureRule([["CONSONANTAL", True]], [["SYLLABIC", False]]).
+    # A phone satisfies the antecedents if it has all their values, and it
+    # violates the rule if it satisfies them but has the opposite value of one
+    # of the consequents. A consequent that the phone leaves unspecified is not
+    # a violation, as it could still be specified either way.
+    #
+    # To check phones against the whole rule book at once, the phonetic system
+    # compiles every rule to four bit masks over its list of features (see
+    # getMasks).
 
     ##############
     # ATTRIBUTES #
     ##############
-    _antecedents = []
-    _consequents = []
+    _antecedents = ()
+    _consequents = ()
 
 
     ############
     # CREATORS #
     ############
+    def __init__(self,antecedents,consequents):
+        # The antecedents should not require a feature to be both True and
+        # False, as then the rule would never apply.
+        self._antecedents = validateLiterals(antecedents)
+        self._consequents = validateLiterals(consequents)
+        values = dict(self._antecedents)
+        for feature, value in self._antecedents:
+            if values[feature] != value:
+                errorString  = "The antecedents require the feature "
+                errorString += str(feature) + " to be both True and False."
+                raise ValueError(errorString)
 
 
     ###########
     # GETTERS #
     ###########
+    def getAntecedents(self):
+        return [list(pair) for pair in self._antecedents]
+
+    def getConsequents(self):
+        return [list(pair) for pair in self._consequents]
+
+    def getMasks(self,featureList):
+        # Returns an array of shape (4, words) and type uint64, whose rows are
+        # the bit masks, over the features of the list (see toWords), of the
+        # features that the antecedents require True, the ones that they
+        # require False, and the same for the consequents.
+        featureIndex = internFeatureIndex(featureList)
+        masks = [0, 0, 0, 0]
+        for offset, literals in [(0, self._antecedents),
+                                 (2, self._consequents)]:
+            for feature, value in literals:
+                if feature not in featureIndex:
+                    errorString  = "The feature " + str(feature) + " of the "
+                    errorString += "rule is not in the list of features."
+                    raise ValueError(errorString)
+                masks[offset + (0 if value else 1)] |= \
+                                                1 << featureIndex[feature]
+        numberOfWords = wordsFor(len(featureIndex))
+        return np.stack([toWords(mask, numberOfWords) for mask in masks])
 
 
     ###########
@@ -427,7 +1061,64 @@ class FeatureRule:
         # satisfied, this is, the rule is fulfilled, then, it returns True. If
         # all the antecedents are satisfied, but not all the consequents are,
         # then the rule is violated, and this method returns False.
-        pass
+        features = phone.getFeatures()
+        applies = all(features.get(feature) == value
+                      for feature, value in self._antecedents)
+        return not applies or all(features.get(feature) in (value, None)
+                                  for feature, value in self._consequents)
+
+
+###########################
+###########################
+##                       ##
+##  CLASS FEATUREMATRIX  ##
+##                       ##
+###########################
+###########################
+class FeatureMatrix:
+    # Container of the features of the inventory of a phonetic system as
+    # arrays, with a row for every phone, in the order of the inventory, and a
+    # column for every feature, in the order of the list of features of the
+    # system (see AbstractPhoneticSystem.getFeatureMatrix). It has them in two
+    # forms:
+    #
+    # - values: Array of type int8, with +1, -1 and 0 for the features with
+    #           value True, value False and unspecified.
+    #
+    # - packedValues and specified: Arrays of type uint64 and shape (phones,
+    #           words), with the bit masks (see toWords) of the features with
+    #           value True and of the specified ones, laid out as the masks of
+    #           FeatureRule.getMasks.
+    #
+    # symbolIndex and featureIndex are read-only dictionaries from the symbol
+    # of a phone to its row and from a feature to its column.
+
+    def __init__(self, values, packedValues, specified, symbolIndex,
+                 featureIndex):
+        self.values       = values
+        self.packedValues = packedValues
+        self.specified    = specified
+        self.symbolIndex  = MappingProxyType(symbolIndex)
+        self.featureIndex = MappingProxyType(featureIndex)
+
+    def __len__(self):
+        return len(self.values)
+
+
+
+
+####################
+# SHARED INSTANCES #
+####################
+# The empty phone returned by every lookup of a symbol that is not in the
+# inventory.
+EMPTY_PHONE = AbstractPhone({},{},"")
+
+# The meaning of the values of the tables of features (see systemFromTable).
+# Empty cells are unspecified features too.
+FEATURE_VALUES = {True: True, "+": True, "True": True,
+                  False: False, "-": False, "False": False,
+                  "0": None, "\u00b1": None, "": None}
 
 
 ###############
@@ -38,25 +38,9 @@
 # This module contains the methods, classes and variables necessary for the
 # implementation of a phonetic system necessary for a research project.
 
-##hay un problema en la creacion del objeto.
-acousticPhonetics = AbstractPhoneticSystem()
-
-##objeto no instanciado.
-acousticPhonetics.addPhone(
-    AbstractPhone(
-        {"HIGH": True,
-         "LOW":False,
-         "BACK":False,
-         "ROUND":False,
-         "TENSE":True
-         },
-         {
-         ""
-         },
-         "i"
-
-    )
-)
+import abstractphonetics as ap
+import symboltable as st
+
 consonants = {
     "p": {"sonorante": False, "sonora": False, "nasal": False, "continua": False, "del rel": False, "lateral": False,
           "labial": True, "coronal": False, "dorsal": False},
@@ -117,6 +101,47 @@ consonants = {
 vowels = {"i":{"cerrada":True,"abierta":False,"laxa":False,"posterior":False,"redondeada":False},"\u026f":{"cerrada":True,"abierta":False,"laxa":False,"posterior":True,"redondeada":False},"u":{"cerrada":True,"abierta":False,"laxa":False,"posterior":True,"redondeada":True},"\u026a":{"cerrada":True,"abierta":False,"laxa":True,"posterior":False,"redondeada":False},"\u028a":{"cerrada":True,"abierta":False,"laxa":True,"posterior":True,"redondeada":True},"e":{"cerrada":False,"abierta":False,"laxa":False,"posterior":False,"redondeada":False},"\u0264":{"cerrada":False,"abierta":False,"laxa":False,"posterior":True,"redondeada":False},"o":{"cerrada":False,"abierta":False,"laxa":False,"posterior":True,"redondeada":True},"a":{"cerrada":False,"abierta":True,"laxa":False,"posterior":"\u00b1","redondeada":False},"\u0254":{"cerrada":False,"abierta":True,"laxa":False,"posterior":True,"redondeada":True}}
 
 
+def ipaTable(table):
+    # Returns the table with its symbols, written with escaped code points as
+    # "u0294", replaced by their canonical IPA symbols, the ones of the shared
+    # table of symbols (see symboltable.SymbolTable), without interning them.
+    return {st.canonicalSymbol(st.toIpa(symbol, st.ESCAPED)): features
+            for symbol, features in table.items()}
+
+
+def tenseFeatures(features):
+    # Returns the features of a vowel of the table above with "laxa" (lax)
+    # turned into TENSE, its opposite.
+    features = dict(features)
+    features["TENSE"] = not features.pop("laxa")
+    return features
+
+
+# Names of the features of the tables above in the list phonetics.FEATURES.
+FEATURE_NAMES = {"sonorante": "SONORANT",
+                 "sonora": "VOICE",
+                 "nasal": "NASAL",
+                 "continua": "CONTINUANT",
+                 "del rel": "DELAYED_RELEASE",
+                 "lateral": "LATERAL",
+                 "labial": "LABIAL",
+                 "coronal": "CORONAL",
+                 "dorsal": "DORSAL",
+                 "cerrada": "HIGH",
+                 "abierta": "LOW",
+                 "posterior": "BACK",
+                 "redondeada": "ROUND"}
+
+# The system is built from both tables at once, with the IPA symbols. The
+# features of the vowels that the consonants do not have, and the other way
+# around, are left unspecified.
+acousticPhonetics = ap.systemFromTable(
+    {**ipaTable(consonants),
+     **{symbol: tenseFeatures(features) for symbol, features in
+        ipaTable(vowels).items()}},
+    featureNames=FEATURE_NAMES)
+
+
 
 
 
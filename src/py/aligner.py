@@ -36,23 +36,1862 @@
 # This module contains the methods, classes and variables necessary for the
 # implementation of a phonetic system necessary for a research project.
 
+import hashlib
+import time
+import warnings
 
+import numpy as np
+
+from multiprocessing import Pool
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+###################
+###################
+###################
+###             ###
+###             ###
+###   CLASSES   ###
+###             ###
+###             ###
+###################
+###################
+###################
+
+
+###############
+###############
+##           ##
+##  ALIGNER  ##
+##           ##
+###############
+###############
 class Aligner:
+    # Class that aligns sequences of integer codes (phonemes, aminoacids, nucleotides,
+    # etc.) from an alphabet of size N. The score of aligning the codes a and b is
+    # substitutionMatrix[a, b], and gaps are affine: a gap of length L costs
+    # gapOpen + gapExtend * (L - 1), with gapOpen >= gapExtend >= 0. The distance of an
+    # alignment is the average, over its columns, of distanceMatrix[a, b], counting
+    # gapDistance for every code aligned to a gap. If no distance matrix is given, it is
+    # taken as 1 - substitutionMatrix, as in the module chibcha.
+    #
+    # If baseScore is given, the substitution matrix must be baseScore minus the
+    # distance matrix, and the scores are computed from the distances, as chibcha does
+    # (see fillMatrices). This is what fromDistanceMatrix builds.
+
+    def __init__(self, substitutionMatrix, gapOpen=0, gapExtend=0, distanceMatrix=None,
+                 gapDistance=1, scoreType=np.float32, baseScore=None):
+        substitutionMatrix = np.asarray(substitutionMatrix)
+        if substitutionMatrix.ndim != 2 or \
+                        substitutionMatrix.shape[0] != substitutionMatrix.shape[1]:
+            errorString  = "The substitution matrix should be a square matrix. It is not."
+            raise ValueError(errorString)
+        if not gapOpen >= gapExtend >= 0:
+            errorString  = "The gap penalties should satisfy gapOpen >= gapExtend >= 0. "
+            errorString += "They do not."
+            raise ValueError(errorString)
+        if distanceMatrix is None:
+            distanceMatrix = 1 - substitutionMatrix
+        distanceMatrix = np.asarray(distanceMatrix, dtype=np.float64)
+        if distanceMatrix.shape != substitutionMatrix.shape:
+            errorString  = "The distance matrix and the substitution matrix should have "
+            errorString += "the same shape. They do not."
+            raise ValueError(errorString)
+        self.scoreType          = scoreType
+        self.substitutionMatrix = substitutionMatrix.astype(scoreType)
+        self.distanceMatrix     = distanceMatrix
+        self.gapOpen            = scoreType(gapOpen)
+        self.gapExtend          = scoreType(gapExtend)
+        self.gapDistance        = gapDistance
+        self.alphabetSize       = substitutionMatrix.shape[0]
+        self.baseScore          = None if baseScore is None else scoreType(baseScore)
+        self.costMatrix         = distanceMatrix.astype(scoreType)
+        self.profileMatrix      = self.extendedMatrix()
+        self.PROFILES           = PROFILES
+        self.GENETIC            = GENETIC
+
+
+    def singleAlignment(self, sequence1, sequence2, isGlobal=True, bandWidth=None,
+                        scoreCutoff=None):
+        # Aligns the two sequences, globally (Needleman-Wunsch) if isGlobal is True, or
+        # locally (Smith-Waterman) otherwise, and returns an Alignment object. When
+        # there are several optimal alignments, the traceback prefers, at every cell,
+        # the diagonal, then the gap in the first sequence (left) and then the gap in
+        # the second sequence (up), and prefers opening gaps to extending them, so with
+        # no gap penalties it gives the same alignment as chibcha.alignWords.
+        #
+        # If bandWidth is given (a non negative integer, or AUTO_BAND to derive it from
+        # the lengths of the sequences), only the cells close to the diagonal are filled
+        # (see bandedAlignment), which saves time and memory for long sequences. The
+        # band only applies to global alignments: local ones always fill the whole
+        # matrix, so their score is the optimal one.
+        #
+        # If scoreCutoff is given, it returns None when the score is below it. A global
+        # alignment of the full matrix then stops as soon as a row or an anti-diagonal
+        # proves it (see cutoffBound), which saves most of the work for pairs that are
+        # far apart.
+        sequence1 = self.validateSequence(sequence1)
+        sequence2 = self.validateSequence(sequence2)
+        if bandWidth is None:
+            result = self.fullAlignment(sequence1, sequence2, isGlobal, scoreCutoff)
+        else:
+            result = self.bandedAlignment(sequence1, sequence2, isGlobal, bandWidth)
+        if result is None or (scoreCutoff is not None and result[0] < scoreCutoff):
+            return None
+        score, path1, path2 = result
+        return self.makeAlignment(sequence1, sequence2, path1, path2, score)
+
+
+    def fullAlignment(self, sequence1, sequence2, isGlobal, scoreCutoff=None):
+        # Fills the whole dynamic programming matrices and returns the score and the
+        # positions aligned by the traceback, or None if the filling stopped because
+        # the score could not reach scoreCutoff.
+        filled = self.alignmentFlags(sequence1, sequence2, isGlobal, scoreCutoff)
+        if filled is None:
+            return None
+        score, end1, end2, flags = filled
+        path1, path2 = traceback(flags, end1, end2, isGlobal)
+        return score, path1, path2
+
+
+    def alignmentFlags(self, sequence1, sequence2, isGlobal, scoreCutoff=None):
+        # Returns the score, the end cell and the traceback flags of the alignment of
+        # two validated sequences (see fillMatrices), or None if the filling stopped
+        # because the score could not reach scoreCutoff. The filling only stops when
+        # the bound is below the cutoff by more than the possible rounding errors.
+        scores = self.cellScores(sequence1, sequence2)
+        bestScore = 0
+        if scoreCutoff is not None and scores.size > 0:
+            if self.baseScore is None:
+                bestScore = max(0, float(scores.max()))
+            else:
+                bestScore = max(0, float(self.baseScore) - float(scores.min()))
+            scale = bestScore + float(np.abs(scores).max()) + float(self.gapOpen) + \
+                    abs(float(self.baseScore or 0))
+            scoreCutoff = scoreCutoff - self.roundingMargin(len(sequence1),
+                                                            len(sequence2), scale)
+        return fillMatrices(scores, self.gapOpen, self.gapExtend, isGlobal,
+                            self.baseScore, scoreCutoff, bestScore)
+
+
+    def countOptimalAlignments(self, sequence1, sequence2, isGlobal=True):
+        # Returns the number of optimal alignments of the two sequences (see
+        # countPaths), without enumerating them.
+        sequence1 = self.validateSequence(sequence1)
+        sequence2 = self.validateSequence(sequence2)
+        _, end1, end2, flags = self.alignmentFlags(sequence1, sequence2, isGlobal)
+        return countPaths(flags, end1, end2, isGlobal)
+
+
+    def optimalAlignments(self, sequence1, sequence2, isGlobal=True):
+        # Generates, one at a time, all the optimal alignments of the two sequences, as
+        # Alignment objects (see optimalPaths). The first one is the alignment of
+        # singleAlignment.
+        sequence1 = self.validateSequence(sequence1)
+        sequence2 = self.validateSequence(sequence2)
+        score, end1, end2, flags = self.alignmentFlags(sequence1, sequence2, isGlobal)
+        for path1, path2 in optimalPaths(flags, end1, end2, isGlobal):
+            yield self.makeAlignment(sequence1, sequence2, path1, path2, score)
+
+
+    def closestOptimalAlignment(self, sequence1, sequence2, isGlobal=True):
+        # Returns, among all the optimal alignments of the two sequences, the one with
+        # the least distance (see closestPath), without enumerating them.
+        sequence1 = self.validateSequence(sequence1)
+        sequence2 = self.validateSequence(sequence2)
+        score, end1, end2, flags = self.alignmentFlags(sequence1, sequence2, isGlobal)
+        path1, path2 = closestPath(flags, end1, end2, isGlobal,
+                                   self.distanceMatrix[np.ix_(sequence1, sequence2)],
+                                   float(self.gapDistance))
+        return self.makeAlignment(sequence1, sequence2, path1, path2, score)
+
+
+    def bandedAlignment(self, sequence1, sequence2, isGlobal, bandWidth):
+        # Aligns the sequences filling only the cells (i, j) with j - i between
+        # min(0, m - n) - bandWidth and max(0, m - n) + bandWidth, where n and m are
+        # the lengths of the sequences, so the band always contains the diagonals that
+        # join the corners of the matrix. Time and memory are O(n * bandWidth).
+        #
+        # In global mode, the result is checked against an upper bound of the score of
+        # every alignment that leaves the band (see outsideBandBound). If the bound is
+        # not below the score found, the band is doubled and the alignment repeated,
+        # so the score is always the optimal one (among several optimal alignments, the
+        # one returned may differ from the one of the full matrix). Once the band
+        # covers the whole matrix, the full alignment is used.
+        #
+        # A local alignment may lie anywhere in the matrix, far from the band, and no
+        # useful bound of its score can be found from the band alone, so in local mode
+        # the whole matrix is always filled.
+        n = len(sequence1)
+        m = len(sequence2)
+        margin = self.bandMargin(n, m, bandWidth)
+        if not isGlobal:
+            return self.fullAlignment(sequence1, sequence2, isGlobal)
+        while True:
+            lowOffset  = max(-n, min(0, m-n) - margin)
+            highOffset = min(m, max(0, m-n) + margin)
+            if lowOffset == -n and highOffset == m:
+                return self.fullAlignment(sequence1, sequence2, isGlobal)
+            scores = self.bandScores(sequence1, sequence2, lowOffset, highOffset)
+            score, end1, end2, flags = fillBand(scores, m, self.gapOpen, self.gapExtend,
+                                                isGlobal, self.baseScore, lowOffset)
+            path1, path2 = traceback(flags, end1, end2, isGlobal, lowOffset)
+            if score >= self.outsideBandBound(sequence1, sequence2, lowOffset,
+                                              highOffset):
+                return score, path1, path2
+            margin = max(1, 2*margin)
+
+
+    def bandMargin(self, n, m, bandWidth):
+        # Returns the number of diagonals that the band has at each side of the ones
+        # that join the corners of the matrix.
+        if isinstance(bandWidth, str) and bandWidth == AUTO_BAND:
+            return max(MINIMUM_BAND_MARGIN, int(BAND_FRACTION * min(n, m)))
+        if isinstance(bandWidth, (bool, np.bool_)) or \
+                        not isinstance(bandWidth, (int, np.integer)) or bandWidth < 0:
+            errorString  = "The band width should be a non negative integer or "
+            errorString += AUTO_BAND + ". It is not."
+            raise ValueError(errorString)
+        return int(bandWidth)
+
+
+    def bandScores(self, sequence1, sequence2, lowOffset, highOffset):
+        # Returns the matrix of cell scores (see cellScores) in the coordinates of the
+        # band (see fillBand), with zeros in the cells that are outside the matrix.
+        n = len(sequence1)
+        m = len(sequence2)
+        width = highOffset - lowOffset + 1
+        i = np.arange(1, n+1)[:, np.newaxis]
+        j = i + lowOffset + np.arange(width+2)[np.newaxis, :] - 1
+        inside = (j >= 1) & (j <= m)
+        inside[:, 0] = False
+        inside[:, -1] = False
+        matrix = self.costMatrix if self.baseScore is not None \
+                                 else self.substitutionMatrix
+        scores = np.zeros((n, width+2), dtype=self.scoreType)
+        rows, columns = np.nonzero(inside)
+        scores[rows, columns] = matrix[sequence1[rows], sequence2[j[rows, columns]-1]]
+        return scores
+
+
+    def outsideBandBound(self, sequence1, sequence2, lowOffset, highOffset):
+        # Returns an upper bound of the score of any global alignment that goes through
+        # a cell outside the band. Such an alignment passes through one of the
+        # diagonals lowOffset - 1 or highOffset + 1, and reaching the diagonal j - i = k
+        # on the way from (0, 0) to (n, m) takes at least G = |k| + |m - n - k| gaps.
+        # Then it has at most (n + m - G) / 2 columns without gaps, each scoring at most
+        # the best score s of the codes of the sequences, and its gaps cost at least
+        # gapOpen + gapExtend * (G - 1), so its score is at most
+        # max(s, 0) * (n + m - G) / 2 - (gapOpen + gapExtend * (G - 1)).
+        n = len(sequence1)
+        m = len(sequence2)
+        codes = np.ix_(np.unique(sequence1), np.unique(sequence2))
+        if self.baseScore is None:
+            bestScore = float(self.substitutionMatrix[codes].max())
+        else:
+            bestScore = float(self.baseScore) - float(self.costMatrix[codes].min())
+        bestScore = max(bestScore, 0)
+        bound = -np.inf
+        for offset in [lowOffset - 1, highOffset + 1]:
+            if -n <= offset <= m:
+                gaps = abs(offset) + abs(m - n - offset)
+                gapCost = float(self.gapOpen) + float(self.gapExtend) * (gaps - 1)
+                bound = max(bound, bestScore * (n + m - gaps) / 2 - gapCost)
+        return bound
+
+
+    def alignBatch(self, sequences1, sequences2, lengths1, lengths2, isGlobal=True,
+                   returnAlignments=False):
+        # Aligns many pairs of sequences at once. sequences1 and sequences2 are arrays
+        # of shape (pairs, length), whose k-th rows hold the k-th pair of sequences,
+        # padded after lengths1[k] and lengths2[k] codes with any values (see
+        # padSequences). Every pair gets exactly the alignment of singleAlignment, but
+        # the dynamic programming runs for many pairs in each NumPy call, which is
+        # much faster for short sequences, like words. The pairs are sorted by length
+        # and aligned in chunks of at most BATCH_CELLS cells, so memory is bounded.
+        #
+        # Returns a BatchAlignment object, with the aligned sequences only if
+        # returnAlignments is True.
+        sequences1, lengths1 = self.validateBatch(sequences1, lengths1)
+        sequences2, lengths2 = self.validateBatch(sequences2, lengths2)
+        if len(lengths1) != len(lengths2):
+            errorString  = "There should be as many sequences in both sides of the "
+            errorString += "batch. There are not."
+            raise ValueError(errorString)
+        size = len(lengths1)
+        scores = np.zeros(size, dtype=self.scoreType)
+        distances = np.zeros(size, dtype=np.float64)
+        alignedSequences1 = [None] * size if returnAlignments else None
+        alignedSequences2 = [None] * size if returnAlignments else None
+        for chunk in batchChunks(lengths1, lengths2):
+            n = lengths1[chunk].max()
+            m = lengths2[chunk].max()
+            codes1 = sequences1[chunk, :n]
+            codes2 = sequences2[chunk, :m]
+            if self.baseScore is None:
+                scoreMatrix = self.substitutionMatrix[codes1[:, :, np.newaxis],
+                                                      codes2[:, np.newaxis, :]]
+            else:
+                scoreMatrix = self.costMatrix[codes1[:, :, np.newaxis],
+                                              codes2[:, np.newaxis, :]]
+            H, X, Y, flags = fillAll(scoreMatrix, self.gapOpen, self.gapExtend,
+                                     isGlobal, self.baseScore)
+            rows = np.arange(len(chunk))
+            if isGlobal:
+                end1 = lengths1[chunk]
+                end2 = lengths2[chunk]
+            else:
+                outside = (np.arange(n+1)[np.newaxis, :, np.newaxis] >
+                           lengths1[chunk][:, np.newaxis, np.newaxis]) | \
+                          (np.arange(m+1)[np.newaxis, np.newaxis, :] >
+                           lengths2[chunk][:, np.newaxis, np.newaxis])
+                H[outside] = -np.inf
+                end1, end2 = np.unravel_index(np.argmax(H.reshape(len(chunk), -1),
+                                                        axis=1), H.shape[1:])
+            scores[chunk] = H[rows, end1, end2]
+            paths1, paths2, columns = batchTraceback(flags, end1, end2, isGlobal)
+            aligned1 = np.full(paths1.shape, GAP, dtype=np.int64)
+            aligned2 = np.full(paths2.shape, GAP, dtype=np.int64)
+            isCode1 = paths1 != GAP
+            isCode2 = paths2 != GAP
+            aligned1[isCode1] = codes1[np.nonzero(isCode1)[0], paths1[isCode1]]
+            aligned2[isCode2] = codes2[np.nonzero(isCode2)[0], paths2[isCode2]]
+            distances[chunk] = self.batchDistances(aligned1, aligned2, columns)
+            if returnAlignments:
+                for k in range(len(chunk)):
+                    alignedSequences1[chunk[k]] = aligned1[k, :columns[k]]
+                    alignedSequences2[chunk[k]] = aligned2[k, :columns[k]]
+        return BatchAlignment(scores, distances, alignedSequences1, alignedSequences2)
+
+
+    def validateBatch(self, sequences, lengths):
+        # Returns the padded sequences and their lengths of a batch as arrays of
+        # integers, checking that the lengths fit in the array and that the codes
+        # before the padding are in the alphabet. The padding is replaced by zeros.
+        sequences = np.asarray(sequences)
+        lengths = np.asarray(lengths)
+        if sequences.ndim == 2 and sequences.shape[1] == 0:
+            sequences = np.zeros(sequences.shape, dtype=np.int64)
+        if sequences.ndim != 2 or not np.issubdtype(sequences.dtype, np.integer) or \
+                        lengths.shape != (sequences.shape[0],) or \
+                        (lengths.size > 0 and not np.issubdtype(lengths.dtype,
+                                                                np.integer)):
+            errorString  = "The batches should be two dimensional arrays of integer "
+            errorString += "codes, with a length for each row. At least one is not."
+            raise ValueError(errorString)
+        lengths = lengths.astype(np.int64)
+        if lengths.size > 0 and (lengths.min() < 0 or
+                                 lengths.max() > sequences.shape[1]):
+            errorString  = "The lengths of the sequences should be between 0 and the "
+            errorString += "width of the batch. At least one is not."
+            raise ValueError(errorString)
+        inside = np.arange(sequences.shape[1])[np.newaxis, :] < lengths[:, np.newaxis]
+        codes = sequences[inside]
+        if codes.size > 0 and (codes.min() < 0 or codes.max() >= self.alphabetSize):
+            errorString  = "The sequences should only contain codes between 0 and "
+            errorString += str(self.alphabetSize - 1) + ". At least one does not."
+            raise ValueError(errorString)
+        return np.where(inside, sequences, 0).astype(np.int64), lengths
+
+
+    def batchDistances(self, aligned1, aligned2, columns):
+        # Returns the distances of a batch of alignments, given as padded arrays with
+        # their number of columns, adding the distances of the columns in the same
+        # order as alignedDistance, so the results are the same.
+        gaps = (aligned1 == GAP) | (aligned2 == GAP)
+        columnDistances = np.where(gaps, float(self.gapDistance),
+                                   self.distanceMatrix[np.maximum(aligned1, 0),
+                                                       np.maximum(aligned2, 0)])
+        columnDistances[np.arange(aligned1.shape[1])[np.newaxis, :] >=
+                        columns[:, np.newaxis]] = 0
+        total = np.zeros(len(columns), dtype=np.float64)
+        for k in range(aligned1.shape[1]):
+            total += columnDistances[:, k]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(columns > 0, total / np.maximum(columns, 1), np.nan)
+
+
+    def isWithinDistance(self, sequence1, sequence2, cutoff):
+        # Returns True if the distance of the global alignment of the two sequences
+        # (the one of singleAlignment) is at most cutoff. It first tries to prove that
+        # it is not without any dynamic programming (see distanceLowerBounds) and then,
+        # if the aligner has a base score, the alignment stops as soon as its score
+        # shows that the distance is above the cutoff (see scoreCutoff). Two empty
+        # sequences have no distance, so they are never within it.
+        sequence1 = self.validateSequence(sequence1)
+        sequence2 = self.validateSequence(sequence2)
+        n = len(sequence1)
+        m = len(sequence2)
+        if n + m == 0:
+            return False
+        bound = self.distanceLowerBounds(sequence1[np.newaxis, :],
+                                         sequence2[np.newaxis, :], [n], [m])[0]
+        if bound > cutoff + CUTOFF_TOLERANCE:
+            return False
+        alignment = self.singleAlignment(sequence1, sequence2,
+                                         scoreCutoff=self.scoreCutoff(n, m, cutoff))
+        return alignment is not None and alignment.distance <= cutoff
+
+
+    def screenBatch(self, sequences1, sequences2, lengths1, lengths2, cutoff):
+        # Returns the distances of the global alignments of a batch of pairs of
+        # sequences, given as in alignBatch, with np.inf for every pair whose distance
+        # is above cutoff (or NaN, for two empty sequences). Only the pairs that
+        # distanceLowerBounds cannot discard are aligned, so when most of the pairs are
+        # far apart, as in the search of cognate candidates, most of the work is
+        # pruning.
+        sequences1, lengths1 = self.validateBatch(sequences1, lengths1)
+        sequences2, lengths2 = self.validateBatch(sequences2, lengths2)
+        bounds = self.distanceLowerBounds(sequences1, sequences2, lengths1, lengths2)
+        distances = np.full(len(bounds), np.inf)
+        with np.errstate(invalid="ignore"):
+            survivors = np.nonzero(~(bounds > cutoff + CUTOFF_TOLERANCE))[0]
+        batch = self.alignBatch(sequences1[survivors], sequences2[survivors],
+                                lengths1[survivors], lengths2[survivors])
+        with np.errstate(invalid="ignore"):
+            distances[survivors] = np.where(batch.distances > cutoff, np.inf,
+                                            batch.distances)
+        return distances
+
+
+    def distanceLowerBounds(self, sequences1, sequences2, lengths1, lengths2):
+        # Returns, for a batch of pairs of sequences given as in alignBatch, a lower
+        # bound of the distance of every global alignment of each pair, computed only
+        # from the lengths and the histograms of the codes, with no dynamic
+        # programming (NaN for two empty sequences). An alignment of sequences of
+        # lengths n and m with M columns without gaps has n + m - 2M columns with a
+        # gap, and at most c of its columns align a code with itself, where c is the
+        # number of codes that the sequences share, counting repetitions. If d is the
+        # least distance between two different codes of the sequences and s the least
+        # distance of a shared code with itself, the distance of the alignment is at
+        # least (M * d - min(M, c) * max(d - s, 0) + (n + m - 2M) * gapDistance) /
+        # (n + m - M), and the bound is the least of these values over M.
+        sequences1, lengths1 = self.validateBatch(sequences1, lengths1)
+        sequences2, lengths2 = self.validateBatch(sequences2, lengths2)
+        if len(lengths1) != len(lengths2):
+            errorString  = "There should be as many sequences in both sides of the "
+            errorString += "batch. There are not."
+            raise ValueError(errorString)
+        size = len(lengths1)
+        bounds = np.full(size, np.nan)
+        isSame = np.eye(self.alphabetSize, dtype=bool)
+        chunkSize = max(1, BATCH_CELLS // self.alphabetSize**2)
+        for start in range(0, size, chunkSize):
+            chunk = np.arange(start, min(size, start + chunkSize))
+            counts1 = codeCounts(sequences1[chunk], lengths1[chunk], self.alphabetSize)
+            counts2 = codeCounts(sequences2[chunk], lengths2[chunk], self.alphabetSize)
+            shared = np.minimum(counts1, counts2).sum(axis=1)
+            isPresent = (counts1[:, :, np.newaxis] > 0) & \
+                        (counts2[:, np.newaxis, :] > 0)
+            sameDistance = np.where(isPresent & isSame, self.distanceMatrix,
+                                    np.inf).min(axis=(1, 2), initial=np.inf)
+            otherDistance = np.where(isPresent & ~isSame, self.distanceMatrix,
+                                     np.inf).min(axis=(1, 2), initial=np.inf)
+            hasSame = np.isfinite(sameDistance)
+            otherDistance = np.where(np.isfinite(otherDistance), otherDistance,
+                                     np.where(hasSame, sameDistance, 0))
+            gain = np.where(hasSame, np.maximum(otherDistance - sameDistance, 0), 0)
+            n = lengths1[chunk][:, np.newaxis]
+            m = lengths2[chunk][:, np.newaxis]
+            M = np.arange(min(lengths1[chunk].max(initial=0),
+                              lengths2[chunk].max(initial=0)) + 1)[np.newaxis, :]
+            columns = n + m - M
+            isValid = (M <= np.minimum(n, m)) & (columns > 0)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                values = (M * otherDistance[:, np.newaxis] -
+                          np.minimum(M, shared[:, np.newaxis]) * gain[:, np.newaxis] +
+                          (n + m - 2*M) * float(self.gapDistance)) / columns
+            values = np.where(isValid, values, np.inf).min(axis=1)
+            bounds[chunk] = np.where(np.isfinite(values), values, np.nan)
+        return bounds
+
+
+    def scoreCutoff(self, n, m, cutoff):
+        # Returns a score below which the global alignment of two sequences of lengths
+        # n and m is sure to have a distance above cutoff, or None if the aligner has
+        # no base score, as then scores and distances are not related. With a base
+        # score b, the costs are the distances, so an alignment with M columns without
+        # gaps and a distance of at most cutoff has costs adding up to at most
+        # cutoff * (n + m - M) - (n + m - 2M) * gapDistance, and its gaps cost at most
+        # gapOpen per column, so its score is at least
+        # M * b - cutoff * (n + m - M) + (n + m - 2M) * (gapDistance - gapOpen).
+        # This is linear in M, so the least value is at M = 0 or M = min(n, m). It is
+        # lowered by a margin for the rounding errors of the score type.
+        if self.baseScore is None:
+            return None
+        base = float(self.baseScore)
+        gap = float(self.gapDistance) - float(self.gapOpen)
+        least = min(M * base - cutoff * (n + m - M) + (n + m - 2*M) * gap
+                    for M in [0, min(n, m)])
+        scale = abs(base) + abs(gap) + abs(cutoff) + float(self.gapOpen) + \
+                float(np.abs(self.costMatrix).max(initial=0))
+        return least - self.roundingMargin(n, m, scale)
+
+
+    def roundingMargin(self, n, m, scale):
+        # Returns a margin for the rounding errors of a score accumulated along the
+        # path of an alignment of sequences of lengths n and m, with terms of size at
+        # most scale. Integer scores have no rounding errors.
+        if not np.issubdtype(self.scoreType, np.floating):
+            return 0
+        return (n + m + 1) * scale * SCORE_TOLERANCE * float(np.finfo(self.scoreType).eps)
+
+
+    def multipleAlignment(self, sequences, mode=None, arguments=None):
+        # Aligns a list of sequences all together, and returns a MultipleAlignment
+        # object. The alignment can be made according to profile alignment (mode
+        # PROFILES, the default, see progressiveAlignment), or genetic algorithms
+        # (mode GENETIC, see geneticAlignment), in which case arguments is an optional
+        # dictionary with the keys of DEFAULT_GENETIC_ARGUMENTS.
+        if mode is None:
+            mode = PROFILES
+        sequences = [self.validateSequence(sequence) for sequence in sequences]
+        if mode == PROFILES:
+            return self.progressiveAlignment(sequences)
+        if mode == GENETIC:
+            return self.geneticAlignment(sequences, arguments)
+        errorString  = "The multiple alignment mode " + str(mode) + " is not known."
+        raise ValueError(errorString)
+
+
+    def progressiveAlignment(self, sequences):
+        # Progressive multiple alignment: the sequences are grouped by a guide tree
+        # (see guideTree), and following it, the alignments of the groups are aligned
+        # to each other as profiles (see alignProfiles), from the closest groups to the
+        # farthest. The gaps of an alignment are never changed once it is made. With
+        # two sequences, the result is the one of singleAlignment.
+        if len(sequences) == 0:
+            return MultipleAlignment(np.zeros((0, 0), dtype=np.int64), 0.0, [])
+        merges = self.guideTree(sequences)
+        groups = {k: ([k], sequences[k][np.newaxis, :])
+                  for k in range(len(sequences))}
+        for step, (group1, group2) in enumerate(merges):
+            members1, block1 = groups.pop(group1)
+            members2, block2 = groups.pop(group2)
+            groups[len(sequences) + step] = (members1 + members2,
+                                             self.alignProfiles(block1, block2))
+        members, block = groups.popitem()[1]
+        alignedSequences = np.empty_like(block)
+        alignedSequences[members] = block
+        return MultipleAlignment(alignedSequences,
+                                 self.sumOfPairsScore(alignedSequences), merges)
+
+
+    def geneticAlignment(self, sequences, arguments=None):
+        # Multiple alignment by a genetic algorithm, which refines the progressive
+        # alignment of the sequences. The population starts with the progressive
+        # alignment and mutations of it. Every generation keeps the best alignments
+        # (ELITISM_KEY) and fills the rest of the population with children of parents
+        # chosen by tournaments, made by crossover (see crossAlignments) and mutated by
+        # moving gaps (see shuffleGap). The fitness is the sum of pairs score, which is
+        # computed for the whole generation at once, split among PROCESSES_KEY
+        # processes. The algorithm stops after GENERATIONS_KEY generations, when the
+        # best score has not improved for PATIENCE_KEY generations, or when
+        # TIME_LIMIT_KEY seconds have passed, if given. Every random choice is made
+        # by a generator seeded with SEED_KEY, so, without time limit, the result only
+        # depends on the seed, and not on the number of processes.
+        settings = dict(DEFAULT_GENETIC_ARGUMENTS)
+        if arguments is not None:
+            unknownKeys = [key for key in arguments if key not in settings]
+            if unknownKeys:
+                errorString  = "The arguments " + str(unknownKeys) + " are not known "
+                errorString += "by the genetic algorithm."
+                raise ValueError(errorString)
+            settings.update(arguments)
+        startTime = time.monotonic()
+        timeLimit = settings[TIME_LIMIT_KEY]
+        random = np.random.default_rng(settings[SEED_KEY])
+        progressive = self.progressiveAlignment(sequences)
+        if len(sequences) < 2:
+            return progressive
+        size = max(2, settings[POPULATION_SIZE_KEY])
+        elitism = min(max(1, settings[ELITISM_KEY]), size - 1)
+        population = [progressive.alignedSequences] + \
+                     [shuffleGap(progressive.alignedSequences, random)
+                      for _ in range(size - 1)]
+        with Pool(settings[PROCESSES_KEY]) if settings[PROCESSES_KEY] > 1 \
+                                           else NoPool() as pool:
+            scores = self.populationScores(population, pool, settings[PROCESSES_KEY])
+            bestScore = scores.max()
+            stalledGenerations = 0
+            for generation in range(settings[GENERATIONS_KEY]):
+                if timeLimit is not None and time.monotonic() - startTime > timeLimit:
+                    break
+                order = np.argsort(-scores, kind="stable")
+                elite = [population[k] for k in order[:elitism]]
+                children = []
+                while len(elite) + len(children) < size:
+                    parent1 = tournament(population, scores, settings[TOURNAMENT_KEY],
+                                         random)
+                    parent2 = tournament(population, scores, settings[TOURNAMENT_KEY],
+                                         random)
+                    if random.random() < settings[CROSSOVER_RATE_KEY]:
+                        child = crossAlignments(parent1, parent2, random)
+                    else:
+                        child = parent1
+                    if random.random() < settings[MUTATION_RATE_KEY]:
+                        child = shuffleGap(child, random)
+                    children.append(child)
+                population = elite + children
+                scores = np.concatenate([scores[order[:elitism]],
+                                         self.populationScores(children, pool,
+                                                          settings[PROCESSES_KEY])])
+                if scores.max() > bestScore + settings[TOLERANCE_KEY]:
+                    stalledGenerations = 0
+                else:
+                    stalledGenerations += 1
+                bestScore = max(bestScore, scores.max())
+                if stalledGenerations >= settings[PATIENCE_KEY]:
+                    break
+        best = int(np.argmax(scores))
+        return MultipleAlignment(population[best], float(scores[best]),
+                                 progressive.guideTree)
+
+
+    def populationScores(self, population, pool, processes):
+        # Returns the array of the sum of pairs scores of a list of alignments, split
+        # in as many batches as processes, evaluated by the pool.
+        batches = [population[k::processes] for k in range(processes)]
+        results = pool.starmap(batchScores, [(self, batch) for batch in batches])
+        scores = np.zeros(len(population))
+        for k in range(processes):
+            scores[k::processes] = results[k]
+        return scores
+
+
+    def guideTree(self, sequences):
+        # Returns the guide tree of the sequences, built by UPGMA (see upgma) from the
+        # distances of their global pairwise alignments, which are all computed in a
+        # single batch. Two empty sequences are at distance 0.
+        size = len(sequences)
+        rows1, rows2 = np.triu_indices(size, 1)
+        padded, lengths = padSequences(sequences)
+        batch = self.alignBatch(padded[rows1], padded[rows2], lengths[rows1],
+                                lengths[rows2])
+        distances = np.zeros((size, size))
+        distances[rows1, rows2] = np.nan_to_num(batch.distances, nan=0)
+        distances[rows2, rows1] = distances[rows1, rows2]
+        return upgma(distances)
+
+
+    def alignProfiles(self, block1, block2):
+        # Aligns two multiple alignments, given as arrays with a row per sequence and
+        # GAP in the gaps, and returns the alignment of all their sequences, with the
+        # rows of block1 first. Each alignment is summarized by its profile (see
+        # profile), and the score of aligning two columns is the average score of
+        # aligning their codes, computed for all the pairs of columns at once as
+        # F1 @ M @ F2.T, where M is profileMatrix. The columns are then aligned by
+        # the same engine as singleAlignment, with whole columns of gaps.
+        profileScores = (self.profile(block1) @ self.profileMatrix @
+                         self.profile(block2).T).astype(self.scoreType)
+        _, end1, end2, flags = fillMatrices(profileScores, self.gapOpen,
+                                            self.gapExtend, True, self.baseScore)
+        path1, path2 = traceback(flags, end1, end2, True)
+        return np.concatenate([expandBlock(block1, path1),
+                               expandBlock(block2, path2)])
+
+
+    def profile(self, block):
+        # Returns the profile of a multiple alignment: an array with a row per column
+        # of the alignment, holding the frequency of every code in it, and the
+        # frequency of gaps in the last entry.
+        rows, columns = block.shape
+        codes = np.where(block == GAP, self.alphabetSize, block)
+        cells = np.arange(columns)[np.newaxis, :] * (self.alphabetSize + 1) + codes
+        counts = np.bincount(cells.ravel(), minlength=columns * (self.alphabetSize+1))
+        return counts.reshape(columns, self.alphabetSize + 1) / rows
+
+
+    def extendedMatrix(self):
+        # Returns the matrix that scores the codes of two profiles (see alignProfiles),
+        # with the gap as an extra code. It is the substitution matrix, with gaps
+        # scoring 0, or, if the aligner has a base score, the distance matrix, with
+        # gapDistance between a code and a gap, and 0 between two gaps.
+        size = self.alphabetSize
+        if self.baseScore is None:
+            matrix = np.zeros((size+1, size+1))
+            matrix[:size, :size] = self.substitutionMatrix
+        else:
+            matrix = np.full((size+1, size+1), float(self.gapDistance))
+            matrix[:size, :size] = self.distanceMatrix
+            matrix[size, size] = 0
+        return matrix
+
+
+    def sumOfPairsScore(self, alignedSequences):
+        # Returns the sum, over all the pairs of sequences of a multiple alignment, of
+        # the score of the pairwise alignment they induce, ignoring the columns where
+        # both have a gap. The pairs are scored all at once.
+        rows1, rows2 = np.triu_indices(len(alignedSequences), 1)
+        if len(rows1) == 0:
+            return 0.0
+        codes1 = alignedSequences[rows1]
+        codes2 = alignedSequences[rows2]
+        isGap1 = codes1 == GAP
+        isGap2 = codes2 == GAP
+        isMatch = ~isGap1 & ~isGap2
+        score = self.substitutionMatrix.astype(np.float64)[codes1[isMatch],
+                                                           codes2[isMatch]].sum()
+        state = np.where(isMatch, 0, np.where(isGap1, 1, 2))
+        state[isGap1 & isGap2] = -1
+        positions = np.where(state >= 0, np.arange(state.shape[1])[np.newaxis, :], -1)
+        previous = np.full(state.shape, -1)
+        previous[:, 1:] = np.maximum.accumulate(positions, axis=1)[:, :-1]
+        previousState = np.where(previous >= 0,
+                                 np.take_along_axis(state, np.maximum(previous, 0),
+                                                    axis=1), 0)
+        isGap = state > 0
+        isExtension = isGap & (previousState == state)
+        score -= float(self.gapOpen) * np.count_nonzero(isGap & ~isExtension)
+        score -= float(self.gapExtend) * np.count_nonzero(isExtension)
+        return float(score)
+
+
+    def fingerprint(self):
+        # Returns a string that identifies the scoring of the aligner: its matrices,
+        # gap penalties, gap distance, base score and score type. Two aligners with the
+        # same fingerprint give the same alignments, whatever the backend.
+        digest = hashlib.sha1()
+        for matrix in [self.substitutionMatrix, self.distanceMatrix]:
+            digest.update(repr(matrix.shape).encode("utf-8"))
+            digest.update(np.ascontiguousarray(matrix).tobytes())
+        settings = (np.dtype(self.scoreType).str, float(self.gapOpen),
+                    float(self.gapExtend), float(self.gapDistance),
+                    None if self.baseScore is None else float(self.baseScore))
+        digest.update(repr(settings).encode("utf-8"))
+        return digest.hexdigest()
+
+
+    def cellScores(self, sequence1, sequence2):
+        # Returns the matrix that fillMatrices needs for the two sequences: the scores
+        # of aligning every pair of their codes or, if the aligner has a base score,
+        # their costs.
+        if self.baseScore is None:
+            return self.substitutionMatrix[np.ix_(sequence1, sequence2)]
+        return self.costMatrix[np.ix_(sequence1, sequence2)]
+
+
+    def validateSequence(self, sequence):
+        # Returns the sequence as an array of integers, checking that it is one
+        # dimensional and that all its codes are in the alphabet.
+        sequence = np.asarray(sequence)
+        if sequence.size == 0:
+            return np.zeros(0, dtype=np.int64)
+        if sequence.ndim != 1 or not np.issubdtype(sequence.dtype, np.integer):
+            errorString  = "The sequences should be one dimensional arrays of integer "
+            errorString += "codes. At least one of them is not."
+            raise ValueError(errorString)
+        if sequence.min() < 0 or sequence.max() >= self.alphabetSize:
+            errorString  = "The sequences should only contain codes between 0 and "
+            errorString += str(self.alphabetSize - 1) + ". At least one does not."
+            raise ValueError(errorString)
+        return sequence.astype(np.int64)
+
+
+    def makeAlignment(self, sequence1, sequence2, path1, path2, score):
+        # Builds the Alignment object from the positions given by the traceback.
+        alignedSequence1 = np.full(len(path1), GAP, dtype=np.int64)
+        alignedSequence2 = np.full(len(path2), GAP, dtype=np.int64)
+        alignedSequence1[path1 != GAP] = sequence1[path1[path1 != GAP]]
+        alignedSequence2[path2 != GAP] = sequence2[path2[path2 != GAP]]
+        return Alignment(float(score), alignedSequence1, alignedSequence2,
+                         self.alignedDistance(alignedSequence1, alignedSequence2))
+
+
+    def alignedDistance(self, alignedSequence1, alignedSequence2):
+        # Returns the average distance of the columns of an alignment, or NaN if the
+        # alignment is empty.
+        if len(alignedSequence1) == 0:
+            return np.nan
+        gaps = (alignedSequence1 == GAP) | (alignedSequence2 == GAP)
+        distances = np.full(len(alignedSequence1), float(self.gapDistance))
+        distances[~gaps] = self.distanceMatrix[alignedSequence1[~gaps],
+                                               alignedSequence2[~gaps]]
+        return sum(distances.tolist()) / len(distances)
+
+
+
+#################
+#################
+##             ##
+##  ALIGNMENT  ##
+##             ##
+#################
+#################
+class Alignment:
+    # Container of the result of a pairwise alignment: its score, the two sequences
+    # aligned, as arrays of the same length with GAP where a code is aligned to a gap,
+    # and the average distance of the alignment (see Aligner). For local alignments,
+    # only the aligned portions of the sequences are included.
+
+    def __init__(self, score, alignedSequence1, alignedSequence2, distance):
+        self.score            = score
+        self.alignedSequence1 = alignedSequence1
+        self.alignedSequence2 = alignedSequence2
+        self.distance         = distance
+
+    def __len__(self):
+        return len(self.alignedSequence1)
+
+
+
+##########################
+##########################
+##                      ##
+##  MULTIPLE ALIGNMENT  ##
+##                      ##
+##########################
+##########################
+class MultipleAlignment:
+    # Container of the result of Aligner.multipleAlignment: an array with a row per
+    # sequence, in the order given, with GAP where a code is aligned to a gap, the sum
+    # of pairs score of the alignment (see Aligner.sumOfPairsScore), and the guide
+    # tree, as the list of merges returned by upgma, if the alignment was built from
+    # one.
+
+    def __init__(self, alignedSequences, score, guideTree):
+        self.alignedSequences = alignedSequences
+        self.score            = score
+        self.guideTree        = guideTree
+
+    def __len__(self):
+        return self.alignedSequences.shape[1]
+
+
+
+###############
+###############
+##           ##
+##  NO POOL  ##
+##           ##
+###############
+###############
+class NoPool:
+    # Stands for a process pool when there is a single process, running the tasks in
+    # this one.
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        return False
+
+    def starmap(self, function, argumentsList):
+        return [function(*arguments) for arguments in argumentsList]
+
+
+
+#######################
+#######################
+##                   ##
+##  BATCH ALIGNMENT  ##
+##                   ##
+#######################
+#######################
+class BatchAlignment:
+    # Container of the result of Aligner.alignBatch: arrays with the score and the
+    # distance of every pair, and, if they were requested, lists with the aligned
+    # sequences of every pair, as in Alignment.
+
+    def __init__(self, scores, distances, alignedSequences1=None,
+                 alignedSequences2=None):
+        self.scores            = scores
+        self.distances         = distances
+        self.alignedSequences1 = alignedSequences1
+        self.alignedSequences2 = alignedSequences2
+
+    def __len__(self):
+        return len(self.scores)
+
+    def alignment(self, k):
+        # Returns the k-th pair as an Alignment object, if the aligned sequences were
+        # requested.
+        if self.alignedSequences1 is None:
+            errorString  = "The batch was aligned without returning the alignments."
+            raise ValueError(errorString)
+        return Alignment(float(self.scores[k]), self.alignedSequences1[k],
+                         self.alignedSequences2[k], float(self.distances[k]))
+
+
+
+#####################
+#####################
+#####################
+###               ###
+###               ###
+###   FUNCTIONS   ###
+###      AND      ###
+###    METHODS    ###
+###               ###
+###               ###
+#####################
+#####################
+#####################
+
+
+def fromDistanceMatrix(distanceMatrix, gapOpen=0, gapExtend=0, scoreType=np.float64):
+    # Returns an aligner that scores the alignment of two codes as 1 minus their
+    # distance. With the default arguments, it is the alignment used by the module
+    # chibcha, with the same arithmetic, so the default score type is float64, as
+    # there.
+    distanceMatrix = np.asarray(distanceMatrix, dtype=np.float64)
+    return Aligner(1 - distanceMatrix, gapOpen, gapExtend, distanceMatrix,
+                   scoreType=scoreType, baseScore=1)
+
+
+def localFromDistanceMatrix(distanceMatrix, gapOpen=None, gapExtend=None,
+                            scoreType=np.float64):
+    # Returns an aligner for local alignments of codes with the given distances.
+    # The score of aligning two codes is 1 - 2 * distance, positive for similar codes
+    # and negative for different ones, and gaps cost LOCAL_GAP_OPEN and
+    # LOCAL_GAP_EXTEND by default, so that a local alignment only extends over the
+    # similar parts of the sequences. With fromDistanceMatrix, where no score is
+    # negative and gaps are free, the best local alignment is the whole of both
+    # sequences, and longer sequences score higher.
+    if gapOpen is None:
+        gapOpen = LOCAL_GAP_OPEN
+    if gapExtend is None:
+        gapExtend = LOCAL_GAP_EXTEND
+    distanceMatrix = np.asarray(distanceMatrix, dtype=np.float64)
+    return Aligner(1 - 2 * distanceMatrix, gapOpen, gapExtend, distanceMatrix,
+                   scoreType=scoreType)
+
+
+def fillMatrices(scoreMatrix, gapOpen, gapExtend, isGlobal, baseScore=None,
+                 scoreCutoff=None, bestScore=0):
+    # Fills the dynamic programming matrices of the affine gap alignment (Gotoh) of two
+    # sequences, where scoreMatrix[i, j] is the score of aligning the i-th code of the
+    # first sequence with the j-th code of the second one. If baseScore is given,
+    # scoreMatrix holds costs instead, and the score of the diagonal move is computed
+    # as (H + baseScore) - cost, which is the arithmetic used by chibcha. There are
+    # three states: H (best alignment up to the cell), X (ending with a gap in the
+    # second sequence, that is, coming from above) and Y (ending with a gap in the
+    # first sequence, that is, coming from the left).
+    #
+    # Returns the score of the alignment, the cell where it ends, and a matrix of
+    # uint8 flags, where each cell has a bit set for every move that attains the
+    # optimum (see the constants of the module), which is what the traceback needs.
+    # For local alignments, the end is the first cell with the best score, reading
+    # the matrix by rows. Every value is computed with the same operations as in the
+    # plain cell by cell recurrence, so the result does not depend on how the
+    # matrix is traversed, nor on the backend (see setBackend).
+    #
+    # If scoreCutoff is given, and bestScore is an upper bound of the scores of the
+    # cells, a global alignment stops, returning None, as soon as it is proved that
+    # its score is below scoreCutoff (see cutoffBound).
+    filled = fillAll(scoreMatrix, gapOpen, gapExtend, isGlobal, baseScore,
+                     scoreCutoff if isGlobal else None, bestScore)
+    if filled is None:
+        return None
+    H, X, Y, flags = filled
+    n, m = scoreMatrix.shape
+    if isGlobal:
+        return H[n, m], n, m, flags
+    end1, end2 = np.unravel_index(np.argmax(H), H.shape)
+    return H[end1, end2], int(end1), int(end2), flags
+
+
+def fillAll(scoreMatrix, gapOpen, gapExtend, isGlobal, baseScore=None,
+            scoreCutoff=None, bestScore=0):
+    # Returns the filled matrices H, X and Y and the traceback flags, for a matrix of
+    # cell scores or a batch of them (see fillMatrices), computed by the current
+    # backend: with a few vectorized steps per row or anti-diagonal (NUMPY_BACKEND),
+    # or cell by cell, by fillCells, compiled (NUMBA_BACKEND) or not
+    # (PYTHON_BACKEND). All of them give the same results. With a scoreCutoff, it
+    # returns None if the fill stops early.
+    if currentBackend == NUMPY_BACKEND:
+        if gapExtend == 0:
+            matrices = fillRows(scoreMatrix, gapOpen, gapExtend, isGlobal, baseScore,
+                                scoreCutoff, bestScore)
+        else:
+            matrices = fillDiagonals(scoreMatrix, gapOpen, gapExtend, isGlobal,
+                                     baseScore, scoreCutoff, bestScore)
+        if matrices is None:
+            return None
+        H, X, Y = matrices
+        flags = matrixFlags(H, X, Y, scoreMatrix, gapOpen, gapExtend, isGlobal,
+                            baseScore)
+        return H, X, Y, flags
+    scoreType = scoreMatrix.dtype.type
+    H, X, Y = initialMatrices(scoreMatrix.shape, gapOpen, gapExtend, isGlobal,
+                              scoreType)
+    flags = np.zeros(H.shape, dtype=np.uint8)
+    setBorderFlags(flags, isGlobal)
+    kernel = cellKernel()
+    hasBase = baseScore is not None
+    arguments = (scoreType(gapOpen), scoreType(gapExtend), isGlobal, hasBase,
+                 scoreType(baseScore if hasBase else 0))
+    hasCutoff = scoreCutoff is not None
+    cutoffArguments = (hasCutoff, float(scoreCutoff if hasCutoff else 0),
+                       float(bestScore))
+    if scoreMatrix.ndim == 2:
+        if not kernel(scoreMatrix, *arguments, H, X, Y, flags, *cutoffArguments):
+            return None
+    else:
+        for k in range(scoreMatrix.shape[0]):
+            kernel(scoreMatrix[k], *arguments, H[k], X[k], Y[k], flags[k],
+                   *cutoffArguments)
+    return H, X, Y, flags
+
+
+def fillCells(scoreMatrix, gapOpen, gapExtend, isGlobal, hasBase, baseScore, H, X, Y,
+              flags, hasCutoff, scoreCutoff, bestScore):
+    # Scalar kernel of the recurrence: fills the cells of H, X, Y and the flags
+    # that are not in the first row or column, one by one, with the operations of
+    # fillRows, fillDiagonals and matrixFlags, in the same types. It is written with
+    # plain loops over arrays, so that Numba can compile it. If hasCutoff is True, it
+    # stops and returns False as soon as a row shows that the score cannot reach
+    # scoreCutoff, as fillRows does, and it returns True otherwise.
+    n, m = scoreMatrix.shape
+    for i in range(1, n+1):
+        for j in range(1, m+1):
+            if hasBase:
+                matchScore = (H[i-1, j-1] + baseScore) - scoreMatrix[i-1, j-1]
+            else:
+                matchScore = H[i-1, j-1] + scoreMatrix[i-1, j-1]
+            X[i, j] = max(H[i-1, j] - gapOpen, X[i-1, j] - gapExtend)
+            Y[i, j] = max(H[i, j-1] - gapOpen, Y[i, j-1] - gapExtend)
+            h = max(max(matchScore, X[i, j]), Y[i, j])
+            if not isGlobal and h < 0:
+                h = 0
+            H[i, j] = h
+            flag = 0
+            if H[i, j] == matchScore:
+                flag |= DIAGONAL
+            if H[i, j] == Y[i, j]:
+                flag |= LEFT
+            if H[i, j] == X[i, j]:
+                flag |= UP
+            if X[i, j] == H[i-1, j] - gapOpen:
+                flag |= X_OPEN
+            if X[i, j] == X[i-1, j] - gapExtend:
+                flag |= X_EXTEND
+            if Y[i, j] == H[i, j-1] - gapOpen:
+                flag |= Y_OPEN
+            if Y[i, j] == Y[i, j-1] - gapExtend:
+                flag |= Y_EXTEND
+            if not isGlobal and H[i, j] <= 0:
+                flag |= STOP
+            flags[i, j] = flag
+        if hasCutoff and i < n:
+            bound = -np.inf
+            for j in range(m+1):
+                bound = max(bound, float(H[i, j]) + bestScore * min(n-i, m-j))
+            if bound < scoreCutoff:
+                return False
+    return True
+
+
+def cellKernel():
+    # Returns fillCells as the current backend runs it, compiling it the first time
+    # it is needed with Numba.
+    if currentBackend == NUMBA_BACKEND:
+        if "fillCells" not in compiledKernels:
+            compiledKernels["fillCells"] = numba.njit(cache=True)(fillCells)
+        return compiledKernels["fillCells"]
+    return fillCells
+
+
+def setBackend(backend=None):
+    # Chooses how the alignment matrices are filled (see fillAll): NUMPY_BACKEND,
+    # NUMBA_BACKEND or PYTHON_BACKEND, or, if backend is None, the default one, which
+    # is NUMBA_BACKEND if Numba is installed, and NUMPY_BACKEND otherwise. If Numba
+    # is asked for and it is not installed, it falls back to NUMPY_BACKEND, with a
+    # warning. Returns the backend chosen.
+    global currentBackend
+    if backend is None:
+        backend = NUMBA_BACKEND if numba is not None else NUMPY_BACKEND
+    if backend not in BACKENDS:
+        errorString  = "The backend " + str(backend) + " is not known. It should be "
+        errorString += "one of " + str(BACKENDS) + "."
+        raise ValueError(errorString)
+    if backend == NUMBA_BACKEND and numba is None:
+        warnings.warn("Numba is not installed. Using the NumPy backend instead.")
+        backend = NUMPY_BACKEND
+    currentBackend = backend
+    return backend
+
+
+def getBackend():
+    # Returns the backend in use (see setBackend).
+    return currentBackend
+
+
+def initialMatrices(shape, gapOpen, gapExtend, isGlobal, scoreType):
+    # Returns the matrices H, X and Y for a matrix of cell scores of the given shape,
+    # with their first row and column filled, and the rest of the cells at minus
+    # infinity. If the shape has more than two dimensions, the leading ones are a
+    # batch of alignments (see Aligner.alignBatch).
+    n, m = shape[-2:]
+    matrixShape = tuple(shape[:-2]) + (n+1, m+1)
+    H = np.full(matrixShape, -np.inf, dtype=scoreType)
+    X = np.full(matrixShape, -np.inf, dtype=scoreType)
+    Y = np.full(matrixShape, -np.inf, dtype=scoreType)
+    H[..., 0, :] = [borderScore(j, gapOpen, gapExtend, isGlobal) for j in range(m+1)]
+    H[..., :, 0] = [borderScore(i, gapOpen, gapExtend, isGlobal) for i in range(n+1)]
+    if isGlobal:
+        Y[..., 0, 1:] = H[..., 0, 1:]
+        X[..., 1:, 0] = H[..., 1:, 0]
+    return H, X, Y
+
+
+def fillRows(scoreMatrix, gapOpen, gapExtend, isGlobal, baseScore=None,
+             scoreCutoff=None, bestScore=0):
+    # Version of fillMatrices for gapExtend == 0, which fills a whole row in a few
+    # vectorized steps. When extending a gap costs nothing, the best gap coming from
+    # the left is just the running maximum of the cells of the row minus gapOpen,
+    # which involves no arithmetic other than the one of the recurrence. If
+    # scoreCutoff is given (only for a single global alignment), it returns None as
+    # soon as a row shows that the score cannot reach it (see cutoffBound).
+    n, m = scoreMatrix.shape[-2:]
+    H, X, Y = initialMatrices(scoreMatrix.shape, gapOpen, gapExtend, isGlobal,
+                              scoreMatrix.dtype.type)
+    for i in range(1, n+1):
+        matchScore = diagonalScore(H[..., i-1, :-1], scoreMatrix[..., i-1, :], baseScore)
+        X[..., i, 1:] = np.maximum(H[..., i-1, 1:] - gapOpen,
+                                   X[..., i-1, 1:] - gapExtend)
+        a = np.maximum(matchScore, X[..., i, 1:])
+        if not isGlobal:
+            a = np.maximum(a, 0)
+        H[..., i, 1:] = a
+        Y[..., i, 1:] = np.maximum.accumulate(H[..., i, :-1] - gapOpen, axis=-1)
+        np.maximum(H[..., i, 1:], Y[..., i, 1:], out=H[..., i, 1:])
+        if scoreCutoff is not None and i < n:
+            if cutoffBound(H, np.full(m+1, i), np.arange(m+1), bestScore) < scoreCutoff:
+                return None
+    return H, X, Y
+
+
+def fillDiagonals(scoreMatrix, gapOpen, gapExtend, isGlobal, baseScore=None,
+                  scoreCutoff=None, bestScore=0):
+    # Version of fillMatrices for any gap penalties. The cells are computed by
+    # anti-diagonals, as every cell of a diagonal only depends on the two previous
+    # ones, so each diagonal is a single vectorized step. As every path crosses one
+    # of every two consecutive anti-diagonals, if scoreCutoff is given (only for a
+    # single global alignment), it returns None as soon as two of them show that the
+    # score cannot reach it (see cutoffBound).
+    n, m = scoreMatrix.shape[-2:]
+    H, X, Y = initialMatrices(scoreMatrix.shape, gapOpen, gapExtend, isGlobal,
+                              scoreMatrix.dtype.type)
+    for d in range(2, n+m+1):
+        i = np.arange(max(1, d-m), min(n, d-1) + 1)
+        j = d - i
+        matchScore = diagonalScore(H[..., i-1, j-1], scoreMatrix[..., i-1, j-1],
+                                   baseScore)
+        X[..., i, j] = np.maximum(H[..., i-1, j] - gapOpen, X[..., i-1, j] - gapExtend)
+        Y[..., i, j] = np.maximum(H[..., i, j-1] - gapOpen, Y[..., i, j-1] - gapExtend)
+        h = np.maximum(np.maximum(matchScore, X[..., i, j]), Y[..., i, j])
+        if not isGlobal:
+            h = np.maximum(h, 0)
+        H[..., i, j] = h
+        if scoreCutoff is not None and d < n+m:
+            i = np.arange(max(0, d-1-m), min(n, d) + 1)
+            j = np.arange(d-1, d+1)[np.newaxis, :] - i[:, np.newaxis]
+            isInside = (j >= 0) & (j <= m)
+            i = np.broadcast_to(i[:, np.newaxis], j.shape)[isInside]
+            if cutoffBound(H, i, j[isInside], bestScore) < scoreCutoff:
+                return None
+    return H, X, Y
+
+
+def cutoffBound(H, i, j, bestScore):
+    # Upper bound of the score of the global alignments that go through some of the
+    # cells (i[k], j[k]): from such a cell, the alignment scores at most H there
+    # (which is at least X and Y), plus bestScore for each of the at most
+    # min(n - i, m - j) columns without gaps left, and gaps never add to the score.
+    n = H.shape[0] - 1
+    m = H.shape[1] - 1
+    return (H[i, j].astype(np.float64) + bestScore * np.minimum(n - i, m - j)).max()
+
+
+def matrixFlags(H, X, Y, scoreMatrix, gapOpen, gapExtend, isGlobal, baseScore=None):
+    # Returns the matrix of traceback flags, given the filled matrices. Every move into
+    # a cell is recomputed with the operations of the recurrence, so the comparisons
+    # with the values of the cell are exact.
+    flags = np.zeros(H.shape, dtype=np.uint8)
+    setBorderFlags(flags, isGlobal)
+    h = H[..., 1:, 1:]
+    x = X[..., 1:, 1:]
+    y = Y[..., 1:, 1:]
+    matchScore = diagonalScore(H[..., :-1, :-1], scoreMatrix, baseScore)
+    inner = flags[..., 1:, 1:]
+    inner |= (h == matchScore).view(np.uint8) * np.uint8(DIAGONAL)
+    inner |= (h == y).view(np.uint8) * np.uint8(LEFT)
+    inner |= (h == x).view(np.uint8) * np.uint8(UP)
+    inner |= (x == H[..., :-1, 1:] - gapOpen).view(np.uint8) * np.uint8(X_OPEN)
+    inner |= (x == X[..., :-1, 1:] - gapExtend).view(np.uint8) * np.uint8(X_EXTEND)
+    inner |= (y == H[..., 1:, :-1] - gapOpen).view(np.uint8) * np.uint8(Y_OPEN)
+    inner |= (y == Y[..., 1:, :-1] - gapExtend).view(np.uint8) * np.uint8(Y_EXTEND)
+    if not isGlobal:
+        inner |= (h <= 0).view(np.uint8) * np.uint8(STOP)
+    return flags
+
+
+def diagonalScore(previousH, scores, baseScore):
+    # Score of the diagonal move (see fillMatrices).
+    if baseScore is None:
+        return previousH + scores
+    return (previousH + baseScore) - scores
+
+
+def borderScore(length, gapOpen, gapExtend, isGlobal):
+    # Score of the first row and column: a gap of the given length in global mode, or
+    # zero in local mode.
+    if not isGlobal or length == 0:
+        return 0
+    return -(gapOpen + gapExtend * (length - 1))
+
+
+def setBorderFlags(flags, isGlobal):
+    # The cells of the first row can only be reached from the left and those of the
+    # first column from above, in global mode, while in local mode they are starting
+    # points.
+    if isGlobal:
+        flags[..., 0, 1:] = LEFT | Y_EXTEND
+        flags[..., 0, 1:2] = LEFT | Y_OPEN
+        flags[..., 1:, 0] = UP | X_EXTEND
+        flags[..., 1:2, 0] = UP | X_OPEN
+    else:
+        flags[..., 0, :] = STOP
+        flags[..., :, 0] = STOP
+
+
+def upgma(distances):
+    # Builds a tree by UPGMA from a symmetric matrix of distances between N items.
+    # Returns the list of merges, as tuples (group1, group2), where the groups 0 to
+    # N-1 are the items, and the k-th merge makes the group N+k. Every step joins the
+    # two closest groups (the first ones, by rows, if there are ties), and the
+    # distance to the new group is the average of the distances to their items.
+    size = len(distances)
+    distances = np.array(distances, dtype=np.float64)
+    np.fill_diagonal(distances, np.inf)
+    groups = list(range(size))
+    sizes = np.ones(size)
+    merges = []
+    for step in range(size - 1):
+        a, b = np.unravel_index(np.argmin(distances), distances.shape)
+        merges.append((groups[a], groups[b]))
+        newDistances = (sizes[a] * distances[a] + sizes[b] * distances[b]) / \
+                       (sizes[a] + sizes[b])
+        distances[a, :] = newDistances
+        distances[:, a] = newDistances
+        distances[a, a] = np.inf
+        distances[b, :] = np.inf
+        distances[:, b] = np.inf
+        groups[a] = size + step
+        sizes[a] += sizes[b]
+    return merges
+
+
+def batchScores(theAligner, alignments):
+    # Returns the list of sum of pairs scores of the alignments. It is a function of
+    # the module, so that a process pool can run it.
+    return [theAligner.sumOfPairsScore(alignment) for alignment in alignments]
+
+
+def tournament(population, scores, size, random):
+    # Returns the best of size members of the population chosen at random.
+    contestants = random.integers(0, len(population), size)
+    return population[contestants[np.argmax(scores[contestants])]]
+
+
+def shuffleGap(alignment, random):
+    # Mutation of a multiple alignment: a gap of a random row is moved to a random
+    # position of the same row. If no row has both gaps and codes, a gap is inserted
+    # at a random position of every row instead, which makes the alignment one column
+    # longer. Columns made only of gaps are removed.
+    rows, columns = alignment.shape
+    isGap = alignment == GAP
+    candidates = np.flatnonzero(isGap.any(axis=1) & ~isGap.all(axis=1))
+    if len(candidates) == 0:
+        positions = random.integers(0, columns + 1, rows)
+        mutated = np.full((rows, columns + 1), GAP, dtype=alignment.dtype)
+        for row in range(rows):
+            mutated[row] = np.insert(alignment[row], positions[row], GAP)
+        return removeGapColumns(mutated)
+    row = candidates[random.integers(0, len(candidates))]
+    gaps = np.flatnonzero(isGap[row])
+    shortened = np.delete(alignment[row], gaps[random.integers(0, len(gaps))])
+    mutated = alignment.copy()
+    mutated[row] = np.insert(shortened, random.integers(0, columns), GAP)
+    return removeGapColumns(mutated)
+
+
+def crossAlignments(alignment1, alignment2, random):
+    # One point crossover of two multiple alignments of the same sequences: the child
+    # takes the columns of alignment1 up to a random cut and, in every row, the rest
+    # of the codes as they are aligned in alignment2. The right parts of the rows are
+    # padded with gaps on their left so they have the same length.
+    cut = random.integers(0, alignment1.shape[1] + 1)
+    isCode2 = alignment2 != GAP
+    codesBefore = (alignment1[:, :cut] != GAP).sum(axis=1)
+    cumulativeCodes = np.cumsum(isCode2, axis=1)
+    rightParts = []
+    for row in range(len(alignment1)):
+        start = int(np.searchsorted(cumulativeCodes[row], codesBefore[row],
+                                    side="right")) if codesBefore[row] > 0 else 0
+        rightParts.append(alignment2[row, start:])
+    width = max(len(part) for part in rightParts)
+    child = np.full((len(alignment1), cut + width), GAP, dtype=alignment1.dtype)
+    child[:, :cut] = alignment1[:, :cut]
+    for row in range(len(alignment1)):
+        child[row, cut + width - len(rightParts[row]):] = rightParts[row]
+    return removeGapColumns(child)
+
+
+def removeGapColumns(alignment):
+    # Returns the multiple alignment without the columns made only of gaps.
+    return alignment[:, ~(alignment == GAP).all(axis=0)]
+
+
+def expandBlock(block, path):
+    # Returns the multiple alignment block with its columns placed as given by the
+    # traceback path, and columns of gaps where the path has GAP.
+    expanded = np.full((block.shape[0], len(path)), GAP, dtype=np.int64)
+    expanded[:, path != GAP] = block[:, path[path != GAP]]
+    return expanded
+
+
+def padSequences(sequences):
+    # Returns a list of sequences as a padded array of shape (sequences, maximum
+    # length), and the array of their lengths, as Aligner.alignBatch needs them.
+    lengths = np.array([len(sequence) for sequence in sequences], dtype=np.int64)
+    padded = np.zeros((len(sequences), lengths.max() if len(sequences) > 0 else 0),
+                      dtype=np.int64)
+    for k in range(len(sequences)):
+        padded[k, :lengths[k]] = sequences[k]
+    return padded, lengths
+
+
+def codeCounts(sequences, lengths, alphabetSize):
+    # Returns the histograms of the codes of a batch of padded sequences, as an array
+    # of shape (sequences, alphabetSize).
+    inside = np.arange(sequences.shape[1])[np.newaxis, :] < lengths[:, np.newaxis]
+    rows = np.nonzero(inside)[0]
+    counts = np.bincount(rows * alphabetSize + sequences[inside],
+                         minlength=len(lengths) * alphabetSize)
+    return counts.reshape(len(lengths), alphabetSize)
+
+
+def batchChunks(lengths1, lengths2):
+    # Generates the indices of the pairs of a batch in chunks, sorted by length, so
+    # that the padded matrices of each chunk have at most BATCH_CELLS cells (or a
+    # single pair, if it is larger than that).
+    order = np.lexsort((lengths2, lengths1))
+    start = 0
+    while start < len(order):
+        n = lengths1[order[start]]
+        m = lengths2[order[start]]
+        end = start + 1
+        while end < len(order):
+            newN = max(n, lengths1[order[end]])
+            newM = max(m, lengths2[order[end]])
+            if (end - start + 1) * (newN + 1) * (newM + 1) > BATCH_CELLS:
+                break
+            n = newN
+            m = newM
+            end += 1
+        yield order[start:end]
+        start = end
+
+
+def batchTraceback(flags, end1, end2, isGlobal):
+    # Version of traceback for a batch of flag matrices, which follows all of them at
+    # once, with the same preferences. Returns two padded arrays with the positions
+    # aligned in each column, and the number of columns of every alignment.
+    size = flags.shape[0]
+    rows = np.arange(size)
+    i = np.array(end1, dtype=np.int64)
+    j = np.array(end2, dtype=np.int64)
+    state = np.full(size, H_STATE)
+    isActive = np.ones(size, dtype=bool)
+    columns = np.zeros(size, dtype=np.int64)
+    maximumColumns = flags.shape[1] + flags.shape[2] - 2
+    paths1 = np.full((size, maximumColumns), GAP, dtype=np.int64)
+    paths2 = np.full((size, maximumColumns), GAP, dtype=np.int64)
+    while True:
+        cell = flags[rows, i, j]
+        inH = isActive & (state == H_STATE)
+        isFinished = inH & (i == 0) & (j == 0)
+        if not isGlobal:
+            isFinished |= inH & (cell & STOP > 0)
+        isActive &= ~isFinished
+        inH &= ~isFinished
+        if not isActive.any():
+            break
+        diagonal = inH & (cell & DIAGONAL > 0)
+        left = inH & ~diagonal & (cell & LEFT > 0)
+        up = inH & ~diagonal & ~left
+        state[left] = Y_STATE
+        state[up] = X_STATE
+        inY = isActive & (state == Y_STATE)
+        inX = isActive & (state == X_STATE)
+        paths1[rows[diagonal | inX], columns[diagonal | inX]] = i[diagonal | inX] - 1
+        paths2[rows[diagonal | inY], columns[diagonal | inY]] = j[diagonal | inY] - 1
+        columns[isActive] += 1
+        state[inY & (cell & Y_OPEN > 0)] = H_STATE
+        state[inX & (cell & X_OPEN > 0)] = H_STATE
+        i[diagonal | inX] -= 1
+        j[diagonal | inY] -= 1
+    paths1 = paths1[:, :max(columns.max(initial=0), 0)]
+    paths2 = paths2[:, :paths1.shape[1]]
+    reverse = columns[:, np.newaxis] - 1 - np.arange(paths1.shape[1])[np.newaxis, :]
+    isColumn = reverse >= 0
+    paths1 = np.where(isColumn, np.take_along_axis(paths1, np.maximum(reverse, 0),
+                                                   axis=1), GAP)
+    paths2 = np.where(isColumn, np.take_along_axis(paths2, np.maximum(reverse, 0),
+                                                   axis=1), GAP)
+    return paths1, paths2, columns
+
+
+def pathMoves(flags, state, i, j, isGlobal):
+    # Returns the list of the moves that the flags allow back from the state of the
+    # cell (i, j), in the order of preference of traceback, as tuples (state, i, j,
+    # column), where column is the pair of positions aligned by the move, or None if
+    # it only changes the state. When a gap can be both opened and extended, and the
+    # cell where it is opened can be reached from the same kind of gap (which happens
+    # when gapOpen == gapExtend), the extension gives the same alignments as opening
+    # it, so it is left out, and every path is a different alignment.
+    cell = flags[i, j]
+    moves = []
+    if state == H_STATE:
+        if cell & DIAGONAL:
+            moves.append((H_STATE, i-1, j-1, (i-1, j-1)))
+        if cell & LEFT:
+            moves.append((Y_STATE, i, j, None))
+        if cell & UP:
+            moves.append((X_STATE, i, j, None))
+    elif state == Y_STATE:
+        if cell & Y_OPEN:
+            moves.append((H_STATE, i, j-1, (GAP, j-1)))
+        if cell & Y_EXTEND and not (cell & Y_OPEN and flags[i, j-1] & LEFT and
+                                    not isPathStart(flags, i, j-1, isGlobal)):
+            moves.append((Y_STATE, i, j-1, (GAP, j-1)))
+    else:
+        if cell & X_OPEN:
+            moves.append((H_STATE, i-1, j, (i-1, GAP)))
+        if cell & X_EXTEND and not (cell & X_OPEN and flags[i-1, j] & UP and
+                                    not isPathStart(flags, i-1, j, isGlobal)):
+            moves.append((X_STATE, i-1, j, (i-1, GAP)))
+    return moves
+
+
+def isPathStart(flags, i, j, isGlobal):
+    # Tells whether the alignments that reach the state H of the cell (i, j) start
+    # there, as traceback does.
+    return (i == 0 and j == 0) or (not isGlobal and flags[i, j] & STOP > 0)
+
+
+def countPaths(flags, end1, end2, isGlobal):
+    # Counts the optimal alignments that end at the cell (end1, end2), that is, the
+    # paths that pathMoves allows from there to a start (see isPathStart). The number
+    # of paths from every state of every cell is computed from the previous cells, by
+    # rows, with integers of Python, which never overflow, even if the number of
+    # alignments is exponential.
+    H = [[0] * (end2+1) for _ in range(end1+1)]
+    X = [[0] * (end2+1) for _ in range(end1+1)]
+    Y = [[0] * (end2+1) for _ in range(end1+1)]
+    for i in range(end1+1):
+        for j in range(end2+1):
+            for state in [X_STATE, Y_STATE, H_STATE]:
+                if state == H_STATE and isPathStart(flags, i, j, isGlobal):
+                    H[i][j] = 1
+                    continue
+                count = 0
+                for previousState, i0, j0, _ in pathMoves(flags, state, i, j,
+                                                          isGlobal):
+                    count += [H, X, Y][previousState][i0][j0]
+                [H, X, Y][state][i][j] = count
+    return H[end1][end2]
+
+
+def optimalPaths(flags, end1, end2, isGlobal):
+    # Generates the positions aligned by all the optimal alignments that end at the
+    # cell (end1, end2), as traceback returns them, in the order of preference of
+    # traceback, so the first one is the one it returns. The paths are followed by a
+    # depth first search with an explicit stack, so memory only grows with the length
+    # of the alignments, and not with their number.
+    stack = [iter(pathMoves(flags, H_STATE, end1, end2, isGlobal))]
+    columns = []
+    if isPathStart(flags, end1, end2, isGlobal):
+        yield pathPositions(columns)
+        return
+    while stack:
+        move = next(stack[-1], None)
+        if move is None:
+            stack.pop()
+            if columns:
+                columns.pop()
+            continue
+        state, i, j, column = move
+        columns.append(column)
+        if state == H_STATE and isPathStart(flags, i, j, isGlobal):
+            yield pathPositions(columns)
+            columns.pop()
+        else:
+            stack.append(iter(pathMoves(flags, state, i, j, isGlobal)))
+
+
+def pathPositions(columns):
+    # Returns the positions aligned by the columns of a path, collected backwards, in
+    # the format of traceback.
+    columns = [column for column in reversed(columns) if column is not None]
+    path1 = np.array([column[0] for column in columns], dtype=np.int64)
+    path2 = np.array([column[1] for column in columns], dtype=np.int64)
+    return path1, path2
+
+
+def closestPath(flags, end1, end2, isGlobal, matchDistances, gapDistance):
+    # Returns the positions aligned by the optimal alignment, ending at the cell
+    # (end1, end2), whose distance (the average of the distances of its columns, see
+    # Aligner) is the least, without enumerating the alignments. As the distance is an
+    # average, for every state of every cell and every number of columns L, the least
+    # sum of distances of a path with L columns from a start to it is computed, adding
+    # the columns in the order of the alignment, so the sums are the ones that
+    # Aligner.alignedDistance computes. matchDistances[i, j] is the distance of
+    # aligning the i-th and j-th codes. Ties are broken by the shortest alignment, and
+    # then by the preferences of traceback. It takes O(n * m * (n + m)) time and
+    # memory, which is meant for words.
+    length = end1 + end2 + 1
+    best = np.full((3, end1+1, end2+1, length), np.inf)
+    for i in range(end1+1):
+        for j in range(end2+1):
+            cell = int(flags[i, j])
+            for state in [X_STATE, Y_STATE, H_STATE]:
+                if state == H_STATE and isPathStart(flags, i, j, isGlobal):
+                    best[H_STATE, i, j, 0] = 0
+                    continue
+                for previousState, i0, j0, column in pathMoves(flags, state, i, j,
+                                                               isGlobal):
+                    candidate = columnSums(best[previousState, i0, j0], column,
+                                           matchDistances, gapDistance)
+                    np.minimum(best[state, i, j], candidate, out=best[state, i, j])
+    sums = best[H_STATE, end1, end2]
+    if np.isfinite(sums[0]):
+        return pathPositions([])
+    with np.errstate(invalid="ignore"):
+        columnsNumber = int(np.argmin(sums[1:] / np.arange(1, length))) + 1
+    columns = []
+    state, i, j = H_STATE, end1, end2
+    while not (state == H_STATE and isPathStart(flags, i, j, isGlobal)):
+        for previousState, i0, j0, column in pathMoves(flags, state, i, j,
+                                                       isGlobal):
+            candidate = columnSums(best[previousState, i0, j0], column, matchDistances,
+                                   gapDistance)
+            if candidate[columnsNumber] == best[state, i, j, columnsNumber]:
+                break
+        columns.append(column)
+        if column is not None:
+            columnsNumber -= 1
+        state, i, j = previousState, i0, j0
+    return pathPositions(columns)
+
+
+def columnSums(sums, column, matchDistances, gapDistance):
+    # Returns the least sums of distances by number of columns after a move of
+    # closestPath, given the ones before it.
+    if column is None:
+        return sums
+    i, j = column
+    distance = gapDistance if i == GAP or j == GAP else matchDistances[i, j]
+    return np.concatenate([[np.inf], sums[:-1] + distance])
+
+
+def fillBand(bandScores, m, gapOpen, gapExtend, isGlobal, baseScore, lowOffset):
+    # Version of fillMatrices that only fills a band of diagonals of the matrices. The
+    # matrices are stored in the coordinates of the band: the cell (i, j) is kept at
+    # (i, j - i - lowOffset + 1), so each row has as many cells as the band has
+    # diagonals, plus one cell at each end, always at minus infinity, which keeps the
+    # moves out of the band from being taken. In these coordinates the diagonal move
+    # stays in the same column of the previous row, the move from above comes from
+    # the next column of the previous row, and the one from the left from the previous
+    # column of the same row. bandScores is the matrix of cell scores in the same
+    # coordinates, without the first row (see Aligner.bandScores), and m is the
+    # length of the second sequence. The flags returned are in band coordinates too,
+    # which is what traceback expects when given lowOffset.
+    n = bandScores.shape[0]
+    if gapExtend == 0:
+        H, X, Y = fillBandRows(bandScores, m, gapOpen, gapExtend, isGlobal, baseScore,
+                               lowOffset)
+    else:
+        H, X, Y = fillBandDiagonals(bandScores, m, gapOpen, gapExtend, isGlobal,
+                                    baseScore, lowOffset)
+    flags = bandFlags(H, X, Y, bandScores, m, gapOpen, gapExtend, isGlobal, baseScore,
+                      lowOffset)
+    if isGlobal:
+        return H[n, m - n - lowOffset + 1], n, m, flags
+    end1, column = np.unravel_index(np.argmax(H), H.shape)
+    return H[end1, column], int(end1), int(end1 + column + lowOffset - 1), flags
+
+
+def initialBandMatrices(n, m, gapOpen, gapExtend, isGlobal, scoreType, lowOffset,
+                        width):
+    # Returns the matrices H, X and Y in band coordinates, with the cells of the first
+    # row and column that are in the band filled, and the rest at minus infinity.
+    H = np.full((n+1, width+2), -np.inf, dtype=scoreType)
+    X = np.full((n+1, width+2), -np.inf, dtype=scoreType)
+    Y = np.full((n+1, width+2), -np.inf, dtype=scoreType)
+    for column in range(max(1, 1 - lowOffset), min(width, m - lowOffset + 1) + 1):
+        j = column + lowOffset - 1
+        H[0, column] = borderScore(j, gapOpen, gapExtend, isGlobal)
+        if isGlobal and j > 0:
+            Y[0, column] = H[0, column]
+    for i in range(1, min(n, -lowOffset) + 1):
+        column = 1 - i - lowOffset
+        if column <= width:
+            H[i, column] = borderScore(i, gapOpen, gapExtend, isGlobal)
+            if isGlobal:
+                X[i, column] = H[i, column]
+    return H, X, Y
+
+
+def fillBandRows(bandScores, m, gapOpen, gapExtend, isGlobal, baseScore, lowOffset):
+    # Version of fillRows in band coordinates (see fillBand).
+    n = bandScores.shape[0]
+    width = bandScores.shape[1] - 2
+    H, X, Y = initialBandMatrices(n, m, gapOpen, gapExtend, isGlobal,
+                                  bandScores.dtype.type, lowOffset, width)
+    for i in range(1, n+1):
+        first = max(1, 2 - i - lowOffset)
+        last = min(width, m - i - lowOffset + 1)
+        if first > last:
+            continue
+        cells = slice(first, last+1)
+        matchScore = diagonalScore(H[i-1, cells], bandScores[i-1, cells], baseScore)
+        X[i, cells] = np.maximum(H[i-1, first+1:last+2] - gapOpen,
+                                 X[i-1, first+1:last+2] - gapExtend)
+        a = np.maximum(matchScore, X[i, cells])
+        if not isGlobal:
+            a = np.maximum(a, 0)
+        H[i, cells] = a
+        Y[i, cells] = np.maximum.accumulate(H[i, first-1:last] - gapOpen)
+        np.maximum(H[i, cells], Y[i, cells], out=H[i, cells])
+    return H, X, Y
+
+
+def fillBandDiagonals(bandScores, m, gapOpen, gapExtend, isGlobal, baseScore,
+                      lowOffset):
+    # Version of fillDiagonals in band coordinates (see fillBand). The cell (i, j) of
+    # the anti-diagonal d = i + j is in the column d - 2i - lowOffset + 1.
+    n = bandScores.shape[0]
+    width = bandScores.shape[1] - 2
+    H, X, Y = initialBandMatrices(n, m, gapOpen, gapExtend, isGlobal,
+                                  bandScores.dtype.type, lowOffset, width)
+    for d in range(2, n+m+1):
+        first = max(1, d-m, (d - lowOffset - width + 2) // 2)
+        last = min(n, d-1, (d - lowOffset) // 2)
+        if first > last:
+            continue
+        i = np.arange(first, last+1)
+        column = d - 2*i - lowOffset + 1
+        matchScore = diagonalScore(H[i-1, column], bandScores[i-1, column], baseScore)
+        X[i, column] = np.maximum(H[i-1, column+1] - gapOpen,
+                                  X[i-1, column+1] - gapExtend)
+        Y[i, column] = np.maximum(H[i, column-1] - gapOpen,
+                                  Y[i, column-1] - gapExtend)
+        h = np.maximum(np.maximum(matchScore, X[i, column]), Y[i, column])
+        if not isGlobal:
+            h = np.maximum(h, 0)
+        H[i, column] = h
+    return H, X, Y
+
+
+def bandFlags(H, X, Y, bandScores, m, gapOpen, gapExtend, isGlobal, baseScore,
+              lowOffset):
+    # Version of matrixFlags in band coordinates (see fillBand). Only the cells that
+    # are inside the matrix get flags.
+    n = bandScores.shape[0]
+    width = bandScores.shape[1] - 2
+    flags = np.zeros((n+1, width+2), dtype=np.uint8)
+    columns = np.arange(width+2)
+    j = np.arange(n+1)[:, np.newaxis] + lowOffset + columns[np.newaxis, :] - 1
+    inside = (columns >= 1) & (columns <= width) & (j >= 0) & (j <= m)
+    h = H[1:, 1:-1]
+    x = X[1:, 1:-1]
+    y = Y[1:, 1:-1]
+    matchScore = diagonalScore(H[:-1, 1:-1], bandScores[:, 1:-1], baseScore)
+    inner = flags[1:, 1:-1]
+    inner |= (h == matchScore).view(np.uint8) * np.uint8(DIAGONAL)
+    inner |= (h == y).view(np.uint8) * np.uint8(LEFT)
+    inner |= (h == x).view(np.uint8) * np.uint8(UP)
+    inner |= (x == H[:-1, 2:] - gapOpen).view(np.uint8) * np.uint8(X_OPEN)
+    inner |= (x == X[:-1, 2:] - gapExtend).view(np.uint8) * np.uint8(X_EXTEND)
+    inner |= (y == H[1:, :-2] - gapOpen).view(np.uint8) * np.uint8(Y_OPEN)
+    inner |= (y == Y[1:, :-2] - gapExtend).view(np.uint8) * np.uint8(Y_EXTEND)
+    if not isGlobal:
+        inner |= (h <= 0).view(np.uint8) * np.uint8(STOP)
+    flags[~inside | (j == 0)] = 0
+    firstColumn = inside & (j == 0)
+    firstColumn[0] = False
+    if isGlobal:
+        flags[0, inside[0] & (j[0] > 0)] = LEFT | Y_EXTEND
+        flags[0, inside[0] & (j[0] == 1)] = LEFT | Y_OPEN
+        flags[firstColumn] = UP | X_EXTEND
+        flags[1, firstColumn[1]] = UP | X_OPEN
+    else:
+        flags[0, inside[0]] = STOP
+        flags[firstColumn] = STOP
+    return flags
+
+
+def traceback(flags, end1, end2, isGlobal, lowOffset=None):
+    # Follows the flags back from the cell (end1, end2), and returns two arrays with
+    # the positions of the first and second sequences aligned in each column, or GAP.
+    # From the state H it prefers the diagonal, then the left and then up, and in the
+    # gap states it prefers opening the gap to extending it. If lowOffset is given, the
+    # flags are in the band coordinates of fillBand.
+    i = end1
+    j = end2
+    state = H_STATE
+    path1 = []
+    path2 = []
+    while True:
+        cell = flags[i, j] if lowOffset is None else flags[i, j - i - lowOffset + 1]
+        if state == H_STATE:
+            if (i == 0 and j == 0) or (not isGlobal and cell & STOP):
+                break
+            if cell & DIAGONAL:
+                path1.append(i-1)
+                path2.append(j-1)
+                i -= 1
+                j -= 1
+            elif cell & LEFT:
+                state = Y_STATE
+            else:
+                state = X_STATE
+        elif state == Y_STATE:
+            path1.append(GAP)
+            path2.append(j-1)
+            state = H_STATE if cell & Y_OPEN else Y_STATE
+            j -= 1
+        else:
+            path1.append(i-1)
+            path2.append(GAP)
+            state = H_STATE if cell & X_OPEN else X_STATE
+            i -= 1
+    path1.reverse()
+    path2.reverse()
+    return np.array(path1, dtype=np.int64), np.array(path2, dtype=np.int64)
+
+
+
+#####################
+#####################
+#####################
+###               ###
+###               ###
+###   CONSTANTS   ###
+###   AND KEYS    ###
+###               ###
+###               ###
+#####################
+#####################
+#####################
+
+GAP = -1
+
+####################
+# BANDED ALIGNMENT #
+####################
+AUTO_BAND           = "AUTO"
+# The automatic band has this fraction of the length of the shortest sequence, and at
+# least this number of diagonals, at each side of the diagonals between the corners.
+BAND_FRACTION       = 0.1
+MINIMUM_BAND_MARGIN = 2
+
+####################
+# LOCAL ALIGNMENTS #
+####################
+# Default gap penalties of localFromDistanceMatrix, in units of the score of a match.
+LOCAL_GAP_OPEN   = 1.0
+LOCAL_GAP_EXTEND = 0.5
+
+###################
+# BATCH ALIGNMENT #
+###################
+# Maximum number of cells of the padded matrices aligned in each step of alignBatch.
+BATCH_CELLS = 2**21
+
+####################
+# DISTANCE CUTOFFS #
+####################
+# Margins for the rounding errors when pruning alignments that cannot be within a
+# distance cutoff: an absolute one for the distances, and one for the scores, in
+# units of the machine epsilon of the score type per cell of the path.
+CUTOFF_TOLERANCE = 1e-9
+SCORE_TOLERANCE  = 8
+
+############
+# BACKENDS #
+############
+NUMPY_BACKEND  = "NUMPY"
+NUMBA_BACKEND  = "NUMBA"
+PYTHON_BACKEND = "PYTHON"
+BACKENDS       = [NUMPY_BACKEND, NUMBA_BACKEND, PYTHON_BACKEND]
+
+############################
+# MULTIPLE ALIGNMENT MODES #
+############################
+PROFILES = "PROFILES"
+GENETIC  = "GENETIC_ALGORITHM"
+
+#####################
+# GENETIC ALGORITHM #
+#####################
+SEED_KEY            = "SEED"
+POPULATION_SIZE_KEY = "POPULATION SIZE"
+GENERATIONS_KEY     = "GENERATIONS"
+ELITISM_KEY         = "ELITISM"
+TOURNAMENT_KEY      = "TOURNAMENT SIZE"
+CROSSOVER_RATE_KEY  = "CROSSOVER RATE"
+MUTATION_RATE_KEY   = "MUTATION RATE"
+PATIENCE_KEY        = "PATIENCE"
+TOLERANCE_KEY       = "TOLERANCE"
+TIME_LIMIT_KEY      = "TIME LIMIT"
+PROCESSES_KEY       = "PROCESSES"
+DEFAULT_GENETIC_ARGUMENTS = {SEED_KEY:            0,
+                             POPULATION_SIZE_KEY: 50,
+                             GENERATIONS_KEY:     200,
+                             ELITISM_KEY:         2,
+                             TOURNAMENT_KEY:      3,
+                             CROSSOVER_RATE_KEY:  0.7,
+                             MUTATION_RATE_KEY:   0.5,
+                             PATIENCE_KEY:        30,
+                             TOLERANCE_KEY:       1e-9,
+                             TIME_LIMIT_KEY:      None,
+                             PROCESSES_KEY:       1}
+
+###################
+# TRACEBACK FLAGS #
+###################
+# Moves into the state H of a cell: from the diagonal, from the state Y (gap in the
+# first sequence) or from the state X (gap in the second sequence).
+DIAGONAL = 1
+LEFT     = 2
+UP       = 4
+# Moves into the gap states: opening the gap from H, or extending it.
+X_OPEN   = 8
+X_EXTEND = 16
+Y_OPEN   = 32
+Y_EXTEND = 64
+# Local alignment starts at this cell.
+STOP     = 128
+
+##########
+# STATES #
+##########
+H_STATE = 0
+X_STATE = 1
+Y_STATE = 2
 
-    def __init__(self,substitutionMatrix):
-        # TODO: This creator is actually pretty basic, as it only receives a substitution
-        #       matrix and sets it as its own.
-        self.PROFILES = "PROFILES"
-        self.GENETIC = "GENETIC_ALGORITHM"
-        pass
-
-    def singleAlignment(self, sequence1, sequence2, global=True):
-        # TODO: It needs to implement the alignment for global or local alignment for the
-        #       sequences given. It needs to make the verification that the sequences given
-        #       are valid.
-        pass
-
-    def multipleAlignment(self, sequences, mode=self.PROFILES):
-        # TODO: It needs to implement the multiple alignment of sequences, and it can be
-        #       made according to profile alignment, or genetic algorithms.
-        pass
+###########
+# BACKEND #
+###########
+# Kernels compiled by Numba, and the backend in use, which is the default one until
+# setBackend is called.
+compiledKernels = {}
+currentBackend  = None
+setBackend()
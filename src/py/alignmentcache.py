@@ -0,0 +1,314 @@
+#!/usr/bin/python
+# module linguistics
+
+# This module contains a persistent cache of the results of pairwise
+# alignments, so that rerunning an analysis after a small change of the data
+# only aligns again the pairs of words that changed.
+#
+# Copyright (c) 2025 Universidad de Costa Rica.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#   - Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   - Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   - Neither the name of the <organization> nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL DAVID JIMENEZ BE LIABLE FOR ANY DIRECT, DIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
+# EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Researchers:
+#         David Jimenez <david.jimenezlopez@ucr.ac.cr>
+#         Haakon Krohn <haakonstensrud.krohn@ucr.ac.cr>
+
+import hashlib
+import sqlite3
+import time
+
+import numpy as np
+
+import aligner as al
+
+###################
+###################
+###################
+###             ###
+###             ###
+###   CLASSES   ###
+###             ###
+###             ###
+###################
+###################
+###################
+
+
+#######################
+#######################
+##                   ##
+##  ALIGNMENT CACHE  ##
+##                   ##
+#######################
+#######################
+class AlignmentCache:
+    # Class that keeps the results of pairwise alignments (score, distance and
+    # aligned sequences) in a SQLite database, so that they survive between
+    # runs. Every result is keyed by a hash of the two sequences of codes,
+    # the fingerprint of the aligner (see aligner.Aligner.fingerprint), the
+    # mode of the alignment and a context string, such as the fingerprint of
+    # the phonetic inventory that gave the codes.
+    #
+    # The database is in WAL mode, so any number of processes can read it
+    # while one writes. New results and the times of use of the ones read are
+    # kept in memory and written in a single transaction every
+    # writeBatchSize results (WRITE_BATCH_SIZE by default), and when the cache
+    # is flushed or closed. After every write, the least recently used results
+    # are evicted so that at most maximumEntries remain (MAXIMUM_ENTRIES by
+    # default).
+
+    def __init__(self, fileAddress, maximumEntries=None, writeBatchSize=None):
+        if maximumEntries is None:
+            maximumEntries = MAXIMUM_ENTRIES
+        if writeBatchSize is None:
+            writeBatchSize = WRITE_BATCH_SIZE
+        if maximumEntries < 1 or writeBatchSize < 1:
+            errorString  = "The maximum number of entries and the size of the "
+            errorString += "write batches should be positive. At least one is "
+            errorString += "not."
+            raise ValueError(errorString)
+        self.fileAddress    = fileAddress
+        self.maximumEntries = maximumEntries
+        self.writeBatchSize = writeBatchSize
+        self.pendingResults = {}
+        self.pendingUses    = set()
+        self.hits           = 0
+        self.misses         = 0
+        self.connection     = sqlite3.connect(fileAddress, timeout=BUSY_TIMEOUT)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        with self.connection:
+            self.connection.execute(CREATE_TABLE)
+            self.connection.execute(CREATE_INDEX)
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exception):
+        self.close()
+        return False
+
+
+    def __len__(self):
+        # Number of results stored in the database, without the pending ones.
+        return self.connection.execute(COUNT_ENTRIES).fetchone()[0]
+
+
+    def alignBatch(self, theAligner, sequences1, sequences2, lengths1,
+                   lengths2, isGlobal=True, returnAlignments=False,
+                   context=""):
+        # Works as theAligner.alignBatch (see aligner.Aligner.alignBatch), but
+        # takes the results of the pairs already in the cache from it, and only
+        # aligns the others, all of them in a single batch, adding them to the
+        # cache. Repeated pairs are aligned only once. A warm rerun after a
+        # small change of the data only aligns the pairs that changed.
+        sequences1, lengths1 = theAligner.validateBatch(sequences1, lengths1)
+        sequences2, lengths2 = theAligner.validateBatch(sequences2, lengths2)
+        if len(lengths1) != len(lengths2):
+            errorString  = "There should be as many sequences in both sides of "
+            errorString += "the batch. There are not."
+            raise ValueError(errorString)
+        prefix = settingsPrefix(theAligner, isGlobal, context)
+        keys = [alignmentKey(prefix, sequences1[k, :lengths1[k]],
+                             sequences2[k, :lengths2[k]])
+                for k in range(len(lengths1))]
+        results = self.lookup(set(keys))
+        self.pendingUses.update(results)
+        firstIndices = {}
+        for k, key in enumerate(keys):
+            if key not in results and key not in firstIndices:
+                firstIndices[key] = k
+        self.hits += len(keys) - len(firstIndices)
+        self.misses += len(firstIndices)
+        if firstIndices:
+            missing = np.array(list(firstIndices.values()), dtype=np.int64)
+            batch = theAligner.alignBatch(sequences1[missing],
+                                          sequences2[missing],
+                                          lengths1[missing], lengths2[missing],
+                                          isGlobal, returnAlignments=True)
+            for index, key in enumerate(firstIndices):
+                results[key] = (float(batch.scores[index]),
+                                float(batch.distances[index]),
+                                batch.alignedSequences1[index],
+                                batch.alignedSequences2[index])
+                self.store(key, *results[key])
+        scores = np.array([results[key][0] for key in keys],
+                          dtype=theAligner.scoreType)
+        distances = np.array([results[key][1] for key in keys],
+                             dtype=np.float64)
+        if not returnAlignments:
+            return al.BatchAlignment(scores, distances)
+        return al.BatchAlignment(scores, distances,
+                                 [results[key][2] for key in keys],
+                                 [results[key][3] for key in keys])
+
+
+    def lookup(self, keys):
+        # Returns a dictionary with the results of the given keys that are in
+        # the cache, pending or already written, as tuples (score, distance,
+        # alignedSequence1, alignedSequence2).
+        results = {key: self.pendingResults[key] for key in keys
+                   if key in self.pendingResults}
+        keys = [key for key in keys if key not in results]
+        for start in range(0, len(keys), LOOKUP_BATCH_SIZE):
+            chunk = keys[start:start + LOOKUP_BATCH_SIZE]
+            query = SELECT_ENTRIES % ", ".join("?" * len(chunk))
+            for row in self.connection.execute(query, chunk):
+                key, score, distance, aligned1, aligned2 = row
+                results[key] = (score, np.nan if distance is None else distance,
+                                decodeSequence(aligned1),
+                                decodeSequence(aligned2))
+        return results
+
+
+    def store(self, key, score, distance, alignedSequence1, alignedSequence2):
+        # Adds a result to the pending ones, writing them all if there are
+        # enough of them.
+        self.pendingResults[key] = (score, distance, alignedSequence1,
+                                    alignedSequence2)
+        if len(self.pendingResults) >= self.writeBatchSize:
+            self.flush()
+
+
+    def flush(self):
+        # Writes the pending results and times of use in a single transaction,
+        # and evicts the least recently used results if there are too many.
+        now = time.time()
+        rows = [(key, score, None if np.isnan(distance) else distance,
+                 encodeSequence(aligned1), encodeSequence(aligned2), now)
+                for key, (score, distance, aligned1, aligned2)
+                in self.pendingResults.items()]
+        uses = [(now, key) for key in self.pendingUses
+                if key not in self.pendingResults]
+        if rows or uses:
+            with self.connection:
+                self.connection.executemany(INSERT_ENTRY, rows)
+                self.connection.executemany(UPDATE_USE, uses)
+                entries = self.connection.execute(COUNT_ENTRIES).fetchone()[0]
+                excess = entries - self.maximumEntries
+                if excess > 0:
+                    self.connection.execute(EVICT_ENTRIES, (excess,))
+        self.pendingResults = {}
+        self.pendingUses = set()
+
+
+    def clear(self):
+        # Removes all the results from the cache.
+        self.pendingResults = {}
+        self.pendingUses = set()
+        with self.connection:
+            self.connection.execute(DELETE_ENTRIES)
+
+
+    def close(self):
+        # Writes the pending results and closes the database.
+        if self.connection is not None:
+            self.flush()
+            self.connection.close()
+            self.connection = None
+
+
+
+#####################
+#####################
+#####################
+###               ###
+###               ###
+###   FUNCTIONS   ###
+###               ###
+###               ###
+#####################
+#####################
+#####################
+
+def settingsPrefix(theAligner, isGlobal, context):
+    # Returns the part of the keys shared by all the alignments made with the
+    # same aligner, mode and context.
+    settings = (theAligner.fingerprint(), bool(isGlobal), str(context))
+    return repr(settings).encode("utf-8")
+
+
+def alignmentKey(prefix, sequence1, sequence2):
+    # Returns the key of the alignment of two sequences of codes with the
+    # settings of the prefix (see settingsPrefix), as a SHA-1 digest. The
+    # length of the first sequence is hashed too, so that no two pairs of
+    # sequences give the same bytes.
+    digest = hashlib.sha1(prefix)
+    digest.update(np.int64(len(sequence1)).tobytes())
+    digest.update(encodeSequence(sequence1))
+    digest.update(encodeSequence(sequence2))
+    return digest.digest()
+
+
+def encodeSequence(sequence):
+    # Returns the bytes of a sequence of codes, possibly with gaps, as little
+    # endian 32 bit integers.
+    return np.asarray(sequence, dtype="<i4").tobytes()
+
+
+def decodeSequence(data):
+    # Inverse of encodeSequence.
+    return np.frombuffer(data, dtype="<i4").astype(np.int64)
+
+
+
+#####################
+#####################
+#####################
+###               ###
+###               ###
+###   CONSTANTS   ###
+###   AND KEYS    ###
+###               ###
+###               ###
+#####################
+#####################
+#####################
+
+# By default, the cache keeps at most this many results, and writes the new
+# ones every this many.
+MAXIMUM_ENTRIES  = 2**22
+WRITE_BATCH_SIZE = 2**12
+
+# Keys looked up per query, below the limit of parameters of SQLite.
+LOOKUP_BATCH_SIZE = 500
+
+# Seconds to wait for a lock held by another process.
+BUSY_TIMEOUT = 60.0
+
+CREATE_TABLE   = "CREATE TABLE IF NOT EXISTS alignments (key BLOB PRIMARY " + \
+                 "KEY, score REAL, distance REAL, aligned1 BLOB, aligned2 " + \
+                 "BLOB, lastUse REAL)"
+CREATE_INDEX   = "CREATE INDEX IF NOT EXISTS alignmentsByUse ON alignments " + \
+                 "(lastUse)"
+COUNT_ENTRIES  = "SELECT COUNT(*) FROM alignments"
+SELECT_ENTRIES = "SELECT key, score, distance, aligned1, aligned2 FROM " + \
+                 "alignments WHERE key IN (%s)"
+INSERT_ENTRY   = "INSERT OR REPLACE INTO alignments VALUES (?, ?, ?, ?, ?, ?)"
+UPDATE_USE     = "UPDATE alignments SET lastUse = ? WHERE key = ?"
+EVICT_ENTRIES  = "DELETE FROM alignments WHERE key IN (SELECT key FROM " + \
+                 "alignments ORDER BY lastUse LIMIT ?)"
+DELETE_ENTRIES = "DELETE FROM alignments"
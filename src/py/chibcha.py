@@ -44,6 +44,9 @@ import pandas as pd
 import numpy as np
 import math
 
+import aligner as al
+import symboltable as st
+
 
 VOCALS = ['i', '1', 'u', 'I', 'U', 'e', '7', 'o', 'a', 'O','i~','1~','u~','I~',
           'e~','7~','o~','a~','0~']
@@ -160,15 +163,24 @@ def arePhonemesOfSameType(phoneme1,phoneme2):
            (phoneme1 in CONSONANTS and phoneme2 in CONSONANTS)
 
 
-def alignWords(word1, word2):
+def alignWords(word1, word2, closest=False):
     # This function takes two strings and alings them using the basic idea of
     # the Needleman Wunst algorithm.
     #
-    # NOTE: This method should be improved by providing all the possible optimal
-    #       alignments when there is more than one, to meassure later the
-    #       distances of all the alignments and choose the minimal.
+    # If closest is True, among all the optimal alignments, it returns the one
+    # with the least distance (as computed by wordDistance), which is found by
+    # aligner.Aligner.closestOptimalAlignment without listing them all.
     word1 = splitWord(word1)
     word2 = splitWord(word2)
+    if closest:
+        phonemes, codes, theAligner = phonemeAligner([word1, word2])
+        alignment = theAligner.closestOptimalAlignment(
+                                    [codes[phoneme] for phoneme in word1],
+                                    [codes[phoneme] for phoneme in word2])
+        return ([phonemes[c] if c != al.GAP else ' '
+                 for c in alignment.alignedSequence1.tolist()],
+                [phonemes[c] if c != al.GAP else ' '
+                 for c in alignment.alignedSequence2.tolist()])
     directionMatrix = createDirectionMatrix(word1, word2)
     return finalWordAlignment(word1, word2, directionMatrix)
     # alignedWord1, alignedWord2 =  finalWordAlignment(word1, word2,
@@ -203,52 +215,26 @@ def finalWordAlignment(word1,word2,directionMatrix):
 
 
 def createDirectionMatrix(word1,word2):
-    # This function returns the distance matrix from the alignment of the words
+    # This function returns the direction matrix from the alignment of the words
     # given using the basic idea of Needleman Wunst. The direction matrix has
     # the following standard to denote the direction of procedence:
     #   0: It comes from nowhere. Only the origin should have this.
     #   1: From above
     #   2: From left
     #   3: From diagonal
-    K = len(word1)
-    N = len(word2)
-    alignmentMatrix = np.empty((K+1,N+1))
-    directionMatrix = np.empty((K+1,N+1))
-    alignmentMatrix[:] = np.nan
-    alignmentMatrix[:,0] = 0
-    alignmentMatrix[0,:] = 0
-    directionMatrix[:] = np.nan
-    directionMatrix[:,0] = 1
-    directionMatrix[0,:] = 2
-    directionMatrix[0,0] = 0
-    for k in range(K):
-        phoneme1 = word1[k]
-        for n in range(N):
-            phoneme2 = word2[n]
-            phoneme_distance = phonemeDistance(phoneme1,phoneme2)
-            upwards   = alignmentMatrix[k,n+1]
-            leftwards = alignmentMatrix[k+1,n]
-            diagwards = alignmentMatrix[k,n] + 1 - phoneme_distance
-            alignmentMatrix[k+1,n+1] = max(upwards,leftwards,diagwards)
-            directionMatrix[k+1, n+1] = \
-                                defineDirection(upwards,leftwards,diagwards)
+    # The matrices are filled by aligner.fillMatrices, adding 1 minus the
+    # phoneme distance on the diagonal, with no gap penalty.
+    distances = np.array([[phonemeDistance(phoneme1, phoneme2) for phoneme2 in
+                           word2] for phoneme1 in word1], dtype=float)
+    distances = distances.reshape(len(word1), len(word2))
+    _, _, _, flags = al.fillMatrices(distances, 0, 0, True, baseScore=1)
+    directionMatrix = np.where(flags & al.DIAGONAL, 3,
+                      np.where(flags & al.LEFT, 2,
+                      np.where(flags & al.UP, 1, 0))).astype(float)
     return directionMatrix
 
 
 
-def defineDirection(upwards,leftwards,diagwards):
-    # This simple method defines the direction that is used by
-    # createDirectionMatrix and alignWords functions.
-    D = max(upwards,leftwards,diagwards)
-    if D == diagwards:
-        return 3
-    elif D == leftwards:
-        return 2
-    else:
-        return 1
-
-
-
 def wordDistance(word1,word2):
     # This function assumes that the arguments are words already aligned and
     # thus, they have the same length. It computes the average distance of the
@@ -260,31 +246,93 @@ def wordDistance(word1,word2):
 def languageDistance(language1,language2):
     common_lexicon = [word for word in list(language1.keys())
                             if word in list(language2.keys())]
-    distances = []
-    for word in common_lexicon:
-        word1 = splitWord(language1[word])
-        word2 = splitWord(language2[word])
-        word1, word2 = alignWords(word1,word2)
-        d = wordDistance(word1,word2)
-        distances.append(d)
+    distances = batchWordDistances(
+                        [splitWord(language1[word]) for word in common_lexicon],
+                        [splitWord(language2[word]) for word in common_lexicon])
     return sum(distances)/len(distances)
 
 def languageMatrix():
     # This function takes the list of languages and computes the matrix of one
-    # to one distances. As we are looking for the lowest
+    # to one distances. As we are looking for the lowest. The words of all the
+    # pairs of languages are aligned together, in a single batch.
     language_list = list(chibchan_swadesh_lists.keys())
     K = len(language_list)
     language_matrix = np.zeros([K,K])
     np.fill_diagonal(language_matrix,1)
+    words1 = []
+    words2 = []
+    pairs = []
     for k in range(K):
         for n in range(k):
-            d = languageDistance(chibchan_swadesh_lists[language_list[k]],
-                                 chibchan_swadesh_lists[language_list[n]],)
-            language_matrix[n,k] = d
-            language_matrix[k,n] = d
+            language1 = chibchan_swadesh_lists[language_list[k]]
+            language2 = chibchan_swadesh_lists[language_list[n]]
+            common_lexicon = [word for word in list(language1.keys())
+                                    if word in list(language2.keys())]
+            words1 += [splitWord(language1[word]) for word in common_lexicon]
+            words2 += [splitWord(language2[word]) for word in common_lexicon]
+            pairs.append((k, n, len(common_lexicon)))
+    distances = batchWordDistances(words1, words2)
+    start = 0
+    for k, n, count in pairs:
+        d = sum(distances[start:start+count])/count
+        language_matrix[n,k] = d
+        language_matrix[k,n] = d
+        start += count
     return language_matrix
 
 
+def areWordsWithinDistance(word1, word2, cutoff):
+    # This function tells if the distance of the alignment of the two words,
+    # as computed by wordDistance after alignWords, is at most cutoff. Pairs
+    # of words that are far apart are discarded from their lengths and
+    # phonemes alone, or by stopping the alignment early (see
+    # aligner.Aligner.isWithinDistance).
+    word1 = splitWord(word1)
+    word2 = splitWord(word2)
+    phonemes, codes, theAligner = phonemeAligner([word1, word2])
+    return theAligner.isWithinDistance([codes[phoneme] for phoneme in word1],
+                                       [codes[phoneme] for phoneme in word2],
+                                       cutoff)
+
+
+def batchWordDistances(words1, words2, cutoff=None):
+    # This function aligns every word of words1 with the corresponding word of
+    # words2, as alignWords does, and returns the list of the distances of the
+    # alignments, as computed by wordDistance. The phonemes are given integer
+    # codes, so that all the pairs are aligned at once by
+    # aligner.Aligner.alignBatch, with the same arithmetic as alignWords.
+    # As alignWords, it splits the words (again, if they were already split).
+    #
+    # If cutoff is given, the distances above it are replaced by infinity, and
+    # most of those pairs are not even aligned (see
+    # aligner.Aligner.screenBatch).
+    words1 = [splitWord(word) for word in words1]
+    words2 = [splitWord(word) for word in words2]
+    phonemes, codes, theAligner = phonemeAligner(words1 + words2)
+    sequences1, lengths1 = al.padSequences([[codes[phoneme] for phoneme in word]
+                                            for word in words1])
+    sequences2, lengths2 = al.padSequences([[codes[phoneme] for phoneme in word]
+                                            for word in words2])
+    if cutoff is not None:
+        return theAligner.screenBatch(sequences1, sequences2, lengths1,
+                                      lengths2, cutoff).tolist()
+    batch = theAligner.alignBatch(sequences1, sequences2, lengths1, lengths2)
+    return batch.distances.tolist()
+
+
+def phonemeAligner(words):
+    # This function gives an integer code to every phoneme of the words, which
+    # are already split, and returns the list of phonemes, the dictionary of
+    # their codes and an aligner.Aligner that aligns words written with these
+    # codes with the same arithmetic as alignWords.
+    phonemes = sorted(set(phoneme for word in words for phoneme in word))
+    codes = {phoneme: k for k, phoneme in enumerate(phonemes)}
+    distances = np.array([[phonemeDistance(phoneme1, phoneme2) for phoneme2 in
+                           phonemes] for phoneme1 in phonemes], dtype=float)
+    distances = distances.reshape(len(phonemes), len(phonemes))
+    return phonemes, codes, al.fromDistanceMatrix(distances)
+
+
 def branchingStep(matrix,nodes):
     # This function makes a single step on the branching of the phylogenetic
     # tree. It assumes that nodes is an array 1xN, and that matrix is an numpy
@@ -339,6 +387,16 @@ def splitWord(word):
     return phonemes
 
 
+def phonemeIds(word):
+    # This function splits the word, as splitWord does, and returns the array
+    # of the IDs of its phonemes in the shared table of symbols (see
+    # symboltable.SymbolTable), the same IDs of the IPA symbols of the
+    # phonetic inventories, so that the words of the lists can be compared
+    # with the data of the other modules. All the phonemes of the lists are
+    # in the default table, so the IDs are the same in every process.
+    return st.SYMBOLS.ids(splitWord(word), st.CHIBCHA)
+
+
 def prepareGramMatrix(theMatrix):
     # This method is implemented as the reviewer wants a two dimentional spacial
     # representation of the points that represent the languages. We assume the
@@ -40,8 +40,18 @@
 # This module contains the methods, classes and variables necessary for the
 # implementation of a cognate corpus object necessary for a research project.
 
+import json
+import os
+import sys
+import tempfile
+import warnings
+
+import numpy as np
 import pandas as pd
 
+import aligner as al
+
+from collections.abc import Mapping, Sequence
 from math import isnan
 
 ###################
@@ -75,9 +85,12 @@ class CognateCorpus:
         # TODO:
         #   1.
         #
+        self.inventoryFingerprint = None
         self.initialValidation(arguments)
         if self.isDefinedBySpreedsheet(arguments):
             self.defineCorpusFromSpreadsheet(arguments)
+        elif self.isDefinedByMemoryMap(arguments):
+            self.load(arguments[MEMORY_MAP_ADDRESS_KEY])
 
 
     def initialValidation(self,arguments):
@@ -100,6 +113,17 @@ class CognateCorpus:
                 errorString  = "The BY_SPREADSHEET_VALUE field should be a "
                 errorString += "boolean. It is not."
                 raise ValueError(errorString)
+        if BY_MEMORY_MAP_KEY in arguments.keys():
+            if not isinstance(arguments[BY_MEMORY_MAP_KEY], bool):
+                errorString  = "The BY_MEMORY_MAP_VALUE field should be a "
+                errorString += "boolean. It is not."
+                raise ValueError(errorString)
+            if arguments[BY_MEMORY_MAP_KEY] and \
+                                not MEMORY_MAP_ADDRESS_KEY in arguments.keys():
+                errorString  = "If the corpus is defined by memory map, the "
+                errorString += "address of the saved corpus must be provided. "
+                errorString += "It is not."
+                raise ValueError(errorString)
 
 
     def isDefinedBySpreedsheet(self, arguments):
@@ -112,6 +136,13 @@ class CognateCorpus:
             return arguments[BY_SPREADSHEET_KEY]
 
 
+    def isDefinedByMemoryMap(self, arguments):
+        if not BY_MEMORY_MAP_KEY in arguments.keys():
+            return False
+        else:
+            return arguments[BY_MEMORY_MAP_KEY]
+
+
     def defineCorpusFromSpreadsheet(self, arguments):
         #
         # TODO: Implement.
@@ -125,61 +156,519 @@ class CognateCorpus:
         numberOfValues = len(self.termList)
         numberOfLanguages = len(self.languageNames)
         self.languageNames.pop(0)
-        self.dictionary = {}
         self.type = DICTIONARY
-        for language in self.languageNames:
-            tempDict = {}
-            for k in range(numberOfValues):
-                term = self.termList[k]
+        self.forms      = []
+        self.formIndex  = {}
+        self.codeMatrix = np.full((numberOfValues, len(self.languageNames)),
+                                  MISSING_FORM, dtype=np.int32)
+        for k in range(numberOfValues):
+            for n, language in enumerate(self.languageNames):
                 word = corpusDict[language][k]
                 isEmpty = isinstance(word,float) and isnan(word)
-                if isEmpty:
-                    tempDict[term] = EMPTY_WORD
-                else:
-                    tempDict[term] = word
-
-            self.dictionary[language] = tempDict
+                if not isEmpty:
+                    self.codeMatrix[k, n] = self.internForm(word)
+        self.createDictionaries()
         self.createCorpusList()
 
 
+    def internForm(self, word):
+        # Returns the id of the word in the form table, adding it if it is not
+        # there yet. All the structures of the corpus refer to the single copy
+        # of the word kept in the table.
+        formId = self.formIndex.get(word)
+        if formId is None:
+            formId = len(self.forms)
+            if isinstance(word, str):
+                word = sys.intern(word)
+            self.forms.append(word)
+            self.formIndex[word] = formId
+        return formId
+
+
+    def formId(self, word):
+        # Returns the id of the word in the form table. For memory mapped
+        # corpora, the index is only built the first time it is needed.
+        if self.formIndex is None:
+            self.formIndex = {form: k for k, form in enumerate(self.forms)}
+        return self.formIndex[word]
+
+
+    def createDictionaries(self):
+        self.dictionary = {}
+        for n, language in enumerate(self.languageNames):
+            column = self.codeMatrix[:, n]
+            self.dictionary[language] = \
+                    {term: EMPTY_WORD if column[k] == MISSING_FORM \
+                                      else self.forms[column[k]] \
+                        for k, term in enumerate(self.termList)}
+
+
     def createCorpusList(self):
         self.corpus = []
-        for term in self.termList:
-            tempCognateList = []
-            for language in self.languageNames:
-                word = self.dictionary[language][term]
-                if word != EMPTY_WORD:
-                    tempCognateList.append(word)
+        for row in self.codeMatrix:
+            tempCognateList = [self.forms[formId] for formId in row \
+                                        if formId != MISSING_FORM]
             if len(tempCognateList) > 0:
                 self.corpus.append(tempCognateList)
 
 
     def flattenCorpus(self):
-        flattenedCorpus = []
-        for termGroup in self.corpus:
-            for word in termGroup:
-                if word not in flattenedCorpus:
-                    flattenedCorpus.append(word)
-        return flattenedCorpus
+        # Returns the list of distinct words of the corpus, in the order in
+        # which they first appear when the corpus is read term by term.
+        return [self.forms[formId] for formId in self.distinctFormIds()]
+
+
+    def distinctFormIds(self):
+        # Returns the ids of the forms in the order in which they first appear
+        # in the code matrix. The matrix is read in blocks of rows, so, if it
+        # is memory mapped, only a block is paged in at a time.
+        seen = np.zeros(len(self.forms), dtype=bool)
+        formIds = []
+        numberOfTerms = self.codeMatrix.shape[0]
+        for start in range(0, numberOfTerms, CHUNK_SIZE):
+            block = np.asarray(self.codeMatrix[start:start+CHUNK_SIZE]).ravel()
+            block = block[block != MISSING_FORM]
+            uniqueIds, firstPositions = np.unique(block, return_index=True)
+            uniqueIds = uniqueIds[np.argsort(firstPositions)]
+            newIds = uniqueIds[~seen[uniqueIds]]
+            seen[newIds] = True
+            formIds.extend(newIds.tolist())
+        return formIds
+
+
+    def bindInventory(self, inventory):
+        # Binds the corpus to a phonetic inventory: every distinct form of the
+        # corpus is parsed a single time and stored as an array of phoneme
+        # codes (see PhoneticInventory.encode). The arrays of all the forms
+        # are kept concatenated in parsedPhonemes, the one of the form with
+        # id k being parsedPhonemes[parsedOffsets[k]:parsedOffsets[k+1]]. If the
+        # corpus is already bound to an inventory with the same fingerprint,
+        # nothing is parsed again.
+        fingerprint = inventory.fingerprint()
+        if self.isBoundTo(fingerprint):
+            return
+        encodedForms = [inventory.encode(form) for form in self.forms]
+        self.parsedOffsets = np.zeros(len(encodedForms) + 1, dtype=np.int64)
+        self.parsedOffsets[1:] = np.cumsum([len(codes) for codes in \
+                                                                encodedForms])
+        if len(encodedForms) > 0:
+            self.parsedPhonemes = np.concatenate(encodedForms)
+        else:
+            self.parsedPhonemes = np.zeros(0, dtype=np.int16)
+        self.inventoryFingerprint = fingerprint
+
+
+    def isBoundTo(self, fingerprint):
+        # Returns True if the phoneme cache was built with an inventory with
+        # the given fingerprint.
+        return self.inventoryFingerprint == fingerprint
+
+
+    def parsedForm(self, word):
+        # Returns the array of phoneme codes of a word of the corpus. The
+        # corpus must have been bound to an inventory first.
+        if self.inventoryFingerprint is None:
+            errorString  = "The corpus is not bound to a phonetic inventory. "
+            errorString += "The method bindInventory should be called first."
+            raise ValueError(errorString)
+        return self.parsedFormById(self.formId(word))
+
+
+    def parsedFormById(self, formId):
+        # Same as parsedForm, but receives the id of the form in the table.
+        return self.parsedPhonemes[self.parsedOffsets[formId]:\
+                                   self.parsedOffsets[formId+1]]
 
 
     def load(self, fileAddress):
-        # This method would load the phonetic inventory from a file saved
-        # directly to disc.
-        #
-        # TODO:
-        #  1. Implement
-        #
-        pass
+        # This method loads a corpus saved with the method save. The forms and
+        # the code matrix are not read into memory, but memory mapped, so the
+        # accessors page the data in on demand. The attributes dictionary and
+        # corpus keep their usual interface.
+        headerAddress = os.path.join(fileAddress, HEADER_FILE)
+        if not os.path.isfile(headerAddress):
+            errorString  = "There is no saved corpus at the address "
+            errorString += str(fileAddress) + "."
+            raise ValueError(errorString)
+        with open(headerAddress, encoding="utf-8") as headerFile:
+            header = json.load(headerFile)
+        self.termList      = header[TERMS_FIELD]
+        self.languageNames = header[LANGUAGES_FIELD]
+        heap    = np.load(os.path.join(fileAddress, FORM_HEAP_FILE),
+                          mmap_mode="r")
+        offsets = np.load(os.path.join(fileAddress, FORM_OFFSETS_FILE),
+                          mmap_mode="r")
+        self.forms      = FormHeap(heap, offsets)
+        self.formIndex  = None
+        self.codeMatrix = np.load(os.path.join(fileAddress, CODE_MATRIX_FILE),
+                                  mmap_mode="r")
+        self.type       = MEMORY_MAP
+        self.inventoryFingerprint = None
+        termIndex = {term: k for k, term in enumerate(self.termList)}
+        self.dictionary = {}
+        for n, language in enumerate(self.languageNames):
+            self.dictionary[language] = MappedLanguageDictionary(
+                    self.forms, self.codeMatrix, termIndex, self.termList, n)
+        self.corpus = MappedCorpusList(self.forms, self.codeMatrix)
 
 
     def save(self, fileAddress):
-        # This method would save the phonetic inventory to a file saved directly to disc.
+        # This method saves the corpus to a directory on disc, in the format
+        # read by the method load: a heap with all the distinct forms encoded
+        # in UTF-8, an array with the offsets of each form in the heap, and a
+        # matrix of terms by languages with the id of the corresponding form,
+        # or MISSING_FORM if there is none.
         #
-        # TODO:
-        #  1. Implement
+        # Every file is written to a temporary file in the directory and then
+        # moved over the old one, so that a memory mapped corpus can be saved
+        # to the directory it was loaded from: its mappings keep reading the
+        # old files, which are only removed once they are closed.
+        if self.type == MEMORY_MAP:
+            heap       = self.forms.heap
+            offsets    = self.forms.offsets
+            codeMatrix = self.codeMatrix
+        else:
+            encoded    = [str(form).encode("utf-8") for form in self.forms]
+            codeMatrix = self.codeMatrix
+            offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+            offsets[1:] = np.cumsum([len(form) for form in encoded])
+            heap = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        os.makedirs(fileAddress, exist_ok=True)
+        header = {TERMS_FIELD: list(self.termList),
+                  LANGUAGES_FIELD: list(self.languageNames)}
+        replaceFile(os.path.join(fileAddress, FORM_HEAP_FILE),
+                    lambda file: np.save(file, heap))
+        replaceFile(os.path.join(fileAddress, FORM_OFFSETS_FILE),
+                    lambda file: np.save(file, offsets))
+        replaceFile(os.path.join(fileAddress, CODE_MATRIX_FILE),
+                    lambda file: np.save(file, codeMatrix))
+        replaceFile(os.path.join(fileAddress, HEADER_FILE),
+                    lambda file: file.write(json.dumps(
+                            header, ensure_ascii=False,
+                            default=str).encode("utf-8")))
+
+
+    def distanceTensor(self, inventory, theAligner=None, cache=None):
+        # Returns an array of shape (terms, languages, languages) and type
+        # float32, where the entry [k, m, n] is the distance between the words
+        # of the k-th term in the m-th and n-th languages, as computed by
+        # alignmentDistance. If any of the two words is missing, the entry is
+        # NaN. The terms are aligned in blocks (see termPairBlocks), every pair
+        # of distinct forms of a block only once, all of them in a single batch
+        # (see alignFormPairs), and the forms are taken already parsed from the
+        # phoneme cache. By default, the words are aligned as in the module
+        # chibcha, with the distances of the inventory.
         #
-        pass
+        # If an alignmentcache.AlignmentCache is given, the alignments already
+        # made with the same aligner and inventory are taken from it, so
+        # after editing a few words only their pairs are aligned again.
+        self.bindInventory(inventory)
+        if theAligner is None:
+            theAligner = al.fromDistanceMatrix(inventory.distanceMatrix())
+        numberOfTerms, numberOfLanguages = self.codeMatrix.shape
+        tensor = np.full((numberOfTerms, numberOfLanguages, numberOfLanguages),
+                         np.nan, dtype=np.float32)
+        for k in range(numberOfTerms):
+            row = np.asarray(self.codeMatrix[k])
+            present = np.flatnonzero(row != MISSING_FORM)
+            tensor[k, present, present] = 0
+        for pairs, cells in self.termPairBlocks():
+            batch = alignFormPairs(pairs, self.parsedFormById, theAligner,
+                                   cache=cache,
+                                   context=self.inventoryFingerprint)
+            distances = batch.distances
+            for k, m, n, pairIndex in cells:
+                tensor[k, m, n] = distances[pairIndex]
+                tensor[k, n, m] = distances[pairIndex]
+            # The block is dropped before the next one is built.
+            del pairs, cells, batch, distances
+        return tensor
+
+
+    def cognateCandidates(self, inventory, cutoff, theAligner=None):
+        # Returns the list of the tuples (k, m, n, distance), with m > n, for
+        # the pairs of words of the k-th term in the m-th and n-th languages
+        # whose distance, as in distanceTensor, is at most cutoff. Most pairs
+        # of words are far apart, and they are discarded from their lengths
+        # and phonemes alone, without aligning them (see
+        # aligner.Aligner.screenBatch).
+        self.bindInventory(inventory)
+        if theAligner is None:
+            theAligner = al.fromDistanceMatrix(inventory.distanceMatrix())
+        candidates = []
+        for pairs, cells in self.termPairBlocks():
+            distances = screenFormPairs(pairs, self.parsedFormById, theAligner,
+                                        cutoff)
+            candidates += [(k, m, n, float(distances[pairIndex]))
+                           for k, m, n, pairIndex in cells
+                           if distances[pairIndex] <= cutoff]
+            del pairs, cells, distances
+        return candidates
+
+
+    def termPairBlocks(self):
+        # Generates, for blocks of consecutive terms, the list of the distinct
+        # pairs of form ids of words of the same term, and the list of the
+        # tuples (k, m, n, pairIndex), with m > n, saying that the words of the
+        # k-th term in the m-th and n-th languages are the pair with index
+        # pairIndex. All of them are ints, not numpy integers. A block ends
+        # once the dynamic programming matrices of its pairs have about
+        # aligner.BATCH_CELLS cells, so memory does not grow with the corpus.
+        pairIndices = {}
+        cells = []
+        blockCells = 0
+        lengths = np.diff(np.asarray(self.parsedOffsets))
+        for k in range(self.codeMatrix.shape[0]):
+            if blockCells >= al.BATCH_CELLS:
+                yield list(pairIndices), cells
+                pairIndices = {}
+                cells = []
+                blockCells = 0
+            row = np.asarray(self.codeMatrix[k]).tolist()
+            present = [m for m, formId in enumerate(row)
+                       if formId != MISSING_FORM]
+            for a in range(len(present)):
+                m = present[a]
+                for n in present[:a]:
+                    pair = (row[m], row[n])
+                    if pair not in pairIndices:
+                        pairIndices[pair] = len(pairIndices)
+                        blockCells += int(lengths[pair[0]] + 1) * \
+                                      int(lengths[pair[1]] + 1)
+                    cells.append((k, m, n, pairIndices[pair]))
+        if len(cells) > 0:
+            yield list(pairIndices), cells
+
+
+    def alignTerm(self, termIndex, inventory, theAligner=None):
+        # Aligns all together the words of the term with the given index in
+        # the languages where it is present (see aligner.Aligner.
+        # multipleAlignment), which is the cognate set alignment from which
+        # the sound correspondences of the term are read. Returns the list of
+        # the indices of those languages and the MultipleAlignment, whose
+        # rows follow the same order. By default, the words are aligned as in
+        # the module chibcha, with the distances of the inventory.
+        self.bindInventory(inventory)
+        if theAligner is None:
+            theAligner = al.fromDistanceMatrix(inventory.distanceMatrix())
+        row = np.asarray(self.codeMatrix[termIndex])
+        languages = np.flatnonzero(row != MISSING_FORM).tolist()
+        return languages, theAligner.multipleAlignment(
+                    [self.parsedFormById(row[m]) for m in languages])
+
+
+
+############
+############
+##        ##
+##  FORM  ##
+##  HEAP  ##
+##        ##
+############
+############
+class FormHeap(Sequence):
+    # Read only table of forms stored as a single UTF-8 heap plus an array of
+    # offsets, where the form with id k occupies heap[offsets[k]:offsets[k+1]].
+    # Both arrays might be memory mapped, in which case only the bytes of the
+    # forms actually requested are read from disc.
+
+    def __init__(self, heap, offsets):
+        self.heap    = heap
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, formId):
+        start = int(self.offsets[formId])
+        end   = int(self.offsets[formId + 1])
+        return self.heap[start:end].tobytes().decode("utf-8")
+
+
+
+##################
+##################
+##              ##
+##    MAPPED    ##
+##   LANGUAGE   ##
+##  DICTIONARY  ##
+##              ##
+##################
+##################
+class MappedLanguageDictionary(Mapping):
+    # Dictionary of a single language of a memory mapped corpus. It behaves as
+    # the dictionaries built by defineCorpusFromSpreadsheet, that is, every
+    # term is a key, and missing words are given as EMPTY_WORD, but the words
+    # are only decoded when they are requested.
+
+    def __init__(self, forms, codeMatrix, termIndex, termList, languageIndex):
+        self.forms         = forms
+        self.codeMatrix    = codeMatrix
+        self.termIndex     = termIndex
+        self.termList      = termList
+        self.languageIndex = languageIndex
+
+    def __len__(self):
+        return len(self.termList)
+
+    def __iter__(self):
+        return iter(self.termList)
+
+    def __getitem__(self, term):
+        formId = int(self.codeMatrix[self.termIndex[term], self.languageIndex])
+        if formId == MISSING_FORM:
+            return EMPTY_WORD
+        return self.forms[formId]
+
+
+
+##############
+##############
+##          ##
+##  MAPPED  ##
+##  CORPUS  ##
+##   LIST   ##
+##          ##
+##############
+##############
+class MappedCorpusList(Sequence):
+    # Equivalent to the list built by createCorpusList, for a memory mapped
+    # corpus: the k-th element is the list of words of the k-th term that has
+    # at least one word, in the order of the languages.
+
+    def __init__(self, forms, codeMatrix):
+        self.forms      = forms
+        self.codeMatrix = codeMatrix
+        presentTerms = []
+        for start in range(0, codeMatrix.shape[0], CHUNK_SIZE):
+            block = np.asarray(codeMatrix[start:start+CHUNK_SIZE])
+            presentTerms.append(start + \
+                        np.flatnonzero((block != MISSING_FORM).any(axis=1)))
+        self.presentTerms = np.concatenate(presentTerms) if presentTerms \
+                                else np.zeros(0, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.presentTerms)
+
+    def __getitem__(self, k):
+        if isinstance(k, slice):
+            return [self[n] for n in range(*k.indices(len(self)))]
+        row = np.asarray(self.codeMatrix[self.presentTerms[k]])
+        return [self.forms[int(formId)] for formId in row \
+                                        if formId != MISSING_FORM]
+
+
+
+#####################
+#####################
+#####################
+###               ###
+###               ###
+###   FUNCTIONS   ###
+###      AND      ###
+###    METHODS    ###
+###               ###
+###               ###
+#####################
+#####################
+#####################
+
+
+def replaceFile(fileAddress, write):
+    # Writes a file by calling write with a temporary file, open in binary
+    # mode in the same directory, and then moving it to fileAddress, so that
+    # the old file, if there is one, is replaced at once and never truncated.
+    directory = os.path.dirname(os.path.abspath(fileAddress))
+    temporary = tempfile.NamedTemporaryFile(dir=directory, delete=False,
+                                            suffix=TEMPORARY_SUFFIX)
+    try:
+        with temporary:
+            write(temporary)
+        os.replace(temporary.name, fileAddress)
+    except BaseException:
+        os.remove(temporary.name)
+        raise
+
+
+def alignmentDistance(codes1, codes2, theAligner):
+    # Aligns two words given as arrays of phoneme codes, and returns the
+    # distance of the alignment (see aligner.Aligner). If both words are
+    # empty, it returns NaN.
+    if len(codes1) == 0 and len(codes2) == 0:
+        return np.nan
+    return theAligner.singleAlignment(codes1, codes2).distance
+
+
+def alignCodes(codes1, codes2, theAligner):
+    # Aligns two words given as arrays of phoneme codes, and returns both
+    # words aligned, with GAP_CODE where a phoneme is aligned to a gap.
+    alignment = theAligner.singleAlignment(codes1, codes2)
+    return alignment.alignedSequence1, alignment.alignedSequence2
+
+
+def alignFormPairs(pairs, parsedForm, theAligner, returnAlignments=False,
+                   cache=None, context=""):
+    # Aligns a list of pairs of form ids with a single call to
+    # aligner.Aligner.alignBatch, where parsedForm returns the array of phoneme
+    # codes of a form id, and returns the BatchAlignment. The distance of a pair
+    # of empty words is NaN, as in alignmentDistance. If an
+    # alignmentcache.AlignmentCache is given, only the pairs that are not in it
+    # are aligned, with context telling where the codes come from.
+    sequences1, sequences2, lengths1, lengths2 = padFormPairs(pairs, parsedForm)
+    if cache is not None:
+        return cache.alignBatch(theAligner, sequences1, sequences2, lengths1,
+                                lengths2, returnAlignments=returnAlignments,
+                                context=context)
+    return theAligner.alignBatch(sequences1, sequences2, lengths1, lengths2,
+                                 returnAlignments=returnAlignments)
+
+
+def screenFormPairs(pairs, parsedForm, theAligner, cutoff):
+    # Returns the array of the distances of a list of pairs of form ids, as
+    # alignFormPairs, but with np.inf for the pairs whose distance is above
+    # cutoff, which are mostly discarded without aligning them (see
+    # aligner.Aligner.screenBatch).
+    sequences1, sequences2, lengths1, lengths2 = padFormPairs(pairs, parsedForm)
+    return theAligner.screenBatch(sequences1, sequences2, lengths1, lengths2,
+                                  cutoff)
+
+
+def padFormPairs(pairs, parsedForm):
+    # Returns the padded sequences of phoneme codes of the first and second
+    # forms of a list of pairs of form ids, and their lengths (see
+    # aligner.padSequences), parsing every form only once.
+    parsedForms = {formId: parsedForm(formId)
+                   for pair in pairs for formId in pair}
+    sequences1, lengths1 = al.padSequences([parsedForms[pair[0]]
+                                            for pair in pairs])
+    sequences2, lengths2 = al.padSequences([parsedForms[pair[1]]
+                                            for pair in pairs])
+    return sequences1, sequences2, lengths1, lengths2
+
+
+def aggregateDistances(tensor, rule=None):
+    # Reduces a tensor built by CognateCorpus.distanceTensor to a matrix of
+    # distances between languages, ignoring the missing words. The rule could
+    # be MEAN_RULE (the default, and the one used by chibcha.languageDistance),
+    # MEDIAN_RULE or MAX_RULE. Pairs of languages without common terms get NaN.
+    if rule is None:
+        rule = MEAN_RULE
+    with np.errstate(invalid="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        if rule == MEAN_RULE:
+            return np.nanmean(tensor, axis=0, dtype=np.float64)
+        elif rule == MEDIAN_RULE:
+            return np.nanmedian(tensor.astype(np.float64), axis=0)
+        elif rule == MAX_RULE:
+            return np.nanmax(tensor, axis=0).astype(np.float64)
+    errorString  = "The aggregation rule " + str(rule) + " is not known."
+    raise ValueError(errorString)
+
+
+def commonTermCounts(tensor):
+    # Returns the matrix with the number of terms that each pair of languages
+    # has in common, from a tensor built by CognateCorpus.distanceTensor.
+    return (~np.isnan(tensor)).sum(axis=0)
 
 
 
@@ -197,14 +686,40 @@ class CognateCorpus:
 #####################
 
 EMPTY_WORD      = ''
+MISSING_FORM    = -1
+GAP_CODE        = al.GAP
+CHUNK_SIZE      = 4096
 
 #########
 # TYPES #
 #########
 DICTIONARY = "DICTIONARY"
 COGNATE_LIST = "COGNATE LIST"
+MEMORY_MAP   = "MEMORY MAP"
 
 
 BY_SPREADSHEET_KEY      = "BY SPREADSHEET"
 SPREADSHEET_ADDRESS_KEY = "SPREADSHEET ADDRESS"
 SHEET_NAME_KEY          = "SHEET NAME"
+BY_MEMORY_MAP_KEY       = "BY MEMORY MAP"
+MEMORY_MAP_ADDRESS_KEY  = "MEMORY MAP ADDRESS"
+
+
+####################
+# MEMORY MAP FILES #
+####################
+HEADER_FILE       = "header.json"
+FORM_HEAP_FILE    = "forms.npy"
+FORM_OFFSETS_FILE = "offsets.npy"
+CODE_MATRIX_FILE  = "codes.npy"
+TEMPORARY_SUFFIX  = ".tmp"
+TERMS_FIELD       = "terms"
+LANGUAGES_FIELD   = "languages"
+
+
+#####################
+# AGGREGATION RULES #
+#####################
+MEAN_RULE   = "MEAN"
+MEDIAN_RULE = "MEDIAN"
+MAX_RULE    = "MAX"
@@ -56,6 +56,20 @@ ccArguments[SHEET_NAME_KEY]          = SHEET_NAME_VALUE
 
 
 
+# If the cognate corpus was saved to disc with the method save, it could be
+# opened memory mapped instead, so the forms are read only when needed. To do
+# so, this section should be uncommented and the spreadsheet section above
+# commented, or at least BY_SPREADSHEET_VALUE should be False.
+# BY_MEMORY_MAP_KEY          = "BY MEMORY MAP"
+# BY_MEMORY_MAP_VALUE        = True
+# MEMORY_MAP_ADDRESS_KEY     = "MEMORY MAP ADDRESS"
+# MEMORY_MAP_ADDRESS_VALUE   = "../../res/cognados_chibchas"
+#
+# ccArguments[BY_MEMORY_MAP_KEY]      = BY_MEMORY_MAP_VALUE
+# ccArguments[MEMORY_MAP_ADDRESS_KEY] = MEMORY_MAP_ADDRESS_VALUE
+
+
+
 # If the phonetic inventory is not defined by spreadsheet, at least for now it
 # is assumed to be defined by passing  the attributes directly.
 
@@ -0,0 +1,234 @@
+#!/usr/bin/python
+# module linguistics
+
+# This module contains the search of the words of a cognate corpus most similar
+# to a given word, by local alignment, with an inverted index of the k-mers of
+# the words to avoid aligning the query with every word of the corpus.
+#
+# Copyright (c) 2025 Universidad de Costa Rica.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#   - Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   - Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   - Neither the name of the <organization> nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL DAVID JIMENEZ BE LIABLE FOR ANY DIRECT, DIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
+# EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Researchers:
+#         David Jimenez <david.jimenezlopez@ucr.ac.cr>
+#         Haakon Krohn <haakonstensrud.krohn@ucr.ac.cr>
+
+import numpy as np
+
+import aligner as al
+
+###################
+###################
+###################
+###             ###
+###             ###
+###   CLASSES   ###
+###             ###
+###             ###
+###################
+###################
+###################
+
+
+##############
+##############
+##          ##
+##  CORPUS  ##
+##  SEARCH  ##
+##          ##
+##############
+##############
+class CorpusSearch:
+    # Class that searches the forms of a cognate corpus most similar to a
+    # query word, by local alignment (Smith-Waterman), to look for loanwords
+    # and cognate candidates. Aligning the query with every form is too slow
+    # for large corpora, so the forms are indexed by their k-mers (runs of k
+    # consecutive phonemes) in an inverted index, and only the forms that
+    # share enough k-mers with the query are aligned.
+    #
+    # The k-mers can be taken over classes of phonemes instead of phonemes
+    # (see PhoneticInventory.featureClasses), so that forms with similar but
+    # not equal sounds are found too. The index is built once, with a few
+    # vectorized steps over all the parsed forms of the corpus, and kept in
+    # compressed form: the distinct k-mers, sorted, and for each one the
+    # block of the form ids where it appears.
+
+    def __init__(self, corpus, inventory, theAligner=None, kmerLength=None,
+                 classes=None):
+        # By default, the forms are aligned with the distances of the
+        # inventory, with negative scores for different phonemes and gap
+        # penalties (see aligner.localFromDistanceMatrix), and the k-mers have
+        # KMER_LENGTH phonemes.
+        if kmerLength is None:
+            kmerLength = KMER_LENGTH
+        corpus.bindInventory(inventory)
+        if theAligner is None:
+            theAligner = al.localFromDistanceMatrix(inventory.distanceMatrix())
+        if classes is None:
+            classes = np.arange(inventory.inventorySize)
+        classes = np.asarray(classes, dtype=np.int64)
+        numberOfClasses = int(classes.max()) + 1 if classes.size > 0 else 1
+        if kmerLength < 1 or \
+                        numberOfClasses ** kmerLength >= np.iinfo(np.int64).max:
+            errorString  = "The k-mers should have at least one phoneme, and "
+            errorString += "not so many that they do not fit in an integer. "
+            errorString += "They do not."
+            raise ValueError(errorString)
+        self.corpus          = corpus
+        self.inventory       = inventory
+        self.theAligner      = theAligner
+        self.kmerLength      = kmerLength
+        self.classes         = classes
+        self.numberOfClasses = numberOfClasses
+        self.numberOfForms   = len(corpus.parsedOffsets) - 1
+        self.buildIndex()
+
+
+    def buildIndex(self):
+        # Builds the inverted index of the k-mers of all the forms, where the
+        # ids of the forms with the k-th distinct k-mer are
+        # postings[postingOffsets[k]:postingOffsets[k+1]], each one once.
+        offsets = self.corpus.parsedOffsets
+        lengths = np.diff(offsets)
+        formOfPosition = np.repeat(np.arange(self.numberOfForms), lengths)
+        isStart = offsets[formOfPosition + 1] - \
+                  np.arange(len(formOfPosition)) >= self.kmerLength
+        starts = np.flatnonzero(isStart)
+        kmers = self.kmerCodes(self.classes[self.corpus.parsedPhonemes], starts)
+        formIds = formOfPosition[starts]
+        order = np.lexsort((formIds, kmers))
+        kmers = kmers[order]
+        formIds = formIds[order]
+        isNew = np.ones(len(kmers), dtype=bool)
+        isNew[1:] = (kmers[1:] != kmers[:-1]) | (formIds[1:] != formIds[:-1])
+        kmers = kmers[isNew]
+        self.postings = formIds[isNew]
+        self.kmers, firstPositions = np.unique(kmers, return_index=True)
+        self.postingOffsets = np.append(firstPositions,
+                                        len(self.postings)).astype(np.int64)
+
+
+    def kmerCodes(self, classSequence, starts):
+        # Returns the k-mers of a sequence of classes that start at the given
+        # positions, each one as an integer in base numberOfClasses.
+        codes = np.zeros(len(starts), dtype=np.int64)
+        for k in range(self.kmerLength):
+            codes = codes * self.numberOfClasses + classSequence[starts + k]
+        return codes
+
+
+    def sharedKmers(self, codes):
+        # Returns an array with the number of distinct k-mers of the query,
+        # given by its phoneme codes, that each form of the corpus has. The
+        # blocks of postings of all the k-mers of the query are gathered and
+        # counted at once.
+        starts = np.arange(max(0, len(codes) - self.kmerLength + 1))
+        queryKmers = np.unique(self.kmerCodes(self.classes[codes], starts))
+        if len(self.kmers) == 0 or len(queryKmers) == 0:
+            return np.zeros(self.numberOfForms, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self.kmers, queryKmers),
+                               len(self.kmers) - 1)
+        positions = positions[self.kmers[positions] == queryKmers]
+        firsts = self.postingOffsets[positions]
+        lengths = self.postingOffsets[positions + 1] - firsts
+        blockStarts = np.cumsum(lengths) - lengths
+        indices = np.arange(lengths.sum()) + np.repeat(firsts - blockStarts,
+                                                       lengths)
+        return np.bincount(self.postings[indices], minlength=self.numberOfForms)
+
+
+    def search(self, query, top=None, minimumShared=1, maximumCandidates=None):
+        # Returns the top forms of the corpus (TOP_FORMS by default) with the
+        # highest scores of local alignment with the query, which is a word or
+        # an array of phoneme codes, as a list of tuples (formId, form, score),
+        # best first, and in order of form id when tied. Only the forms that
+        # share at least minimumShared distinct k-mers with the query are
+        # aligned, and, if maximumCandidates is given, only that many of them,
+        # the ones that share the most. With minimumShared = 0, or a query
+        # shorter than a k-mer, every form is aligned, which is the exhaustive
+        # search. An empty query finds nothing.
+        if top is None:
+            top = TOP_FORMS
+        if isinstance(query, str):
+            codes = self.inventory.encode(query)
+        else:
+            codes = self.theAligner.validateSequence(query)
+        if len(codes) == 0:
+            return []
+        if minimumShared <= 0 or len(codes) < self.kmerLength:
+            candidates = np.arange(self.numberOfForms)
+        else:
+            shared = self.sharedKmers(codes)
+            candidates = np.flatnonzero(shared >= minimumShared)
+            if maximumCandidates is not None and \
+                                        len(candidates) > maximumCandidates:
+                order = np.argsort(-shared[candidates], kind="stable")
+                candidates = np.sort(candidates[order[:maximumCandidates]])
+        if len(candidates) == 0:
+            return []
+        scores = self.localScores(codes, candidates)
+        order = np.argsort(-scores, kind="stable")[:top]
+        return [(int(candidates[k]), self.corpus.forms[int(candidates[k])],
+                 float(scores[k])) for k in order]
+
+
+    def localScores(self, codes, formIds):
+        # Returns the scores of the local alignments of the query, given by
+        # its phoneme codes, with the forms with the given ids, all of them in
+        # a single batch (see aligner.Aligner.alignBatch).
+        forms = [self.corpus.parsedFormById(formId) for formId in formIds]
+        sequences2, lengths2 = al.padSequences(forms)
+        sequences1 = np.tile(codes, (len(formIds), 1))
+        lengths1 = np.full(len(formIds), len(codes))
+        return self.theAligner.alignBatch(sequences1, sequences2, lengths1,
+                                          lengths2, isGlobal=False).scores
+
+
+    def occurrences(self, formId):
+        # Returns the list of the pairs (term, language) where the form with
+        # the given id appears in the corpus.
+        terms, languages = np.nonzero(np.asarray(self.corpus.codeMatrix) ==
+                                      formId)
+        return [(self.corpus.termList[k], self.corpus.languageNames[n])
+                for k, n in zip(terms.tolist(), languages.tolist())]
+
+
+
+#####################
+#####################
+#####################
+###               ###
+###               ###
+###   CONSTANTS   ###
+###   AND KEYS    ###
+###               ###
+###               ###
+#####################
+#####################
+#####################
+
+# Default number of phonemes of the k-mers of the index, and of forms returned
+# by a search.
+KMER_LENGTH = 2
+TOP_FORMS   = 10
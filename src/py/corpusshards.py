@@ -0,0 +1,410 @@
+#!/usr/bin/python
+# module linguistics
+
+# This module contains the logic to split a cognate corpus by terms into shards
+# that can be processed independently, for example, in different processes,
+# and whose partial results are merged afterwards. Since the terms of the
+# corpus are independent of each other for alignments, distances and counts of
+# sound correspondences, the partial results of the shards are merged with
+# associative reducers, and the final result does not depend on the number of
+# shards.
+#
+# Copyright (c) 2025 Universidad de Costa Rica.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#   - Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   - Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   - Neither the name of the <organization> nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL DAVID JIMENEZ BE LIABLE FOR ANY DIRECT, DIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
+# EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Researchers:
+#         David Jimenez <david.jimenezlopez@ucr.ac.cr>
+#         Haakon Krohn <haakonstensrud.krohn@ucr.ac.cr>
+
+import hashlib
+import os
+import pickle
+
+import numpy as np
+
+from collections import Counter
+from functools import reduce
+from multiprocessing import Pool
+
+import aligner as al
+import cognatecorpus as cc
+
+###################
+###################
+###################
+###             ###
+###             ###
+###   CLASSES   ###
+###             ###
+###             ###
+###################
+###################
+###################
+
+
+#############
+#############
+##         ##
+##  CORPUS ##
+##  SHARD  ##
+##         ##
+#############
+#############
+class CorpusShard:
+    # Class that contains a contiguous block of terms of a cognate corpus,
+    # with everything a worker needs to process them: the rows of the code
+    # matrix, the phoneme codes of the forms that appear in those rows, and
+    # the aligner to use with them. The form ids in codeMatrix are local to
+    # the shard; formIds gives the corresponding ids in the corpus.
+
+    def __init__(self, shardIndex, termIndices, codeMatrix, formIds,
+                 parsedPhonemes, parsedOffsets, theAligner):
+        self.shardIndex     = shardIndex
+        self.termIndices    = termIndices
+        self.codeMatrix     = codeMatrix
+        self.formIds        = formIds
+        self.parsedPhonemes = parsedPhonemes
+        self.parsedOffsets  = parsedOffsets
+        self.aligner        = theAligner
+
+
+    def numberOfLanguages(self):
+        return self.codeMatrix.shape[1]
+
+
+    def parsedFormById(self, localId):
+        return self.parsedPhonemes[self.parsedOffsets[localId]:\
+                                   self.parsedOffsets[localId+1]]
+
+
+    def languagePairs(self):
+        # Generator of the tuples (k, m, n, localId1, localId2), for every
+        # local term k and every pair of languages m > n with words for it.
+        for k, row in enumerate(self.codeMatrix):
+            present = np.flatnonzero(row != cc.MISSING_FORM)
+            for a in range(len(present)):
+                m = present[a]
+                for n in present[:a]:
+                    yield k, m, n, row[m], row[n]
+
+
+    def fingerprint(self):
+        # Returns a string that identifies the content of the shard: its
+        # terms, its rows of the code matrix and the phoneme codes of its
+        # forms.
+        digest = hashlib.sha1()
+        for array in [self.termIndices, self.codeMatrix, self.parsedPhonemes,
+                      self.parsedOffsets]:
+            digest.update(repr((array.dtype.str, array.shape)).encode("utf-8"))
+            digest.update(np.ascontiguousarray(array).tobytes())
+        return digest.hexdigest()
+
+
+    def save(self, fileAddress):
+        with open(fileAddress, "wb") as shardFile:
+            pickle.dump(self, shardFile, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+
+#####################
+#####################
+##                 ##
+##  DISTANCE SUMS  ##
+##                 ##
+#####################
+#####################
+class DistanceSums:
+    # Partial result of distanceJob: for every pair of languages, the sum of
+    # the distances of their common terms and the number of such terms. The
+    # sums are kept in fixed point (integers), so that adding them is exactly
+    # associative and the final result is the same for any number of shards.
+
+    def __init__(self, numberOfLanguages):
+        shape = (numberOfLanguages, numberOfLanguages)
+        self.sums   = np.zeros(shape, dtype=np.int64)
+        self.counts = np.zeros(shape, dtype=np.int64)
+
+
+    def add(self, m, n, distance):
+        fixedPoint = int(round(distance * FIXED_POINT_SCALE))
+        self.sums[m, n]   += fixedPoint
+        self.sums[n, m]   += fixedPoint
+        self.counts[m, n] += 1
+        self.counts[n, m] += 1
+
+
+    def distanceMatrix(self):
+        # Returns the matrix of average distances between languages. Pairs of
+        # languages without common terms get NaN.
+        with np.errstate(invalid="ignore", divide="ignore"):
+            matrix = (self.sums / FIXED_POINT_SCALE) / self.counts
+        np.fill_diagonal(matrix, 0)
+        return matrix
+
+
+
+#####################
+#####################
+#####################
+###               ###
+###               ###
+###   FUNCTIONS   ###
+###      AND      ###
+###    METHODS    ###
+###               ###
+###               ###
+#####################
+#####################
+#####################
+
+
+def partitionCorpus(corpus, inventory, numberOfShards, theAligner=None):
+    # Splits the corpus into at most numberOfShards shards of contiguous
+    # terms, none of them empty, so there are none for a corpus without
+    # terms. The corpus is bound to the inventory first, so that every shard
+    # carries its forms already parsed. By default, the words are aligned as
+    # in CognateCorpus.distanceTensor.
+    corpus.bindInventory(inventory)
+    if theAligner is None:
+        theAligner = al.fromDistanceMatrix(inventory.distanceMatrix())
+    numberOfTerms = corpus.codeMatrix.shape[0]
+    numberOfShards = max(1, min(numberOfShards, numberOfTerms))
+    shards = []
+    blocks = [termIndices for termIndices in np.array_split(
+                        np.arange(numberOfTerms), numberOfShards)
+              if len(termIndices) > 0]
+    for shardIndex, termIndices in enumerate(blocks):
+        rows = np.asarray(corpus.codeMatrix[termIndices[0]:termIndices[-1]+1])
+        present = rows != cc.MISSING_FORM
+        formIds, localCodes = np.unique(rows[present], return_inverse=True)
+        codeMatrix = np.full(rows.shape, cc.MISSING_FORM, dtype=np.int32)
+        codeMatrix[present] = localCodes
+        encodedForms = [corpus.parsedFormById(formId) for formId in formIds]
+        parsedOffsets = np.zeros(len(encodedForms) + 1, dtype=np.int64)
+        parsedOffsets[1:] = np.cumsum([len(codes) for codes in encodedForms])
+        parsedPhonemes = np.concatenate(encodedForms) if encodedForms \
+                            else np.zeros(0, dtype=corpus.parsedPhonemes.dtype)
+        shards.append(CorpusShard(shardIndex, termIndices, codeMatrix,
+                                  formIds, parsedPhonemes, parsedOffsets,
+                                  theAligner))
+    return shards
+
+
+def writeShards(shards, directoryAddress):
+    # Saves every shard to its own file in the directory, so they can be
+    # processed later, or by other machines, with loadShard.
+    os.makedirs(directoryAddress, exist_ok=True)
+    for shard in shards:
+        shard.save(os.path.join(directoryAddress,
+                                SHARD_FILE_NAME % shard.shardIndex))
+
+
+def loadShard(fileAddress):
+    with open(fileAddress, "rb") as shardFile:
+        return pickle.load(shardFile)
+
+
+def runShardedJob(corpus, inventory, job, reducer, numberOfShards=1,
+                  processes=1, checkpointAddress=None, theAligner=None):
+    # Partitions the corpus, applies job to every shard, and merges the
+    # partial results, in the order of the shards, with reducer. The job and
+    # the reducer should be functions defined at module level, so they can be
+    # sent to the worker processes. If processes is larger than 1, the shards
+    # are processed by a pool of that many processes. If checkpointAddress is
+    # given, the partial result of every shard is saved in that directory as
+    # soon as it is computed, and shards whose result is already saved are
+    # not processed again, so an interrupted job can be resumed. The saved
+    # results are identified by the job, the inventory, the aligner and the
+    # content of the shard (see checkpointFileAddress), so the results of
+    # other jobs, or of the same job with other data, are never reused.
+    shards = partitionCorpus(corpus, inventory, numberOfShards, theAligner)
+    if len(shards) == 0:
+        errorString  = "The corpus has no terms, so there is nothing to run "
+        errorString += "the job on."
+        raise ValueError(errorString)
+    results = [None] * len(shards)
+    pending = []
+    if checkpointAddress is not None:
+        os.makedirs(checkpointAddress, exist_ok=True)
+    jobFingerprint = jobKey(job, inventory)
+    for shard in shards:
+        resultAddress = checkpointFileAddress(checkpointAddress, shard,
+                                              jobFingerprint)
+        if resultAddress is not None and os.path.isfile(resultAddress):
+            with open(resultAddress, "rb") as resultFile:
+                results[shard.shardIndex] = pickle.load(resultFile)
+        else:
+            pending.append((shard, resultAddress))
+    tasks = [(job, shard, resultAddress) for shard, resultAddress in pending]
+    if processes > 1 and len(tasks) > 1:
+        with Pool(processes) as pool:
+            newResults = pool.map(runShardTask, tasks)
+    else:
+        newResults = [runShardTask(task) for task in tasks]
+    for (shard, resultAddress), result in zip(pending, newResults):
+        results[shard.shardIndex] = result
+    return reduce(reducer, results)
+
+
+def runShardTask(task):
+    # Applies the job to the shard and, if needed, saves the partial result.
+    # The result is first written to a temporary file and then renamed, so a
+    # checkpoint is never left half written.
+    job, shard, resultAddress = task
+    result = job(shard)
+    if resultAddress is not None:
+        temporaryAddress = resultAddress + ".tmp"
+        with open(temporaryAddress, "wb") as resultFile:
+            pickle.dump(result, resultFile, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporaryAddress, resultAddress)
+    return result
+
+
+def jobKey(job, inventory):
+    # Returns a string that identifies the job, by its module and name, and
+    # the inventory the corpus is parsed with.
+    return "|".join([job.__module__, job.__qualname__,
+                     inventory.fingerprint()])
+
+
+def checkpointFileAddress(checkpointAddress, shard, jobFingerprint):
+    # Returns the address of the file with the partial result of the shard,
+    # named by the shard index and a digest of the job key (see jobKey), the
+    # fingerprint of the aligner of the shard and the one of its content.
+    if checkpointAddress is None:
+        return None
+    digest = hashlib.sha1()
+    for key in [jobFingerprint, shard.aligner.fingerprint(),
+                shard.fingerprint()]:
+        digest.update(key.encode("utf-8"))
+        digest.update(b"\0")
+    return os.path.join(checkpointAddress,
+                        RESULT_FILE_NAME % (shard.shardIndex,
+                                            digest.hexdigest()))
+
+
+########
+# JOBS #
+########
+def alignmentJob(shard):
+    # Aligns, for every term of the shard, the words of every pair of
+    # languages m > n. Returns a dictionary whose keys are the tuples
+    # (term index in the corpus, m, n) and whose values are the two aligned
+    # words, as returned by cognatecorpus.alignCodes. All the distinct pairs
+    # of words are aligned in a single batch.
+    cells, pairs = distinctPairs(shard)
+    batch = cc.alignFormPairs(pairs, shard.parsedFormById, shard.aligner,
+                              returnAlignments=True)
+    alignments = {}
+    for k, m, n, pairIndex in cells:
+        alignments[(int(shard.termIndices[k]), int(m), int(n))] = \
+                                    (batch.alignedSequences1[pairIndex],
+                                     batch.alignedSequences2[pairIndex])
+    return alignments
+
+
+def distanceJob(shard):
+    # Returns a DistanceSums object with the distances of all the pairs of
+    # words of the shard. Pairs of empty words are ignored, as their distance
+    # is not defined.
+    cells, pairs = distinctPairs(shard)
+    distances = cc.alignFormPairs(pairs, shard.parsedFormById,
+                                  shard.aligner).distances
+    distanceSums = DistanceSums(shard.numberOfLanguages())
+    for k, m, n, pairIndex in cells:
+        if not np.isnan(distances[pairIndex]):
+            distanceSums.add(m, n, distances[pairIndex])
+    return distanceSums
+
+
+def distinctPairs(shard):
+    # Returns the list of tuples (k, m, n, pair index) of the pairs of
+    # languages of the shard (see CorpusShard.languagePairs), and the list of
+    # the distinct pairs of local form ids, in the order of their indices.
+    pairIndices = {}
+    cells = []
+    for k, m, n, localId1, localId2 in shard.languagePairs():
+        pair = (localId1, localId2)
+        if pair not in pairIndices:
+            pairIndices[pair] = len(pairIndices)
+        cells.append((k, m, n, pairIndices[pair]))
+    return cells, list(pairIndices)
+
+
+def correspondenceJob(shard):
+    # Counts the sound correspondences of the shard: returns a Counter whose
+    # keys are the tuples (m, n, phoneme1, phoneme2), where phoneme1 is the
+    # code of a phoneme of the language m aligned with the phoneme phoneme2
+    # of the language n, for m > n. Gaps are given by cognatecorpus.GAP_CODE.
+    correspondences = Counter()
+    for alignment, (alignedCodes1, alignedCodes2) in \
+                                            alignmentJob(shard).items():
+        _, m, n = alignment
+        for phoneme1, phoneme2 in zip(alignedCodes1.tolist(),
+                                      alignedCodes2.tolist()):
+            correspondences[(m, n, phoneme1, phoneme2)] += 1
+    return correspondences
+
+
+############
+# REDUCERS #
+############
+def mergeAlignments(alignments1, alignments2):
+    merged = dict(alignments1)
+    merged.update(alignments2)
+    return merged
+
+
+def mergeDistanceSums(distanceSums1, distanceSums2):
+    merged = DistanceSums(distanceSums1.sums.shape[0])
+    merged.sums   = distanceSums1.sums + distanceSums2.sums
+    merged.counts = distanceSums1.counts + distanceSums2.counts
+    return merged
+
+
+def mergeCounters(counter1, counter2):
+    return counter1 + counter2
+
+
+
+#####################
+#####################
+#####################
+###               ###
+###               ###
+###   CONSTANTS   ###
+###   AND KEYS    ###
+###               ###
+###               ###
+#####################
+#####################
+#####################
+
+# Distances between 0 and 1 are added with a resolution of 2**-40, which allows
+# for more than eight million terms per pair of languages without overflow.
+FIXED_POINT_SCALE = 2**40
+
+SHARD_FILE_NAME  = "shard-%05d.pkl"
+RESULT_FILE_NAME = "result-%05d-%s.pkl"
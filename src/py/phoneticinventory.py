@@ -42,9 +42,13 @@
 #         David Jimenez <david.jimenezlopez@ucr.ac.cr>
 #         Haakon Krohn <haakonstensrud.krohn@ucr.ac.cr>
 
+import hashlib
+
 import pandas as pd
 import numpy as np
 
+import symboltable as st
+
 ###################
 ###################
 ###################
@@ -192,6 +196,34 @@ class PhoneticInventory:
             self.inventory += newPhonemes
         self.inventorySize = len(self.inventory)
         self.parser = Parser(self.inventory, self.strictmode)
+        self.phonemeIndex = {phoneme: k for k, phoneme in \
+                                        enumerate(self.inventory)}
+        self.bindSymbolIds()
+
+
+    def bindSymbolIds(self):
+        # Interns the phonemes in the shared table of symbols and keeps their
+        # IDs, by code, so that data keyed by those IDs can be brought to the
+        # codes. The IDs of the phonemes that are not in the default table
+        # depend on the order they were interned in this process (see
+        # symboltable.SymbolTable), so they are not pickled, but bound again
+        # when the inventory is unpickled (see __setstate__).
+        self.symbolIds = st.SYMBOLS.internIds(self.inventory)
+        self.codeOfSymbolId = {}
+        for code, identifier in enumerate(self.symbolIds.tolist()):
+            self.codeOfSymbolId.setdefault(identifier, code)
+
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state["symbolIds"]
+        del state["codeOfSymbolId"]
+        return state
+
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.bindSymbolIds()
 
 
     def distance(self, phoneme1, phoneme2):
@@ -228,6 +260,84 @@ class PhoneticInventory:
     def parse(self,word):
         return self.parser.parse(word)
 
+
+    def encode(self, word):
+        # Parses the word and returns the phonemes as an array of integer
+        # codes, where the code of a phoneme is its position in the inventory.
+        return np.array([self.phonemeIndex[phoneme] for phoneme in \
+                            self.parse(word)], dtype=PHONEME_CODE_TYPE)
+
+
+    def codesOfSymbolIds(self, identifiers):
+        # Returns the array of the phoneme codes of the sounds with the given
+        # IDs in the table of symbols (see symboltable.SymbolTable), with
+        # MISSING_CODE for the sounds that are not in the inventory.
+        return np.array([self.codeOfSymbolId.get(identifier, MISSING_CODE)
+                         for identifier in np.asarray(identifiers).tolist()],
+                        dtype=PHONEME_CODE_TYPE)
+
+
+    def distanceMatrix(self):
+        # Returns a square array with the distance between every pair of
+        # phonemes of the inventory, indexed by the phoneme codes. The values
+        # are the same the method distance gives, but computed type by type,
+        # with a single comparison of the feature tables.
+        matrix = np.ones((self.inventorySize, self.inventorySize))
+        for typeName in self.namesOfTypes:
+            phonemeType = self.phonemeTypes[typeName]
+            codes = [self.phonemeIndex[phoneme] for phoneme in \
+                        phonemeType.phonemes if phoneme in self.phonemeIndex]
+            if len(codes) == 0:
+                continue
+            featureTable = np.array([phonemeType.featuresList[phoneme] for \
+                                     phoneme in phonemeType.phonemes \
+                                     if phoneme in self.phonemeIndex],
+                                    dtype=object)
+            differing = featureTable[:, None, :] != featureTable[None, :, :]
+            matrix[np.ix_(codes, codes)] = differing.sum(axis=2) / \
+                                                phonemeType.numberOfFeatures
+        np.fill_diagonal(matrix, 0)
+        return matrix
+
+
+    def featureClasses(self, featureNames):
+        # Returns an array with a class number for every phoneme code, where
+        # two phonemes are in the same class if they are of the same type and
+        # have the same values of the features in featureNames that their type
+        # has. With no features, the classes are just the types. Searching by
+        # classes instead of phonemes finds words with similar sounds.
+        classIndex = {}
+        classes = np.zeros(self.inventorySize, dtype=np.int64)
+        for typeName in self.namesOfTypes:
+            phonemeType = self.phonemeTypes[typeName]
+            positions = [k for k, feature in enumerate(phonemeType.features) \
+                                        if feature in featureNames]
+            for phoneme in phonemeType.phonemes:
+                if phoneme in self.phonemeIndex:
+                    values = tuple(phonemeType.featuresList[phoneme][k] \
+                                        for k in positions)
+                    key = (typeName, values)
+                    classes[self.phonemeIndex[phoneme]] = \
+                                    classIndex.setdefault(key, len(classIndex))
+        return classes
+
+
+    def fingerprint(self):
+        # Returns a string that identifies the content of the inventory: the
+        # types, their phonemes and features, and the parsing mode. Two
+        # inventories with the same fingerprint parse and encode the same way.
+        digest = hashlib.sha1()
+        digest.update(repr(self.strictmode).encode("utf-8"))
+        for typeName in self.namesOfTypes:
+            phonemeType = self.phonemeTypes[typeName]
+            digest.update(repr(typeName).encode("utf-8"))
+            digest.update(repr(phonemeType.features).encode("utf-8"))
+            for phoneme in phonemeType.phonemes:
+                digest.update(repr(phoneme).encode("utf-8"))
+                digest.update(repr(phonemeType.featuresList[phoneme])\
+                                                        .encode("utf-8"))
+        return digest.hexdigest()
+
     def load(self, fileAddress):
         # This method would load the phonetic inventory from a file saved
         # directly to disc.
@@ -448,7 +558,9 @@ def missingSubstrings(word,substrings):
 #####################
 #####################
 
-EMPTY_SPACE      = ' '
+EMPTY_SPACE       = ' '
+PHONEME_CODE_TYPE = np.int16
+MISSING_CODE      = -1
 
 
 #################
@@ -215,7 +215,7 @@ NAME_DICT ={
             ],
         "NAZALIZATION":
             [
-                "NAZALIZED"
+                "NAZALIZED",
                 "NOT_NAZALIZED"
             ],
         "PHONATION":
@@ -234,13 +234,15 @@ NAME_DICT ={
 FEATURES = [
         "ANTERIOR",
         "BACK",
-        "CONSONANTAL"
+        "CONSONANTAL",
         "CONSTRICTED_GLOTTIS",
         "CONTINUANT",
         "CORONAL",
         "DELAYED_RELEASE",
         "DISTRIBUTED",
+        "DORSAL",
         "HIGH",
+        "LABIAL",
         "LATERAL",
         "LONG",
         "LOW",
@@ -248,7 +250,7 @@ FEATURES = [
         "ROUND",
         "SONORANT",
         "SPREAD_GLOTTIS",
-        "STRESS"
+        "STRESS",
         "STRIDENT",
         "SYLLABIC",
         "TENSE",
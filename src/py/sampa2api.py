@@ -1,6 +1,172 @@
+# module sampa2api
+
+# This module contains the transliteration of whole strings between X-SAMPA and
+# the IPA. The table of symbols is compiled once for every direction into a
+# trie, and every string is read left to right taking at every position the
+# longest symbol of the table that starts there, so that symbols of several
+# characters, as "tS" or "p\", are not split. Characters that are not part of
+# any symbol are copied as they are, unless the transliteration is strict.
+
+import unicodedata
+
+
+#############
+# FUNCTIONS #
+#############
+
 def sampa2api(simbol):
-	consult = ""
-	converter = {
+	# Returns the IPA transliteration of a string in X-SAMPA, which could be a
+	# single symbol or a whole word.
+	return transliterator(SAMPA, IPA).transliterate(simbol)
+
+
+def api2sampa(simbol):
+	# Returns the X-SAMPA transliteration of a string in IPA.
+	return transliterator(IPA, SAMPA).transliterate(simbol)
+
+
+def transliterator(source, target):
+	# Returns the Transliterator from the notation source to the notation
+	# target, SAMPA or IPA, which is built the first time it is asked for.
+	key = (source, target)
+	if key not in TRANSLITERATORS:
+		if key == (IPA, SAMPA):
+			table = dict(IPA_TO_SAMPA)
+			table.update(IPA_ALIASES)
+			TRANSLITERATORS[key] = Transliterator(table, inputForm="NFD",
+			                                      outputForm=None)
+		elif key == (SAMPA, IPA):
+			table = {sampa: ipa for ipa, sampa in IPA_TO_SAMPA.items()}
+			TRANSLITERATORS[key] = Transliterator(table, inputForm=None,
+			                                      outputForm="NFC")
+		else:
+			errorString  = "There is no transliteration from " + str(source)
+			errorString += " to " + str(target) + "."
+			raise ValueError(errorString)
+	return TRANSLITERATORS[key]
+
+
+###########
+# CLASSES #
+###########
+
+class Transliterator:
+	# Class that transliterates strings with a table from symbols to symbols,
+	# compiled into a trie of nested dictionaries, one level per character,
+	# where the key TRIE_END holds the symbol to write for the characters read
+	# to get there. If inputForm or outputForm are given, the strings are
+	# brought to that Unicode normal form before and after, so that, for
+	# example, a precomposed "ĩ" is read as "i" and a combining tilde.
+
+	def __init__(self, table, inputForm=None, outputForm=None, strict=False):
+		self.inputForm  = inputForm
+		self.outputForm = outputForm
+		self.strict     = strict
+		self.trie       = {}
+		for symbol, transliteration in table.items():
+			if inputForm is not None:
+				symbol = unicodedata.normalize(inputForm, symbol)
+			if len(symbol) == 0:
+				errorString  = "The symbols of a transliteration table "
+				errorString += "should not be empty. One is."
+				raise ValueError(errorString)
+			node = self.trie
+			for character in symbol:
+				node = node.setdefault(character, {})
+			node[TRIE_END] = transliteration
+
+
+	def transliterate(self, string):
+		# Returns the transliteration of a string, reading the longest symbol
+		# of the table at every position. A character that does not start any
+		# symbol is copied, or, if the transliteration is strict, raises a
+		# ValueError.
+		if self.inputForm is not None:
+			string = unicodedata.normalize(self.inputForm, string)
+		pieces = []
+		k = 0
+		while k < len(string):
+			node = self.trie
+			match = None
+			j = k
+			while j < len(string) and string[j] in node:
+				node = node[string[j]]
+				j += 1
+				if TRIE_END in node:
+					match = node[TRIE_END]
+					end = j
+			if match is not None:
+				pieces.append(match)
+				k = end
+			elif self.strict:
+				errorString  = "The character " + string[k] + " of " + string
+				errorString += " is not part of any symbol of the table."
+				raise ValueError(errorString)
+			else:
+				pieces.append(string[k])
+				k += 1
+		result = "".join(pieces)
+		if self.outputForm is not None:
+			result = unicodedata.normalize(self.outputForm, result)
+		return result
+
+
+	def transliterateList(self, strings):
+		# Returns the list of the transliterations of a list of strings, each
+		# distinct string being transliterated once.
+		transliterations = {}
+		for string in strings:
+			if string not in transliterations:
+				transliterations[string] = self.transliterate(string)
+		return [transliterations[string] for string in strings]
+
+
+	def transliterateSeries(self, series):
+		# Returns a pandas Series with the transliterations of the strings of a
+		# Series, each distinct one transliterated once. Missing values, and
+		# any value that is not a string, are kept as they are.
+		transliterations = {string: self.transliterate(string) for string in
+		                    series.unique() if isinstance(string, str)}
+		return series.map(lambda value: transliterations.get(value, value)
+		                  if isinstance(value, str) else value)
+
+
+	def transliterateColumns(self, dataFrame, columns=None):
+		# Returns a copy of a pandas DataFrame with the strings of the given
+		# columns, or of all of them, transliterated. The distinct strings of
+		# all the columns are transliterated once.
+		if columns is None:
+			columns = list(dataFrame.columns)
+		strings = set()
+		for column in columns:
+			strings.update(value for value in dataFrame[column].unique()
+			               if isinstance(value, str))
+		transliterations = {string: self.transliterate(string)
+		                    for string in strings}
+		dataFrame = dataFrame.copy()
+		for column in columns:
+			dataFrame[column] = dataFrame[column].map(
+			        lambda value: transliterations.get(value, value)
+			        if isinstance(value, str) else value)
+		return dataFrame
+
+
+#############
+# CONSTANTS #
+#############
+
+# The notations, and the transliterators between them already built.
+SAMPA = "X-SAMPA"
+IPA   = "IPA"
+TRANSLITERATORS = {}
+
+# The key of the trie where a symbol ends.
+TRIE_END = None
+
+# The IPA symbols and their X-SAMPA transliterations, one to one, so that the
+# same table serves both directions. The diacritics are combining characters,
+# as the IPA strings are read decomposed.
+IPA_TO_SAMPA = {
 	"i" : "i",
 	"ɯ" : "M",
 	"u" : "u",
@@ -11,6 +177,10 @@ def sampa2api(simbol):
 	"o" : "o",
 	"a" : "a",
 	"ɔ" : "O",
+	"ɨ" : "1",
+	"ə" : "@",
+	"j" : "j",
+	"w" : "w",
 	"p" : "p",
 	"b" : "b",
 	"t" : "t",
@@ -23,6 +193,7 @@ def sampa2api(simbol):
 	"s" : "s",
 	"z" : "z",
 	"ɬ" : "K",
+	"ɮ" : "K\\",
 	"ʃ" : "S",
 	"ʒ" : "Z",
 	"x" : "x",
@@ -38,15 +209,18 @@ def sampa2api(simbol):
 	"ɾ" : "4",
 	"r" : "r",
 	"l" : "l",
-	"ɺ" : "r\\"
+	"ʎ" : "L",
+	"ɽ" : "r`",
+	"ɺ" : "l\\",
+	"ʰ" : "_h",
+	"ː" : ":",
+	"̃" : "~"
 	}
 
-	for i in converter:
-		if simbol == i:
-			consult = converter[i]
-		else:
-			consult = None
-
-	return(consult)
-
-
+# Other ways to write some IPA symbols, only read from IPA.
+IPA_ALIASES = {
+	"ʦ" : "ts",
+	"ʧ" : "tS",
+	"ʤ" : "dZ",
+	"ɡ" : "g"
+	}
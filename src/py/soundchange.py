@@ -0,0 +1,310 @@
+#!/usr/bin/python
+# module linguistics
+
+# This module contains the application of ordered sound changes, as
+# "-sonante -sonora -> +sonora / V_V", to all the forms of a cognate corpus at
+# once, over the phoneme codes of a phonetic inventory, to test hypotheses of
+# reconstruction against the attested forms.
+#
+# Copyright (c) 2025 Universidad de Costa Rica.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#   - Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   - Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   - Neither the name of the <organization> nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL DAVID JIMENEZ BE LIABLE FOR ANY DIRECT, DIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
+# EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Researchers:
+#         David Jimenez <david.jimenezlopez@ucr.ac.cr>
+#         Haakon Krohn <haakonstensrud.krohn@ucr.ac.cr>
+
+
+import numpy as np
+
+###################
+###################
+###################
+###             ###
+###             ###
+###   CLASSES   ###
+###             ###
+###             ###
+###################
+###################
+###################
+
+
+###############
+###############
+##           ##
+##  SOUND    ##
+##  CHANGE   ##
+##           ##
+###############
+###############
+class SoundChange:
+    # Class that represents a sound change A -> B / C_D, where the target A and
+    # the contexts C and D are lists of conditions, and the change B is a list
+    # of pairs [feature, value], as the antecedents and consequents of an
+    # abstractphonetics.FeatureRule. A condition is a pair [feature, value],
+    # with value True (+) or False (-), or a pair [TYPE_KEY, typeName], and a
+    # phoneme satisfies it if it has that value of the feature, so a phoneme
+    # whose type does not have the feature never does. Each context could also
+    # be None, anything, or WORD_BOUNDARY. The changed phoneme is the one of
+    # the inventory of the same type with the features of the target phoneme
+    # changed, and if there is none, the phoneme does not change. Changes only
+    # replace phonemes, so they never insert or delete any.
+    #
+    # To apply a change to many words at once, it is compiled for a given
+    # inventory (see compile) to a lookup table from phoneme code to the code
+    # of the changed phoneme and to masks over the codes of the phonemes that
+    # satisfy the target and each context, where the code inventorySize stands
+    # for the word boundary. Then the change is just a few indexing operations
+    # over the concatenated codes of all the words (see applySoundChanges).
+
+    def __init__(self, target, change, left=None, right=None):
+        self.target = validateConditions(target)
+        self.change = validateConditions(change)
+        if any(feature == TYPE_KEY for feature, value in self.change):
+            errorString  = "A sound change cannot change the type of the "
+            errorString += "phonemes. This one does."
+            raise ValueError(errorString)
+        self.left  = validateContext(left)
+        self.right = validateContext(right)
+        self.compiled = {}
+
+
+    def __repr__(self):
+        return "SoundChange(" + repr(self.target) + ", " + \
+               repr(self.change) + ", " + repr(self.left) + ", " + \
+               repr(self.right) + ")"
+
+
+    def compile(self, inventory):
+        # Returns the lookup table of the change, an array with the code of
+        # the changed phoneme for every phoneme code, and the masks of the
+        # target and the left and right contexts, of length inventorySize + 1,
+        # the last entry being the word boundary. They are built once for
+        # every inventory, by its fingerprint.
+        fingerprint = inventory.fingerprint()
+        if fingerprint not in self.compiled:
+            features = inventoryFeatures(inventory)
+            targetMask = conditionMask(self.target, features)
+            table = changeTable(self.change, targetMask, features)
+            targetMask = np.append(targetMask, False)
+            leftMask   = contextMask(self.left, features)
+            rightMask  = contextMask(self.right, features)
+            self.compiled[fingerprint] = (table, targetMask, leftMask,
+                                          rightMask)
+        return self.compiled[fingerprint]
+
+
+
+#####################
+#####################
+#####################
+###               ###
+###               ###
+###   FUNCTIONS   ###
+###               ###
+###               ###
+#####################
+#####################
+#####################
+
+
+def applySoundChanges(changes, inventory, phonemes, offsets):
+    # Applies the list of sound changes, in order, to all the words given by
+    # their phoneme codes, concatenated in phonemes, the codes of the k-th word
+    # being phonemes[offsets[k]:offsets[k+1]], as the parsed forms of a
+    # CognateCorpus. Returns the array of the changed codes, with the same
+    # offsets. Every change applies to all the positions of all the words at
+    # the same time, looking at the codes left by the previous change.
+    phonemes = np.asarray(phonemes)
+    codeType = phonemes.dtype
+    offsets = np.asarray(offsets)
+    boundary = inventory.inventorySize
+    lengths = np.diff(offsets)
+    starts = offsets[:-1][lengths > 0]
+    ends = offsets[1:][lengths > 0] - 1
+    leftCodes = np.empty(len(phonemes), dtype=np.int64)
+    rightCodes = np.empty(len(phonemes), dtype=np.int64)
+    for change in changes:
+        table, targetMask, leftMask, rightMask = change.compile(inventory)
+        leftCodes[1:] = phonemes[:-1]
+        leftCodes[starts] = boundary
+        rightCodes[:-1] = phonemes[1:]
+        rightCodes[ends] = boundary
+        applies = targetMask[phonemes] & leftMask[leftCodes] & \
+                  rightMask[rightCodes]
+        phonemes = np.where(applies, table[phonemes], phonemes)
+    return phonemes.astype(codeType)
+
+
+def corpusSoundChanges(corpus, inventory, changes):
+    # Applies the list of sound changes, in order, to every distinct form of
+    # the corpus, bound to the inventory (see CognateCorpus.bindInventory).
+    # Returns the array of the changed codes of all the forms, with the
+    # offsets corpus.parsedOffsets, so that it can be compared with
+    # corpus.parsedPhonemes, or decoded with decodeForms.
+    corpus.bindInventory(inventory)
+    return applySoundChanges(changes, inventory, corpus.parsedPhonemes,
+                             corpus.parsedOffsets)
+
+
+def decodeForms(inventory, phonemes, offsets):
+    # Returns the list of the words, as strings, given by their concatenated
+    # phoneme codes and offsets.
+    symbols = np.array(inventory.inventory, dtype=object)
+    return ["".join(symbols[phonemes[offsets[k]:offsets[k+1]]])
+            for k in range(len(offsets) - 1)]
+
+
+def inventoryFeatures(inventory):
+    # Returns a tuple with the dictionary from feature name to column, the one
+    # from type name to number, and an array of type int8 with a row for every
+    # phoneme code, with +1 and -1 for the features that the phoneme has with
+    # value "+" and "-", and 0 for the ones its type does not have. One more
+    # column, the last, has the number of the type of the phoneme.
+    featureIndex = {}
+    for typeName in inventory.namesOfTypes:
+        for feature in inventory.phonemeTypes[typeName].features:
+            featureIndex.setdefault(feature, len(featureIndex))
+    values = np.zeros((inventory.inventorySize, len(featureIndex) + 1),
+                      dtype=np.int8)
+    for typeNumber, typeName in enumerate(inventory.namesOfTypes):
+        phonemeType = inventory.phonemeTypes[typeName]
+        columns = [featureIndex[feature] for feature in phonemeType.features]
+        for phoneme in phonemeType.phonemes:
+            if phoneme in inventory.phonemeIndex:
+                row = inventory.phonemeIndex[phoneme]
+                values[row, columns] = [FEATURE_SIGNS.get(value, 0) for value
+                                        in phonemeType.featuresList[phoneme]]
+                values[row, -1] = typeNumber
+    typeIndex = {typeName: k for k, typeName in
+                 enumerate(inventory.namesOfTypes)}
+    return featureIndex, typeIndex, values
+
+
+def conditionMask(conditions, features):
+    # Returns the boolean array that tells, for every phoneme code, if the
+    # phoneme satisfies all the conditions, given the features of the
+    # inventory (see inventoryFeatures).
+    featureIndex, typeIndex, values = features
+    mask = np.ones(len(values), dtype=bool)
+    for feature, value in conditions:
+        if feature == TYPE_KEY:
+            if value not in typeIndex:
+                errorString  = "The type " + str(value) + " is not a type of "
+                errorString += "the inventory."
+                raise ValueError(errorString)
+            mask &= values[:, -1] == typeIndex[value]
+        else:
+            mask &= values[:, featureColumn(feature, featureIndex)] == \
+                                                    (1 if value else -1)
+    return mask
+
+
+def contextMask(context, features):
+    # Returns the mask of a context over the phoneme codes and the word
+    # boundary, the last entry.
+    if context is None:
+        return np.ones(len(features[2]) + 1, dtype=bool)
+    if context == WORD_BOUNDARY:
+        mask = np.zeros(len(features[2]) + 1, dtype=bool)
+        mask[-1] = True
+        return mask
+    return np.append(conditionMask(context, features), False)
+
+
+def changeTable(change, targetMask, features):
+    # Returns the lookup table from every phoneme code to the code of the
+    # phoneme with the features of the change, which is itself for the codes
+    # out of the target mask, and for the phonemes whose changed features no
+    # phoneme of the inventory has. If several phonemes have them, the one
+    # with the lowest code is taken.
+    featureIndex, typeIndex, values = features
+    changed = values.copy()
+    for feature, value in change:
+        changed[:, featureColumn(feature, featureIndex)] = 1 if value else -1
+    codeOf = {}
+    for code in range(len(values) - 1, -1, -1):
+        codeOf[values[code].tobytes()] = code
+    table = np.arange(len(values))
+    for code in np.flatnonzero(targetMask):
+        table[code] = codeOf.get(changed[code].tobytes(), code)
+    return table
+
+
+def featureColumn(feature, featureIndex):
+    # Returns the column of a feature in the values of inventoryFeatures.
+    if feature not in featureIndex:
+        errorString  = "The feature " + str(feature) + " is not a feature of "
+        errorString += "the phonemes of the inventory."
+        raise ValueError(errorString)
+    return featureIndex[feature]
+
+
+def validateConditions(conditions):
+    # Returns the list of conditions of a sound change as a tuple of pairs,
+    # checking that every value is True or False, or a name of a type.
+    validated = []
+    for condition in conditions:
+        isValid = len(condition) == 2 and \
+                  (isinstance(condition[1], bool) or
+                   (condition[0] == TYPE_KEY and isinstance(condition[1], str)))
+        if not isValid:
+            errorString  = "The conditions of a sound change should be pairs "
+            errorString += "of a feature and True or False, or of TYPE_KEY "
+            errorString += "and the name of a type. At least one is not."
+            raise ValueError(errorString)
+        validated.append((condition[0], condition[1]))
+    return tuple(validated)
+
+
+def validateContext(context):
+    # Returns the context of a sound change as a tuple of conditions, or as
+    # None or WORD_BOUNDARY.
+    if context is None or context == WORD_BOUNDARY:
+        return context
+    return validateConditions(context)
+
+
+
+#####################
+#####################
+#####################
+###               ###
+###               ###
+###   CONSTANTS   ###
+###   AND KEYS    ###
+###               ###
+###               ###
+#####################
+#####################
+#####################
+
+# The key of the conditions on the type of the phonemes, and the context of
+# the beginning or the end of the word.
+TYPE_KEY      = "TYPE"
+WORD_BOUNDARY = "#"
+
+# The values of the features in the tables of the phoneme types.
+FEATURE_SIGNS = {"+": 1, "-": -1}
@@ -0,0 +1,287 @@
+#!/usr/bin/python
+# module linguistics
+
+# This module contains a table of the symbols of the sounds, that gives every
+# sound a single integer ID, and knows how it is written in every notation used
+# in the project: the IPA of the inventories, X-SAMPA, the notation of the
+# lists of the module chibcha, and the escaped code points of the module
+# acousticphonetics.
+#
+# Copyright (c) 2025 Universidad de Costa Rica.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#   - Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   - Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   - Neither the name of the <organization> nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL DAVID JIMENEZ BE LIABLE FOR ANY DIRECT, DIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
+# EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Researchers:
+#         David Jimenez <david.jimenezlopez@ucr.ac.cr>
+#         Haakon Krohn <haakonstensrud.krohn@ucr.ac.cr>
+
+
+import re
+import unicodedata
+
+import numpy as np
+
+import sampa2api as sa
+
+###################
+###################
+###################
+###             ###
+###             ###
+###   CLASSES   ###
+###             ###
+###             ###
+###################
+###################
+###################
+
+
+##############
+##############
+##          ##
+##  SYMBOL  ##
+##  TABLE   ##
+##          ##
+##############
+##############
+class SymbolTable:
+    # Class that interns the symbols of the sounds. Every sound gets an integer
+    # ID, in the order they are interned, and is identified by its canonical
+    # IPA symbol (see canonicalSymbol), so that "ʧ", "t͡ʃ" and "tʃ", or "ĩ"
+    # and "i~", are the same sound. Every sound can have aliases in the other
+    # notations, and a symbol in a notation that has no alias is converted to
+    # the IPA: X-SAMPA with the module sampa2api, the notation of chibcha as
+    # X-SAMPA but for the symbols of CHIBCHA_ALIASES, and the escaped code
+    # points, as "u0294", by decoding them.
+    #
+    # Arrays of features or distances of different modules can then be keyed
+    # by the IDs (see ids), and the data of one module be found in another
+    # without transliterating it again.
+    #
+    # Only the IDs of the sounds of the default table (see defaultSymbolTable)
+    # are the same in every process. The sounds interned later get their IDs
+    # in the order they are interned, so those IDs must not be saved or
+    # pickled: save the symbols, and look their IDs up again when loading.
+
+    def __init__(self):
+        self.symbols = []
+        self.aliases = {notation: {} for notation in NOTATIONS}
+        self.spellings = {notation: {} for notation in NOTATIONS}
+
+
+    def __len__(self):
+        return len(self.symbols)
+
+
+    def intern(self, symbol, notation=None):
+        # Returns the ID of the sound with the given symbol, in the given
+        # notation (IPA by default), giving it a new ID if it has none, and
+        # keeping the symbol as an alias of the sound.
+        if notation is None:
+            notation = IPA
+        validateNotation(notation)
+        if symbol in self.aliases[notation]:
+            return self.aliases[notation][symbol]
+        ipaSymbol = canonicalSymbol(toIpa(symbol, notation))
+        if ipaSymbol not in self.aliases[IPA]:
+            self.aliases[IPA][ipaSymbol] = len(self.symbols)
+            self.spellings[IPA][len(self.symbols)] = ipaSymbol
+            self.symbols.append(ipaSymbol)
+        identifier = self.aliases[IPA][ipaSymbol]
+        self.addAlias(identifier, symbol, notation)
+        return identifier
+
+
+    def addAlias(self, identifier, symbol, notation):
+        # Makes the symbol, in the notation, an alias of the sound with the
+        # given ID. The first alias of a sound in a notation is the one used
+        # to write it in that notation (see symbolOf).
+        validateNotation(notation)
+        aliases = self.aliases[notation]
+        if aliases.get(symbol, identifier) != identifier:
+            errorString  = "The symbol " + symbol + " is already an alias of "
+            errorString += "the sound " + self.symbols[aliases[symbol]] + "."
+            raise ValueError(errorString)
+        aliases[symbol] = identifier
+        self.spellings[notation].setdefault(identifier, symbol)
+
+
+    def idOf(self, symbol, notation=None):
+        # Returns the ID of the sound with the given symbol, in the given
+        # notation (IPA by default), without interning it. If the sound is not
+        # in the table, it raises a ValueError.
+        if notation is None:
+            notation = IPA
+        validateNotation(notation)
+        if symbol in self.aliases[notation]:
+            return self.aliases[notation][symbol]
+        ipaSymbol = canonicalSymbol(toIpa(symbol, notation))
+        if ipaSymbol not in self.aliases[IPA]:
+            errorString  = "The symbol " + symbol + " is not in the table."
+            raise ValueError(errorString)
+        return self.aliases[IPA][ipaSymbol]
+
+
+    def ids(self, symbols, notation=None):
+        # Returns the array of the IDs of a list of symbols, without interning
+        # them (see idOf). If one of them is not in the table, it raises a
+        # ValueError.
+        return np.array([self.idOf(symbol, notation) for symbol in symbols],
+                        dtype=SYMBOL_ID_TYPE)
+
+
+    def internIds(self, symbols, notation=None):
+        # Returns the array of the IDs of a list of symbols, interning the ones
+        # that are not in the table yet (see intern).
+        return np.array([self.intern(symbol, notation) for symbol in symbols],
+                        dtype=SYMBOL_ID_TYPE)
+
+
+    def symbolOf(self, identifier, notation=None):
+        # Returns the symbol of the sound with the given ID in the notation
+        # (IPA by default): its first alias there, or, if it has none, its
+        # X-SAMPA transliteration for X-SAMPA and chibcha, and its IPA symbol
+        # for the rest.
+        if notation is None:
+            notation = IPA
+        validateNotation(notation)
+        if identifier in self.spellings[notation]:
+            return self.spellings[notation][identifier]
+        if notation in [SAMPA, CHIBCHA]:
+            return sa.api2sampa(self.symbols[identifier])
+        return self.symbols[identifier]
+
+
+
+#####################
+#####################
+#####################
+###               ###
+###               ###
+###   FUNCTIONS   ###
+###               ###
+###               ###
+#####################
+#####################
+#####################
+
+
+def canonicalSymbol(symbol):
+    # Returns the canonical IPA symbol of a sound: the one written with the
+    # symbols of the table of sampa2api, with tie bars and combining
+    # diacritics, in normal form NFC, so that "ʧ" and "t͡ʃ", or "ĩ", precomposed
+    # or not, and "i~", give the same symbol.
+    return sa.sampa2api(sa.api2sampa(symbol))
+
+
+def toIpa(symbol, notation):
+    # Returns the IPA symbol of a symbol in a notation.
+    if notation == SAMPA:
+        return sa.sampa2api(symbol)
+    if notation == CHIBCHA:
+        return CHIBCHA_ALIASES.get(symbol, sa.sampa2api(symbol))
+    if notation == ESCAPED:
+        return unescapeSymbol(symbol)
+    return symbol
+
+
+def unescapeSymbol(symbol):
+    # Returns the symbol with the code points written as "u0294", with any
+    # quotes or backslashes around them, replaced by their characters.
+    return ESCAPED_CODE_POINT.sub(lambda match: chr(int(match.group(1), 16)),
+                                  symbol)
+
+
+def validateNotation(notation):
+    # Checks that the notation is one of NOTATIONS.
+    if notation not in NOTATIONS:
+        errorString  = "The notation " + str(notation) + " is not known."
+        raise ValueError(errorString)
+
+
+def defaultSymbolTable():
+    # Returns the table with the sounds of the table of sampa2api, but the
+    # diacritics, the aliases of chibcha and its nasal vowels interned, in
+    # this order, so that they have the same IDs every time.
+    table = SymbolTable()
+    for ipaSymbol, sampaSymbol in sa.IPA_TO_SAMPA.items():
+        if unicodedata.category(ipaSymbol[0]) not in DIACRITIC_CATEGORIES:
+            table.addAlias(table.intern(ipaSymbol), sampaSymbol, SAMPA)
+    for chibchaSymbol, ipaSymbol in CHIBCHA_ALIASES.items():
+        table.addAlias(table.intern(ipaSymbol), chibchaSymbol, CHIBCHA)
+    for chibchaSymbol in CHIBCHA_NASAL_VOWELS:
+        table.intern(chibchaSymbol, CHIBCHA)
+    return table
+
+
+
+#####################
+#####################
+#####################
+###               ###
+###               ###
+###   CONSTANTS   ###
+###   AND KEYS    ###
+###               ###
+###               ###
+#####################
+#####################
+#####################
+
+# The notations of the symbols.
+IPA     = "IPA"
+SAMPA   = "X-SAMPA"
+CHIBCHA = "CHIBCHA"
+ESCAPED = "ESCAPED"
+NOTATIONS = [IPA, SAMPA, CHIBCHA, ESCAPED]
+
+SYMBOL_ID_TYPE = np.int32
+
+# The Unicode categories of the diacritics, which are not sounds by themselves:
+# combining marks and modifier letters, as "ʰ" and "ː".
+DIACRITIC_CATEGORIES = ["Mn", "Lm"]
+
+# The symbols of the lists of chibcha (chibcha.VOCALS and chibcha.CONSONANTS)
+# that are not read as in X-SAMPA, with their IPA symbols, as given by the
+# features of the table rasgos.xlsx. The rest are X-SAMPA.
+CHIBCHA_ALIASES = {"1"  : "ɨ",
+                   "0~" : "ɔ̃",
+                   "F"  : "ɸ",
+                   "T"  : "t͡s",
+                   "C"  : "t͡ʃ",
+                   "J"  : "d͡ʒ",
+                   "ñ"  : "ɲ",
+                   "r"  : "ɾ",
+                   "R"  : "r"}
+
+# The nasal vowels of the lists of chibcha that are not in CHIBCHA_ALIASES, so
+# that every phoneme of chibcha is in the default table.
+CHIBCHA_NASAL_VOWELS = ["i~", "1~", "u~", "I~", "e~", "7~", "o~", "a~"]
+
+# A code point written as "u0294", with any quotes or backslashes around it,
+# as the keys of the tables of acousticphonetics.
+ESCAPED_CODE_POINT = re.compile(r'["\\]*u([0-9a-fA-F]{4})["\\]*')
+
+# The table shared by all the modules.
+SYMBOLS = defaultSymbolTable()
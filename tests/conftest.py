@@ -0,0 +1,38 @@
+import os
+import sys
+
+import pytest
+
+# The modules of the project are flat modules in src/py, imported by name.
+SOURCE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "..", "src", "py")
+RESOURCE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                  "..", "res")
+sys.path.insert(0, SOURCE_DIRECTORY)
+
+import cognatecorpus as cc
+import phoneticinventory as phinv
+
+
+@pytest.fixture
+def chibchanInventory():
+    # The inventory of the distinctive features of the chibchan languages.
+    arguments = {phinv.NUMBER_OF_TYPES_KEY: 2,
+                 phinv.TYPES_NAMES_KEY: ["Vocales", "Consonantes"],
+                 phinv.STRICT_PARSING_KEY: False,
+                 phinv.BY_SPREADSHEET_KEY: True,
+                 phinv.SPREADSHEET_ADDRESS_KEY:
+                        os.path.join(RESOURCE_DIRECTORY,
+                                     "rasgos_distintivos_chibchas.xlsx")}
+    return phinv.PhoneticInventory(arguments)
+
+
+@pytest.fixture
+def chibchanCorpus():
+    # The corpus of the first sheet of the chibchan cognates.
+    arguments = {cc.BY_SPREADSHEET_KEY: True,
+                 cc.SPREADSHEET_ADDRESS_KEY:
+                        os.path.join(RESOURCE_DIRECTORY,
+                                     "cognados_chibchas.xlsx"),
+                 cc.SHEET_NAME_KEY: "Ark 1"}
+    return cc.CognateCorpus(arguments)
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+import aligner as al
+
+
+def randomAligner(generator, size):
+    substitution = generator.integers(-3, 4, size=(size, size)).astype(np.float32)
+    substitution = (substitution + substitution.T) / 2
+    return al.Aligner(substitution, gapOpen=2, gapExtend=1)
+
+
+def test_banded_local_alignment_is_optimal():
+    generator = np.random.default_rng(0)
+    for _ in range(200):
+        aligner = randomAligner(generator, 4)
+        sequence1 = generator.integers(0, 4, size=generator.integers(1, 25))
+        sequence2 = generator.integers(0, 4, size=generator.integers(1, 25))
+        full = aligner.singleAlignment(sequence1, sequence2, isGlobal=False)
+        for bandWidth in [0, 1, al.AUTO_BAND]:
+            banded = aligner.singleAlignment(sequence1, sequence2, isGlobal=False,
+                                             bandWidth=bandWidth)
+            assert np.isclose(banded.score, full.score)
+
+
+def test_banded_global_alignment_is_optimal():
+    generator = np.random.default_rng(1)
+    for _ in range(200):
+        aligner = randomAligner(generator, 4)
+        sequence1 = generator.integers(0, 4, size=generator.integers(1, 25))
+        sequence2 = generator.integers(0, 4, size=generator.integers(1, 25))
+        full = aligner.singleAlignment(sequence1, sequence2)
+        banded = aligner.singleAlignment(sequence1, sequence2, bandWidth=0)
+        assert np.isclose(banded.score, full.score)
+
+
+def backendResults(backend):
+    # The scores and aligned sequences of the same random global, local and
+    # banded alignments, one at a time and in batches, with the backend.
+    previous = al.getBackend()
+    al.setBackend(backend)
+    try:
+        generator = np.random.default_rng(2)
+        results = []
+        for _ in range(50):
+            aligner = randomAligner(generator, 4)
+            sequences = [generator.integers(0, 4, size=generator.integers(1, 15))
+                         for _ in range(6)]
+            for sequence1, sequence2 in zip(sequences[::2], sequences[1::2]):
+                for isGlobal, bandWidth in [(True, None), (False, None),
+                                            (True, 1), (False, 1)]:
+                    alignment = aligner.singleAlignment(sequence1, sequence2,
+                                                        isGlobal, bandWidth)
+                    results.append((float(alignment.score),
+                                    list(alignment.alignedSequence1),
+                                    list(alignment.alignedSequence2)))
+            sequences1, lengths1 = al.padSequences(sequences[::2])
+            sequences2, lengths2 = al.padSequences(sequences[1::2])
+            for isGlobal in [True, False]:
+                batch = aligner.alignBatch(sequences1, sequences2, lengths1,
+                                           lengths2, isGlobal,
+                                           returnAlignments=True)
+                for k in range(len(batch)):
+                    alignment = batch.alignment(k)
+                    results.append((float(alignment.score),
+                                    list(alignment.alignedSequence1),
+                                    list(alignment.alignedSequence2)))
+        return results
+    finally:
+        al.setBackend(previous)
+
+
+@pytest.mark.parametrize("backend", al.BACKENDS)
+def test_backends_give_identical_results(backend):
+    if backend == al.NUMBA_BACKEND:
+        pytest.importorskip("numba")
+    assert backendResults(backend) == backendResults(al.NUMPY_BACKEND)
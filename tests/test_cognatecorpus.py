@@ -0,0 +1,51 @@
+import os
+
+import numpy as np
+
+import aligner as al
+import cognatecorpus as cc
+
+
+def mappedCorpus(fileAddress):
+    return cc.CognateCorpus({cc.BY_MEMORY_MAP_KEY: True,
+                             cc.MEMORY_MAP_ADDRESS_KEY: fileAddress})
+
+
+def test_save_memory_mapped_corpus_to_its_own_directory(tmp_path,
+                                                        chibchanCorpus):
+    # Saving a memory mapped corpus over the files it maps used to truncate
+    # them while they were being read, destroying the corpus.
+    address = str(tmp_path / "corpus")
+    original = chibchanCorpus
+    original.save(address)
+    mapped = mappedCorpus(address)
+    mapped.save(address)
+    reloaded = mappedCorpus(address)
+    assert list(reloaded.termList) == list(original.termList)
+    assert list(reloaded.languageNames) == list(original.languageNames)
+    assert np.array_equal(reloaded.codeMatrix, original.codeMatrix)
+    assert list(reloaded.forms) == [str(form) for form in original.forms]
+    assert list(mapped.forms) == list(reloaded.forms)
+    assert not any(name.endswith(cc.TEMPORARY_SUFFIX)
+                   for name in os.listdir(address))
+
+
+def test_distance_tensor_is_the_same_in_small_blocks(monkeypatch,
+                                                     chibchanCorpus,
+                                                     chibchanInventory):
+    tensor = chibchanCorpus.distanceTensor(chibchanInventory)
+    candidates = chibchanCorpus.cognateCandidates(chibchanInventory, 0.5)
+    monkeypatch.setattr(al, "BATCH_CELLS", 500)
+    assert len(list(chibchanCorpus.termPairBlocks())) > 1
+    assert np.array_equal(chibchanCorpus.distanceTensor(chibchanInventory),
+                          tensor, equal_nan=True)
+    assert chibchanCorpus.cognateCandidates(chibchanInventory, 0.5) == \
+                                                                candidates
+
+
+def test_cognate_candidates_are_python_numbers(chibchanCorpus,
+                                              chibchanInventory):
+    candidates = chibchanCorpus.cognateCandidates(chibchanInventory, 0.5)
+    assert len(candidates) > 0
+    for candidate in candidates:
+        assert [type(value) for value in candidate] == [int, int, int, float]
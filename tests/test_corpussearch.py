@@ -0,0 +1,17 @@
+import corpussearch as csearch
+
+
+def test_similar_short_forms_rank_above_long_forms(chibchanCorpus,
+                                                   chibchanInventory):
+    search = csearch.CorpusSearch(chibchanCorpus, chibchanInventory)
+    forms = [form for formId, form, score in
+             search.search("mbɾi", top=5, minimumShared=0)]
+    assert forms[0] == "mbɾi"
+    assert "bɾi" in forms
+    assert "tummadi" not in forms and "sinduli" not in forms
+
+
+def test_empty_query_finds_nothing(chibchanCorpus, chibchanInventory):
+    search = csearch.CorpusSearch(chibchanCorpus, chibchanInventory)
+    assert search.search("") == []
+    assert search.search("", minimumShared=0) == []
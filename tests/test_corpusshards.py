@@ -0,0 +1,43 @@
+import os
+
+import numpy as np
+import pytest
+
+import aligner as al
+import corpusshards as cs
+
+
+def test_checkpoints_of_other_jobs_and_aligners_are_not_reused(
+                            tmp_path, chibchanCorpus, chibchanInventory):
+    inventory = chibchanInventory
+    corpus = chibchanCorpus
+    address = str(tmp_path)
+    distances = cs.runShardedJob(corpus, inventory, cs.distanceJob,
+                                 cs.mergeDistanceSums, numberOfShards=3,
+                                 checkpointAddress=address)
+    correspondences = cs.runShardedJob(corpus, inventory,
+                                       cs.correspondenceJob,
+                                       cs.mergeCounters, numberOfShards=3,
+                                       checkpointAddress=address)
+    assert isinstance(correspondences, cs.Counter)
+    otherAligner = al.fromDistanceMatrix(inventory.distanceMatrix() / 2)
+    otherDistances = cs.runShardedJob(corpus, inventory, cs.distanceJob,
+                                      cs.mergeDistanceSums, numberOfShards=3,
+                                      checkpointAddress=address,
+                                      theAligner=otherAligner)
+    expected = cs.runShardedJob(corpus, inventory, cs.distanceJob,
+                                cs.mergeDistanceSums, numberOfShards=3,
+                                theAligner=otherAligner)
+    assert np.array_equal(otherDistances.sums, expected.sums)
+    assert not np.array_equal(otherDistances.sums, distances.sums)
+    assert len(os.listdir(address)) == 9
+
+
+def test_empty_corpus_has_no_shards(chibchanCorpus, chibchanInventory):
+    inventory = chibchanInventory
+    corpus = chibchanCorpus
+    corpus.codeMatrix = corpus.codeMatrix[:0]
+    assert cs.partitionCorpus(corpus, inventory, 4) == []
+    with pytest.raises(ValueError):
+        cs.runShardedJob(corpus, inventory, cs.distanceJob,
+                         cs.mergeDistanceSums, numberOfShards=4)
@@ -0,0 +1,34 @@
+import pickle
+
+import pytest
+
+import symboltable as st
+
+from conftest import SOURCE_DIRECTORY
+
+
+def test_ids_do_not_intern_symbols():
+    size = len(st.SYMBOLS)
+    with pytest.raises(ValueError):
+        st.SYMBOLS.ids(["ʘʷ"])
+    assert len(st.SYMBOLS) == size
+
+
+def test_chibcha_phonemes_are_in_the_default_table(monkeypatch):
+    # chibcha reads its lists, relative to the sources, when imported.
+    monkeypatch.chdir(SOURCE_DIRECTORY)
+    import chibcha as ch
+    default = st.defaultSymbolTable()
+    for phoneme in ch.VOCALS + ch.CONSONANTS:
+        identifier = default.idOf(phoneme, st.CHIBCHA)
+        assert st.SYMBOLS.idOf(phoneme, st.CHIBCHA) == identifier
+
+
+def test_unpickled_inventory_binds_its_symbol_ids_again(chibchanInventory):
+    inventory = chibchanInventory
+    state = inventory.__getstate__()
+    assert "symbolIds" not in state and "codeOfSymbolId" not in state
+    copy = pickle.loads(pickle.dumps(inventory))
+    assert copy.symbolIds.tolist() == st.SYMBOLS.ids(copy.inventory).tolist()
+    codes = inventory.codesOfSymbolIds(inventory.symbolIds)
+    assert copy.codesOfSymbolIds(copy.symbolIds).tolist() == codes.tolist()